@@ -0,0 +1,106 @@
+import multiprocessing
+import numpy as np
+from Grid.grid import Grid, grid_actions
+from Grid.path_database import first_move_row
+
+grid_move_ids = {move: move_id for move_id, move in enumerate(grid_actions.values())}  # (dx, dy) -> move id
+
+_worker_free = None
+
+
+def _init_worker(free):
+    global _worker_free
+    _worker_free = free
+
+
+def _bound_sources(sources):
+    height, width = _worker_free.shape
+    target_x = np.tile(np.arange(width), height)
+    target_y = np.repeat(np.arange(height), width)
+    boxes = np.empty((len(sources), len(grid_actions), 4), dtype=np.int32)
+    boxes[:] = (width, height, -1, -1)  # an empty box contains nothing
+    for index, source in enumerate(sources):
+        row = first_move_row(_worker_free, source)
+        for move_id in range(len(grid_actions)):
+            goals = row == move_id
+            if goals.any():
+                xs = target_x[goals]
+                ys = target_y[goals]
+                boxes[index, move_id] = (xs.min(), ys.min(), xs.max(), ys.max())
+    return boxes
+
+
+class GoalBounding:
+    def __init__(self, grid: Grid, obstacles):
+        """
+        Goal-bounding preprocessing of a static grid: for every cell and every move in grid_actions, the bounding box
+          of all goals whose shortest path (as chosen by the breadth-first wavefront) starts with that move. A search
+          can skip any move whose box does not contain its goal, and at least one shortest path always survives.
+        :param grid:      Grid, the grid
+        :param obstacles: set (of tuples), locations of obstacles
+        """
+        self.grid = grid
+        self.free = ~grid.occupancy_grid(obstacles)
+        # boxes[y * width + x, move_id] = (min_x, min_y, max_x, max_y), stored with the smallest dtype that fits
+        self.boxes = None
+
+    def build(self, processes=None, chunk_size=64):
+        """
+        Build the bounding boxes in parallel over the cells; this runs one wavefront per free cell
+        :param processes:  int, number of worker processes (None uses all cores, 1 builds in this process)
+        :param chunk_size: int, number of cells handed to a worker at once
+        :return:           True
+        """
+        cell_count = self.free.size
+        chunks = [range(start, min(start + chunk_size, cell_count)) for start in range(0, cell_count, chunk_size)]
+        if processes == 1:
+            _init_worker(self.free)
+            results = [_bound_sources(chunk) for chunk in chunks]
+        else:
+            with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(self.free,)) as pool:
+                results = pool.map(_bound_sources, chunks)
+        boxes = np.concatenate(results)
+        dtype = np.int16 if max(self.free.shape) < np.iinfo(np.int16).max else np.int32
+        self.boxes = boxes.astype(dtype)
+        return True
+
+    def contains(self, state, move, goal):
+        """
+        Check whether a move can start a shortest path from state to goal
+        :param state: tuple, the current x-y location
+        :param move:  tuple, movement in x and y directions (a value of grid_actions)
+        :param goal:  tuple, the goal x-y location
+        :return:      bool, False if the move can be pruned
+        """
+        min_x, min_y, max_x, max_y = self.boxes[state[1] * self.grid.grid_x_length + state[0], grid_move_ids[move]]
+        return min_x <= goal[0] <= max_x and min_y <= goal[1] <= max_y
+
+    def prune(self, state, successors, goal):
+        """
+        Drop the successors of state whose move cannot start a shortest path to goal
+        :param state:      tuple, the current x-y location
+        :param successors: list, successor locations (as generated by Grid.get_successors), or False
+        :param goal:       tuple, the goal x-y location
+        :return:           list, the successors that are kept (False if none are)
+        """
+        if not successors:
+            return successors
+        kept = [successor for successor in successors
+                if self.contains(state, (successor[0] - state[0], successor[1] - state[1]), goal)]
+        if len(kept) == 0:
+            return False
+        return kept
+
+    def export_db(self, filename):
+        np.savez(filename, free=self.free, boxes=self.boxes)
+        return True
+
+    @classmethod
+    def load(cls, filename, grid: Grid):
+        data = np.load(filename)
+        if data['free'].shape != (grid.grid_y_length, grid.grid_x_length):
+            raise ValueError('Goal bounding data does not match the grid')
+        goal_bounding = cls(grid, set())
+        goal_bounding.free = data['free']
+        goal_bounding.boxes = data['boxes']
+        return goal_bounding
@@ -7,6 +7,7 @@ grid_actions = {"right": (1, 0),
                 "up": (0, 1),
                 "left": (-1, 0),
                 "down": (0, -1)}  # 4-directional movement
+grid_action_names = tuple(grid_actions)  # a move is stored as its index in this tuple (e.g. in path databases)
 
 
 class Grid(StateSpace):
@@ -166,5 +167,88 @@ class Grid(StateSpace):
     def get_state(self):
         return self.current_state
 
+    def occupancy_grid(self, obstacles):
+        """
+        Build the occupancy bitmap of the grid; cells are indexed as [y, x] so that rows match the printed layout.
+        Obstacles outside the grid (e.g. clipped samples of the 'normal' distribution) are ignored.
+        :param obstacles: set (of tuples), locations of obstacles
+        :return:          np.ndarray of bool with shape (grid_y_length, grid_x_length), True where there is an obstacle
+        """
+        occupied = np.zeros((self.grid_y_length, self.grid_x_length), dtype=bool)
+        if len(obstacles) == 0:
+            return occupied
+        locations = np.array(list(obstacles), dtype=np.int64).reshape(-1, 2)
+        inside = (locations[:, 0] >= 0) & (locations[:, 0] < self.grid_x_length) & \
+                 (locations[:, 1] >= 0) & (locations[:, 1] < self.grid_y_length)
+        locations = locations[inside]
+        occupied[locations[:, 1], locations[:, 0]] = True
+        return occupied
+
+    def distance_field(self, goal, obstacles):
+        """
+        Compute the exact distance from every cell to the goal (a flow field) with a breadth-first wavefront over the
+          occupancy bitmap; with unit step costs this equals Dijkstra's algorithm. Each step expands the whole frontier
+          at once with NumPy, so the total work is O(W*H) array operations spread over (longest distance) steps.
+        :param goal:      tuple, the goal x-y location
+        :param obstacles: set (of tuples), locations of obstacles
+        :return:          np.ndarray of int32 with shape (grid_y_length, grid_x_length), indexed [y, x]; the number of
+                          steps to the goal, or -1 for obstacles and cells that cannot reach the goal
+        """
+        width, height = self.grid_x_length, self.grid_y_length
+        free = ~self.occupancy_grid(obstacles).ravel()
+        distance = np.full(width * height, -1, dtype=np.int32)
+        if self.out_of_state_space(goal) or not free[goal[1] * width + goal[0]]:
+            return distance.reshape(height, width)
+        frontier = np.array([goal[1] * width + goal[0]], dtype=np.int64)
+        distance[frontier] = 0
+        step = 0
+        while frontier.size > 0:
+            step += 1
+            x = frontier % width
+            y = frontier // width
+            reached = []
+            for dx, dy in self.actions.values():
+                inside = (x + dx >= 0) & (x + dx < width) & (y + dy >= 0) & (y + dy < height)
+                neighbours = frontier[inside] + dy * width + dx
+                reached.append(neighbours[free[neighbours] & (distance[neighbours] == -1)])
+            frontier = np.unique(np.concatenate(reached))
+            distance[frontier] = step
+        return distance.reshape(height, width)
+
+    def follow_distance_field(self, distance_field, start):
+        """
+        Extract a shortest path to the goal of a distance field by stepping to a neighbour one step closer each time
+        :param distance_field: np.ndarray, generated by distance_field()
+        :param start:          tuple, the start x-y location
+        :return:               either: a list of locations from start to the goal of the field
+                                   or: False, if the goal cannot be reached from start
+        """
+        if self.out_of_state_space(start) or distance_field[start[1], start[0]] < 0:
+            return False
+        path = [start]
+        x, y = start
+        remaining = distance_field[y, x]
+        while remaining > 0:
+            for dx, dy in self.actions.values():
+                if not self.out_of_state_space((x + dx, y + dy)) and distance_field[y + dy, x + dx] == remaining - 1:
+                    x, y = x + dx, y + dy
+                    break
+            remaining -= 1
+            path.append((x, y))
+        return path
+
+    @staticmethod
+    def distance_field_heuristic(distance_field):
+        """
+        Turn a distance field into a perfect heuristic for queries towards its goal; it has the same signature as
+          euclidean_distance_2d (the second location is ignored, as the goal is fixed by the field).
+        :param distance_field: np.ndarray, generated by distance_field()
+        :return:               function, (state_1, state_2) -> the exact distance, or infinity if unreachable
+        """
+        def heuristic(state_1, state_2=None):
+            distance = distance_field[state_1[1], state_1[0]]
+            return math.inf if distance < 0 else int(distance)
+        return heuristic
+
 
 #%%
@@ -0,0 +1,120 @@
+import numpy as np
+from Grid.grid import Grid
+
+
+def label_free_cells(free):
+    """
+    Label the 4-connected components of the free cells with a vectorized flood fill: every round hooks the root of
+      each edge's larger endpoint onto the smaller one and then compresses the parent pointers; all edges are handled
+      at once with NumPy, and the number of rounds is small (logarithmic in practice) rather than one per cell.
+    The label of a component is the smallest flat index (y * width + x) of its cells, so labels of disjoint pieces
+      never collide and can be recomputed locally after an update.
+    :param free: np.ndarray of bool with shape (height, width), True where a cell is free
+    :return:     np.ndarray of int64 with the same shape, the label of each free cell and -1 for obstacles
+    """
+    height, width = free.shape
+    ids = np.arange(height * width).reshape(height, width)
+    horizontal = free[:, :-1] & free[:, 1:]
+    vertical = free[:-1, :] & free[1:, :]
+    u = np.concatenate((ids[:, :-1][horizontal], ids[:-1, :][vertical]))
+    v = np.concatenate((ids[:, 1:][horizontal], ids[1:, :][vertical]))
+    parent = ids.ravel().copy()
+    while True:
+        root_u = parent[u]
+        root_v = parent[v]
+        differ = root_u != root_v
+        if not differ.any():
+            break
+        np.minimum.at(parent, np.maximum(root_u[differ], root_v[differ]),
+                      np.minimum(root_u[differ], root_v[differ]))
+        while True:  # pointer jumping until every cell points at its root
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return np.where(free, parent.reshape(height, width), -1)
+
+
+class ConnectedComponents:
+    def __init__(self, grid: Grid, obstacles):
+        """
+        Connected-component index of the free cells of a grid; two locations are connected iff their labels match,
+          so unreachable queries are rejected in O(1) before any search.
+        :param grid:      Grid, the grid
+        :param obstacles: set (of tuples), locations of obstacles
+        """
+        self.grid = grid
+        self.free = ~grid.occupancy_grid(obstacles)
+        self.labels = label_free_cells(self.free)
+
+    def component(self, state):
+        """
+        :param state: tuple, a location on the grid
+        :return:      int, the label of the component of the location, or -1 if it is an obstacle or off the grid
+        """
+        if self.grid.out_of_state_space(state):
+            return -1
+        return int(self.labels[state[1], state[0]])
+
+    def connected(self, state_1, state_2):
+        """
+        Check whether a path between two locations can exist
+        :param state_1: tuple, the first x-y location
+        :param state_2: tuple, the second x-y location
+        :return:        bool, True if both locations are free and in the same component
+        """
+        label = self.component(state_1)
+        return label != -1 and label == self.component(state_2)
+
+    def neighbour_labels(self, state):
+        labels = set()
+        for dx, dy in self.grid.actions.values():
+            neighbour = (state[0] + dx, state[1] + dy)
+            label = self.component(neighbour)
+            if label != -1:
+                labels.add(label)
+        return labels
+
+    def add_obstacle(self, state):
+        """
+        Update the index after a free location becomes an obstacle; only the component that contained the location can
+          split, so only its cells are relabelled.
+        :param state: tuple, location of the new obstacle
+        :return:      True
+        """
+        label = self.component(state)
+        if label == -1:
+            return True
+        self.free[state[1], state[0]] = False
+        self.labels[state[1], state[0]] = -1
+        region = self.labels == label
+        rows, columns = np.nonzero(region)
+        if len(rows) == 0:
+            return True
+        top, bottom = rows.min(), rows.max() + 1
+        left, right = columns.min(), columns.max() + 1
+        local = label_free_cells(region[top:bottom, left:right])
+        # convert labels of the bounding box back to flat indices of the whole grid
+        local_y, local_x = np.divmod(local, right - left)
+        relabelled = (local_y + top) * self.grid.grid_x_length + local_x + left
+        window = self.labels[top:bottom, left:right]
+        inside = local != -1
+        window[inside] = relabelled[inside]
+        return True
+
+    def remove_obstacle(self, state):
+        """
+        Update the index after an obstacle is removed; the location joins (and merges) the components around it.
+        :param state: tuple, location of the removed obstacle
+        :return:      True
+        """
+        if self.grid.out_of_state_space(state) or self.free[state[1], state[0]]:
+            return True
+        merged = self.neighbour_labels(state)
+        own = state[1] * self.grid.grid_x_length + state[0]
+        label = min(merged | {own})
+        if merged != {label}:  # some neighbouring component takes a new label
+            self.labels[np.isin(self.labels, list(merged))] = label
+        self.free[state[1], state[0]] = True
+        self.labels[state[1], state[0]] = label
+        return True
@@ -0,0 +1,140 @@
+import struct
+import zlib
+import numpy as np
+from Grid.grid import Grid
+
+# Cell codes, ordered by drawing priority: when several cells are merged into one by downsampling, the highest code
+#   wins, so that a path (or the start and goal) stays visible on huge maps.
+FREE = 0
+OBSTACLE = 1
+PATH = 2
+START = 3
+GOAL = 4
+
+grid_symbols = b'.xoSG'  # text symbol of each cell code, same as GridSolver.visualize_path
+grid_colours = np.array([[255, 255, 255],   # free
+                         [0, 0, 0],         # obstacle
+                         [30, 120, 255],    # path
+                         [0, 200, 0],       # start
+                         [220, 0, 0]],      # goal
+                        dtype=np.uint8)
+grid_grays = np.array([255, 0, 128, 64, 192], dtype=np.uint8)
+
+
+class GridRenderer:
+    def __init__(self, grid: Grid, obstacles):
+        self.grid = grid
+        self.obstacles = obstacles
+
+    def cell_codes(self, path=None, endpoints=True):
+        """
+        Build the whole picture as an array of cell codes in one pass; the path is turned into a mask with a single
+          fancy-indexing assignment, so the cost is O(W*H + |path|) instead of O(W*H*|path|).
+        :param path:      list, a list of locations on a grid (e.g. generated by GridSolver.a_star()[0]), or None
+        :param endpoints: bool, whether to mark the start and goal of the grid
+        :return:          np.ndarray of uint8 with shape (grid_y_length, grid_x_length)
+        """
+        codes = self.grid.occupancy_grid(self.obstacles).astype(np.uint8)  # FREE = 0, OBSTACLE = 1
+        if path is not None and len(path) > 0:
+            locations = np.array(path, dtype=np.int64).reshape(-1, 2)
+            codes[locations[:, 1], locations[:, 0]] = PATH
+        if not endpoints:
+            return codes
+        start = self.grid.get_start()
+        goal = self.grid.get_goal()
+        if start is not None:
+            codes[start[1], start[0]] = START
+        if goal is not None:
+            codes[goal[1], goal[0]] = GOAL
+        return codes
+
+    @staticmethod
+    def downsample(codes, max_resolution):
+        """
+        Shrink the picture so that neither side exceeds max_resolution; each block of cells becomes the cell with the
+          highest code in it (see the cell codes above).
+        :param codes:          np.ndarray, cell codes generated by cell_codes()
+        :param max_resolution: int, maximum number of cells per side, or None to keep the full resolution
+        :return:               np.ndarray, the (possibly) downsampled cell codes
+        """
+        if max_resolution is None or max(codes.shape) <= max_resolution:
+            return codes
+        block = -(-max(codes.shape) // max_resolution)  # ceiling division
+        height = -(-codes.shape[0] // block)
+        width = -(-codes.shape[1] // block)
+        padded = np.zeros((height * block, width * block), dtype=codes.dtype)
+        padded[:codes.shape[0], :codes.shape[1]] = codes
+        return padded.reshape(height, block, width, block).max(axis=(1, 3))
+
+    def to_text(self, path=None, max_resolution=None, endpoints=True):
+        """
+        Render the grid as text; path is represented by 'o', start by 'S', goal by 'G', and obstacles by 'x'
+        :param path:           list, a list of locations on a grid, or None
+        :param max_resolution: int, maximum number of cells per side, or None to keep the full resolution
+        :param endpoints:      bool, whether to mark the start and goal of the grid
+        :return:               str, one line per row of the grid
+        """
+        codes = self.downsample(self.cell_codes(path, endpoints), max_resolution)
+        height, width = codes.shape
+        buffer = np.full((height, 2 * width + 1), ord(' '), dtype=np.uint8)
+        buffer[:, 0:2 * width:2] = np.frombuffer(grid_symbols, dtype=np.uint8)[codes]
+        buffer[:, -1] = ord('\n')
+        return buffer.tobytes().decode('ascii')
+
+    def to_pixels(self, path=None, max_resolution=None, colour=True):
+        """
+        Render the grid as an image
+        :param path:           list, a list of locations on a grid, or None
+        :param max_resolution: int, maximum number of pixels per side, or None to keep one pixel per cell
+        :param colour:         bool, whether to return RGB pixels (True) or gray levels (False)
+        :return:               np.ndarray of uint8 with shape (height, width, 3) if colour, (height, width) otherwise
+        """
+        codes = self.downsample(self.cell_codes(path), max_resolution)
+        if colour:
+            return grid_colours[codes]
+        return grid_grays[codes]
+
+    def export(self, filename, path=None, max_resolution=None):
+        """
+        Write the rendered grid to a file in a single I/O call; the format is chosen by the extension of the filename:
+          '.txt' for text, '.pgm' for a gray-level image, '.ppm' or '.png' for a colour image
+        :param filename:       str, name of the output file
+        :param path:           list, a list of locations on a grid, or None
+        :param max_resolution: int, maximum number of cells per side, or None to keep the full resolution
+        :return:               True
+        """
+        extension = filename.lower().rsplit('.', 1)[-1]
+        if extension == 'txt':
+            data = self.to_text(path, max_resolution).encode('ascii')
+        elif extension == 'pgm':
+            pixels = self.to_pixels(path, max_resolution, colour=False)
+            data = 'P5\n{} {}\n255\n'.format(pixels.shape[1], pixels.shape[0]).encode('ascii') + pixels.tobytes()
+        elif extension == 'ppm':
+            pixels = self.to_pixels(path, max_resolution, colour=True)
+            data = 'P6\n{} {}\n255\n'.format(pixels.shape[1], pixels.shape[0]).encode('ascii') + pixels.tobytes()
+        elif extension == 'png':
+            data = self.encode_png(self.to_pixels(path, max_resolution, colour=True))
+        else:
+            raise ValueError('Unsupported file format: {}'.format(filename))
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return True
+
+    @staticmethod
+    def encode_png(pixels):
+        """
+        Encode RGB pixels as a PNG file (no filtering, zlib-compressed); only the standard library is needed.
+        :param pixels: np.ndarray of uint8 with shape (height, width, 3)
+        :return:       bytes, the content of the PNG file
+        """
+        height, width = pixels.shape[:2]
+        raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # every row starts with the filter type 0 (None)
+        raw[:, 1:] = pixels.reshape(height, width * 3)
+
+        def chunk(chunk_type, content):
+            return struct.pack('>I', len(content)) + chunk_type + content + \
+                struct.pack('>I', zlib.crc32(chunk_type + content) & 0xffffffff)
+
+        header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8-bit depth, colour type 2 (RGB)
+        return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw.tobytes())) + \
+            chunk(b'IEND', b'')
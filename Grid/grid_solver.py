@@ -1,4 +1,6 @@
 from Grid.grid import Grid
+from Grid.grid_components import ConnectedComponents
+from Grid.grid_renderer import GridRenderer
 import heapq
 from solver import Solver
 
@@ -10,26 +12,18 @@ class GridSolver(Solver):
         self.heuristic = grid.euclidean_distance_2d
         self.g_cost_per_step = 1
         self.obstacles = obstacles
+        self.components = ConnectedComponents(grid, obstacles)  # rejects unreachable goals before searching
+        self.path_database = None  # optional CompressedPathDatabase for static maps
+        self.goal_bounding = None  # optional GoalBounding for static maps
 
-    def visualize_path(self, path):
+    def visualize_path(self, path, max_resolution=None):
         """
         Visualize the path in the grid; path is represented by 'o', start by 'S', goal by 'G', and obstacles by 'x'
-        :param path: List, a list of locations on a grid (e.g. generated by GridSolver.a_star()[0])
+        :param path:           List, a list of locations on a grid (e.g. generated by GridSolver.a_star()[0])
+        :param max_resolution: int, maximum number of cells per side (huge maps are downsampled), or None
         :return:
         """
-        for y in range(self.grid.grid_y_length):
-            for x in range(self.grid.grid_x_length):
-                if (x, y) == self.grid.get_start():
-                    print('S ', end='')
-                elif (x, y) == self.grid.get_goal():
-                    print('G ', end='')
-                elif (x, y) in path:
-                    print('o ', end='')
-                elif (x, y) in self.obstacles:
-                    print('x ', end='')
-                else:
-                    print('. ', end='')
-            print()
+        print(GridRenderer(self.grid, self.obstacles).to_text(path, max_resolution), end='')
 
     def update_open_list(self, open_list, f_cost, g_cost, parent, state, contains_g_cost=True):
         """
@@ -54,18 +48,50 @@ class GridSolver(Solver):
                 # Update the f_cost of the state
                 open_list[index] = (f_cost, parent, state)
 
-    def visualize_obstacle(self):
+    def visualize_obstacle(self, max_resolution=None):
         """
         Visualize the obstacles in the grid; obstacles are represented by 'x'
+        :param max_resolution: int, maximum number of cells per side (huge maps are downsampled), or None
         :return:
         """
-        for y in range(self.grid.grid_y_length):
-            for x in range(self.grid.grid_x_length):
-                if (x, y) in self.obstacles:
-                    print('x ', end='')
-                else:
-                    print('. ', end='')
-            print()
+        print(GridRenderer(self.grid, self.obstacles).to_text(None, max_resolution, endpoints=False), end='')
+
+    def export_path(self, filename, path=None, max_resolution=None):
+        """
+        Write the grid (and the path, if given) to a text, PGM, PPM or PNG file; see GridRenderer.export
+        :param filename:       str, name of the output file; the extension selects the format
+        :param path:           List, a list of locations on a grid, or None
+        :param max_resolution: int, maximum number of cells per side (huge maps are downsampled), or None
+        :return:               True
+        """
+        return GridRenderer(self.grid, self.obstacles).export(filename, path, max_resolution)
+
+    def add_obstacle(self, location):
+        """
+        Turn a location into an obstacle, keeping the connected-component index up to date
+        :param location: tuple, a location on the grid
+        :return:         True
+        """
+        self.obstacles.add(location)
+        self.drop_static_preprocessing()
+        return self.components.add_obstacle(location)
+
+    def remove_obstacle(self, location):
+        """
+        Free a location, keeping the connected-component index up to date
+        :param location: tuple, a location on the grid
+        :return:         True
+        """
+        self.obstacles.discard(location)
+        self.drop_static_preprocessing()
+        return self.components.remove_obstacle(location)
+
+    def unreachable(self):
+        """
+        Check in O(1) whether the goal cannot be reached from the start (they are in different components)
+        :return: bool, True if no path exists
+        """
+        return not self.components.connected(self.grid.get_start(), self.grid.get_goal())
 
     @staticmethod
     def index_in_open_list(state, open_list):
@@ -81,9 +107,71 @@ class GridSolver(Solver):
                 return item_index
         return -1
 
+    def drop_static_preprocessing(self):
+        # path databases and goal bounds are only valid for the map they were built on
+        self.path_database = None
+        self.goal_bounding = None
+
+    def set_path_database(self, path_database):
+        self.path_database = path_database
+        return True
+
+    def set_goal_bounding(self, goal_bounding):
+        self.goal_bounding = goal_bounding
+        return True
+
+    def prune_successors(self, current_state, successors):
+        """
+        Drop successors whose move cannot start a shortest path to the goal (goal bounding); a no-op without
+          goal-bounding data (see set_goal_bounding)
+        :param current_state: tuple, the state being expanded
+        :param successors:    list, successors generated by Grid.get_successors, or False
+        :return:              list, the successors to be considered, or False if there are none
+        """
+        if self.goal_bounding is None:
+            return successors
+        return self.goal_bounding.prune(current_state, successors, self.grid.get_goal())
+
     def solve(self, algorithm='greedy_best_first_search'):
         if algorithm == 'greedy_best_first_search':
             return self.greedy_best_first_search()
+        elif algorithm == 'path_database':
+            return self.path_database_lookup()
+
+    def path_database_lookup(self):
+        """
+        Answer the query from the compressed path database (see set_path_database) by table lookups alone
+        :return: either: a tuple of a list of states (locations on the grid) and the cost of the path
+                     or: (False, False), if a path is impossible
+        """
+        if self.path_database is None:
+            raise ValueError('No path database (call set_path_database)')
+        if self.unreachable():
+            return False, False
+        path = self.path_database.extract_path(self.grid.get_start(), self.grid.get_goal())
+        if not path:
+            return False, False
+        return path, (len(path) - 1) * self.g_cost_per_step
+
+    def solve_many(self, starts, goal=None):
+        """
+        Route many agents to one shared goal: a single distance field is computed for the goal and every agent follows
+          decreasing distances, instead of running one A* per agent.
+        :param starts: list, start locations of the agents
+        :param goal:   tuple, the shared goal; the goal of the grid is used if None
+        :return:       list, a (path, cost) tuple per agent, or (False, False) for agents that cannot reach the goal
+        """
+        if goal is None:
+            goal = self.grid.get_goal()
+        distance_field = self.grid.distance_field(goal, self.obstacles)
+        results = []
+        for start in starts:
+            path = self.grid.follow_distance_field(distance_field, start)
+            if not path:
+                results.append((False, False))
+            else:
+                results.append((path, (len(path) - 1) * self.g_cost_per_step))
+        return results
 
     # ------------------------------------ Optimal Algorithms ------------------------------------
 
@@ -99,6 +187,8 @@ class GridSolver(Solver):
             return [self.grid.get_start()], 0
         elif self.grid.get_start() in self.obstacles or self.grid.get_goal() in self.obstacles:
             raise ValueError('Start or goal state is an obstacle')
+        elif self.unreachable():
+            raise ValueError('Path is impossible: start and goal are in different components')
         # Initialize the current state to the initial state
         current_state = self.grid.get_start()
         # Initialize the current cost to the heuristic cost of the initial state
@@ -117,7 +207,8 @@ class GridSolver(Solver):
             expanded_state = heapq.heappop(open_list)
             current_f_cost, current_state_parent, current_state = expanded_state
             closed_list[current_state] = current_state_parent  # add the current state to the closed list
-            successors = self.grid.get_successors(current_state, obstacles=self.obstacles)
+            successors = self.prune_successors(current_state,
+                                               self.grid.get_successors(current_state, obstacles=self.obstacles))
             print('Current state: ', current_state)
             if not successors:
                 # print('Expanding a state with no successors! Current state: ', current_state)
@@ -177,6 +268,8 @@ class GridSolver(Solver):
         :return: either: a tuple of a list of states (locations on the grid) and the cost of the path
                      or: ValueError, if a path is impossible (unreachable goal, detected by re-expansion of states)
         """
+        if self.unreachable():
+            return False, False
         # Initialize the current state to the initial state
         current_state = self.grid.get_start()
         # Initialize the current g-cost to 0
@@ -187,7 +280,7 @@ class GridSolver(Solver):
         closed_list = dict()  # We need to store the parent! Sets do not suffice. Keys -> states, Values -> parents
         # Initialize the open list to contain the initial state; we use heapq to implement the priority queue
         open_list = []
-        heapq.heappush(open_list, (current_f_cost, current_g_cost, current_state))
+        heapq.heappush(open_list, (current_f_cost, current_g_cost, None, current_state))
         max_iter = 100
         iteration = 0
         while len(open_list) > 0 \
@@ -197,7 +290,8 @@ class GridSolver(Solver):
             expanded_state = heapq.heappop(open_list)
             current_f_cost, current_g_cost, current_state_parent, current_state = expanded_state
             closed_list[current_state] = current_state_parent  # add the current state to the closed list
-            successors = self.grid.get_successors(current_state, obstacles=self.obstacles)
+            successors = self.prune_successors(current_state,
+                                               self.grid.get_successors(current_state, obstacles=self.obstacles))
             print('Current state: ', current_state)
             if not successors:
                 # print('Expanding a state with no successors! Current state: ', current_state)
@@ -259,6 +353,8 @@ class GridSolver(Solver):
         :return: either: a tuple of a list of states (locations on the grid) and the cost of the path
                      or: ValueError, if a path is impossible (unreachable goal, detected by re-expansion of states)
         """
+        if self.unreachable():
+            return False, False
 
         # Initialize the current state to the initial state
         current_state = self.grid.get_start()
@@ -276,7 +372,7 @@ class GridSolver(Solver):
         closed_list = dict()
         # Initialize the open list to contain the initial state; we use heapq to implement the priority queue
         open_list = []
-        heapq.heappush(open_list, (current_f_cost, current_g_cost, current_state))
+        heapq.heappush(open_list, (current_f_cost, current_g_cost, None, current_state))
         max_iter = 100
         iteration = 0
 
@@ -287,7 +383,8 @@ class GridSolver(Solver):
             expanded_state = heapq.heappop(open_list)
             current_f_cost, current_g_cost, current_state_parent, current_state = expanded_state
             closed_list[current_state] = current_state_parent  # add the current state to the closed list
-            successors = self.grid.get_successors(current_state, obstacles=self.obstacles)
+            successors = self.prune_successors(current_state,
+                                               self.grid.get_successors(current_state, obstacles=self.obstacles))
             print('Current state: ', current_state)
             if not successors:
                 # print('Expanding a state with no successors! Current state: ', current_state)
@@ -322,6 +419,8 @@ class GridSolver(Solver):
         :return: either: a tuple of a list of states (locations on the grid) and the cost of the path
                      or: ValueError, if a path is impossible (unreachable goal, detected by re-expansion of states)
         """
+        if self.unreachable():
+            return False, False
         # Initialize the current state to the initial state
         current_state = self.grid.get_start()
         # Initialize the current g-cost to 0
@@ -332,7 +431,7 @@ class GridSolver(Solver):
         closed_list = dict()  # We need to store the parent! Sets do not suffice. Keys -> states, Values -> parents
         # Initialize the open list to contain the initial state; we use heapq to implement the priority queue
         open_list = []
-        heapq.heappush(open_list, (current_f_cost, current_g_cost, current_state))
+        heapq.heappush(open_list, (current_f_cost, current_g_cost, None, current_state))
         max_iter = 100
         iteration = 0
         while len(open_list) > 0 \
@@ -342,7 +441,8 @@ class GridSolver(Solver):
             expanded_state = heapq.heappop(open_list)
             current_f_cost, current_g_cost, current_state_parent, current_state = expanded_state
             closed_list[current_state] = current_state_parent  # add the current state to the closed list
-            successors = self.grid.get_successors(current_state, obstacles=self.obstacles)
+            successors = self.prune_successors(current_state,
+                                               self.grid.get_successors(current_state, obstacles=self.obstacles))
             print('Current state: ', current_state)
             if not successors:
                 # print('Expanding a state with no successors! Current state: ', current_state)
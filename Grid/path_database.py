@@ -0,0 +1,184 @@
+import multiprocessing
+import numpy as np
+from Grid.grid import Grid, grid_actions, grid_action_names
+
+NO_MOVE = 255  # first move towards a target that cannot be reached
+
+grid_moves = np.array(list(grid_actions.values()), dtype=np.int64)  # (dx, dy) of each move id
+
+
+def first_move_row(free, source):
+    """
+    Compute the first move of a shortest path from source to every cell with a breadth-first wavefront: each step
+      expands the whole frontier at once, and every newly reached cell inherits the first move of the frontier cell it
+      was reached from.
+    :param free:   np.ndarray of bool with shape (height, width), True where a cell is free
+    :param source: int, flat index (y * width + x) of the source cell
+    :return:       np.ndarray of uint8 of length width * height, a move id (index in grid_action_names) per target,
+                   NO_MOVE for the source itself, obstacles and unreachable cells
+    """
+    height, width = free.shape
+    first_move = np.full(height * width, NO_MOVE, dtype=np.uint8)
+    if not free.flat[source]:
+        return first_move
+    visited = ~free.ravel()
+    visited[source] = True
+    frontier = np.array([source], dtype=np.int64)
+    frontier_moves = None  # the first expansion assigns the move ids themselves
+    while frontier.size > 0:
+        x = frontier % width
+        y = frontier // width
+        reached = []
+        reached_moves = []
+        for move_id, (dx, dy) in enumerate(grid_moves):
+            inside = (x + dx >= 0) & (x + dx < width) & (y + dy >= 0) & (y + dy < height)
+            neighbours = frontier[inside] + dy * width + dx
+            new = ~visited[neighbours]
+            reached.append(neighbours[new])
+            if frontier_moves is None:
+                reached_moves.append(np.full(int(new.sum()), move_id, dtype=np.uint8))
+            else:
+                reached_moves.append(frontier_moves[inside][new])
+        reached = np.concatenate(reached)
+        reached, first_index = np.unique(reached, return_index=True)  # ties go to the lowest move id
+        frontier_moves = np.concatenate(reached_moves)[first_index]
+        visited[reached] = True
+        first_move[reached] = frontier_moves
+        frontier = reached
+    return first_move
+
+
+def compress_row(row, free):
+    """
+    Run-length compress a first-move row; obstacles are "don't care" targets and simply extend the previous run.
+    :param row:  np.ndarray of uint8, the first move towards every target
+    :param free: np.ndarray of bool (flattened), True where a cell is free
+    :return:     tuple of np.ndarray, the first target of every run (uint32) and the move of every run (uint8)
+    """
+    row = row.copy()
+    blocked = ~free
+    if blocked.all():
+        return np.zeros(1, dtype=np.uint32), np.full(1, NO_MOVE, dtype=np.uint8)
+    # forward-fill obstacles with the last known move (a leading obstacle takes the first free cell's move)
+    index = np.where(blocked, 0, np.arange(row.size))
+    np.maximum.accumulate(index, out=index)
+    first_free = int(np.argmax(~blocked))
+    index[:first_free] = first_free
+    row = row[index]
+    run_starts = np.concatenate(([0], np.flatnonzero(row[1:] != row[:-1]) + 1)).astype(np.uint32)
+    return run_starts, row[run_starts]
+
+
+_worker_free = None
+
+
+def _init_worker(free):
+    global _worker_free
+    _worker_free = free
+
+
+def _compress_sources(sources):
+    free = _worker_free.ravel()
+    return [compress_row(first_move_row(_worker_free, source), free) for source in sources]
+
+
+class CompressedPathDatabase:
+    def __init__(self, grid: Grid, obstacles=None):
+        """
+        Compressed path database (CPD) of a static grid: for every source cell, the first move of a shortest path
+          towards every target, run-length compressed over the targets in row-major order. Once built, a path is
+          extracted with one table lookup per step and no search.
+        :param grid:      Grid, the grid
+        :param obstacles: set (of tuples), locations of obstacles; None when the database is loaded from a file
+        """
+        self.grid = grid
+        self.width = grid.grid_x_length
+        self.height = grid.grid_y_length
+        self.free = None if obstacles is None else ~grid.occupancy_grid(obstacles)
+        self.offsets = None      # runs of source s are run_starts[offsets[s]:offsets[s + 1]]
+        self.run_starts = None
+        self.run_moves = None
+
+    def build(self, processes=None, chunk_size=64):
+        """
+        Build the database in parallel over the sources
+        :param processes:  int, number of worker processes (None uses all cores, 1 builds in this process)
+        :param chunk_size: int, number of sources handed to a worker at once
+        :return:           True
+        """
+        if self.free is None:
+            raise ValueError('Obstacles are required to build a path database')
+        cell_count = self.width * self.height
+        chunks = [range(start, min(start + chunk_size, cell_count)) for start in range(0, cell_count, chunk_size)]
+        if processes == 1:
+            _init_worker(self.free)
+            results = [_compress_sources(chunk) for chunk in chunks]
+        else:
+            with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(self.free,)) as pool:
+                results = pool.map(_compress_sources, chunks)
+        rows = [row for result in results for row in result]
+        lengths = np.array([len(run_starts) for run_starts, _ in rows], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.run_starts = np.concatenate([run_starts for run_starts, _ in rows])
+        self.run_moves = np.concatenate([run_moves for _, run_moves in rows])
+        return True
+
+    def first_move(self, state, target):
+        """
+        Look up the first move of a shortest path with a binary search over the runs of the source
+        :param state:  tuple, the current x-y location
+        :param target: tuple, the target x-y location
+        :return:       int, the move id (index in grid_action_names), or NO_MOVE if the target is unreachable
+        """
+        source = state[1] * self.width + state[0]
+        begin, end = self.offsets[source], self.offsets[source + 1]
+        run = np.searchsorted(self.run_starts[begin:end], target[1] * self.width + target[0], side='right') - 1
+        return int(self.run_moves[begin + run])
+
+    def extract_path(self, start, goal):
+        """
+        Extract a shortest path by following first moves
+        :param start: tuple, the start x-y location
+        :param goal:  tuple, the goal x-y location
+        :return:      either: a list of locations from start to goal
+                          or: False, if the goal cannot be reached
+        """
+        if self.free is None or not self.free[start[1], start[0]] or not self.free[goal[1], goal[0]]:
+            return False
+        path = [start]
+        current_state = start
+        while current_state != goal:
+            move = self.first_move(current_state, goal)
+            if move == NO_MOVE:
+                return False
+            dx, dy = grid_actions[grid_action_names[move]]
+            current_state = (current_state[0] + dx, current_state[1] + dy)
+            path.append(current_state)
+        return path
+
+    def size_in_bytes(self):
+        return self.offsets.nbytes + self.run_starts.nbytes + self.run_moves.nbytes
+
+    def export_db(self, filename):
+        np.savez(filename, width=self.width, height=self.height, free=self.free,
+                 offsets=self.offsets, run_starts=self.run_starts, run_moves=self.run_moves)
+        return True
+
+    @classmethod
+    def load(cls, filename, grid: Grid):
+        """
+        Load a database written by export_db
+        :param filename: str, name of the .npz file
+        :param grid:     Grid, the grid the database was built for
+        :return:         CompressedPathDatabase
+        """
+        data = np.load(filename)
+        if int(data['width']) != grid.grid_x_length or int(data['height']) != grid.grid_y_length:
+            raise ValueError('Path database of a {}x{} grid does not match the grid'.format(int(data['width']),
+                                                                                           int(data['height'])))
+        database = cls(grid)
+        database.free = data['free']
+        database.offsets = data['offsets']
+        database.run_starts = data['run_starts']
+        database.run_moves = data['run_moves']
+        return database
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import time
+from cube import RubiksCube
+from cube_solver import RubiksCubeSolver
+
+_worker = {}  # the solver of a worker process, inherited from the parent when the pool forks (see BatchCubeSolver)
+
+
+def _init_worker(solver):
+    _worker['solver'] = solver
+
+
+def _solve_scramble(task):
+    # solve one scramble with the solver of the worker, and return the solution with its statistics
+    index, scramble, max_expansions, time_limit = task
+    solver = _worker['solver']
+    cube = RubiksCube()
+    for action in scramble:
+        cube.twist(action)
+    start_time = time.perf_counter()
+    if isinstance(solver, RubiksCubeSolver):
+        h_cost = solver.heuristic(cube)
+        actions, cost, expansions = solver.iterative_deepening_a_star(cube, max_expansions)
+    else:
+        h_cost, expansions = None, None
+        actions, cost, _ = solver.solve(cube, time_limit)
+    return {'index': index, 'scramble': scramble, 'actions': actions, 'cost': cost, 'h_cost': h_cost,
+            'expansions': expansions, 'seconds': time.perf_counter() - start_time, 'pid': os.getpid()}
+
+
+class BatchCubeSolver:
+    def __init__(self, solver, processes=None):
+        """
+        Solve many scrambles with a pool of worker processes that share one copy of the tables: the pool is forked
+          after the solver is set up, so the workers inherit its move tables copy-on-write (NumPy arrays, which the
+          searches only read, so their pages stay shared), and pattern databases loaded with PatternDataBase.load (and
+          the pruning tables of TwoPhaseSolver) are read-only memory maps whose pages are shared through the page cache.
+          Tables turned into Python objects (e.g. lists) would not stay shared, as reading them writes reference counts.
+          Each worker adds its interpreter and its search (about 3 MB) to the memory of the tables. Needs the 'fork'
+          start method (Linux, macOS).
+        :param solver:    RubiksCubeSolver (optimal) or TwoPhaseSolver (near-optimal), with its tables loaded
+        :param processes: int, number of worker processes (None uses all cores, 1 solves in this process)
+        """
+        self.solver = solver
+        self.processes = processes
+
+    def solve(self, scrambles, max_expansions=None, time_limit=1.0, chunk_size=1):
+        """
+        Hand the scrambles out to the workers and stream the solutions back in the order they finish
+        :param scrambles:      list, action sequences (e.g. from RubiksCube.generate_scramble) applied to a solved cube
+        :param max_expansions: int, maximum number of expansions of a RubiksCubeSolver search, or None for no limit
+        :param time_limit:     float, number of seconds of a TwoPhaseSolver search
+        :param chunk_size:     int, number of scrambles handed to a worker at once
+        :return:               generator of dict, per solve: the index of the scramble, the scramble, the actions
+                               (False if the search failed), their cost, the heuristic value of the scramble and the
+                               number of expansions (RubiksCubeSolver), the seconds and the pid of the worker
+        """
+        tasks = [(index, [str(action) for action in scramble], max_expansions, time_limit)
+                 for index, scramble in enumerate(scrambles)]
+        if self.processes == 1:
+            _init_worker(self.solver)
+            for task in tasks:
+                yield _solve_scramble(task)
+            return
+        context = multiprocessing.get_context('fork')
+        with context.Pool(self.processes, initializer=_init_worker, initargs=(self.solver,)) as pool:
+            for result in pool.imap_unordered(_solve_scramble, tasks, chunk_size):
+                yield result
+
+    @staticmethod
+    def summary(results, verbose=True):
+        """
+        :param results: list of dict, the results of solve
+        :param verbose: bool, whether to print the summary
+        :return:        dict, the number of scrambles and of solved ones, the average cost, expansions and seconds of
+                        the solved ones, and the total seconds of the searches
+        """
+        solved = [result for result in results if result['actions'] is not False]
+        report = {'scrambles': len(results), 'solved': len(solved),
+                  'cost': sum(result['cost'] for result in solved) / max(len(solved), 1),
+                  'expansions': sum(result['expansions'] or 0 for result in solved) / max(len(solved), 1),
+                  'seconds': sum(result['seconds'] for result in solved) / max(len(solved), 1),
+                  'total_seconds': sum(result['seconds'] for result in results)}
+        if verbose:
+            print('Solved {} of {} scrambles; average cost {:.2f}, expansions {:.1f}, seconds {:.4f}'.format(
+                report['solved'], report['scrambles'], report['cost'], report['expansions'], report['seconds']))
+        return report
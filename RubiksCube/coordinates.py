@@ -0,0 +1,338 @@
+import itertools
+import math
+import os
+import numpy as np
+import ranking
+from cube import RubiksCube, cube_action_names, move_tables, FR, BR, BL, FL, symmetry_count, symmetry_mirrors, \
+    symmetry_corner_maps, symmetry_corner_inverses
+
+#  Move data indexed by move id (see cube_action_names), as (18, 8) and (18, 12) arrays; a move replaces the array of
+#   cubies by array[permutation] and adds delta to the rotations (see RubiksCube.twist)
+corner_permutations = np.array([move_tables[action][0] for action in cube_action_names], dtype=np.int64)
+corner_deltas = np.array([move_tables[action][1] for action in cube_action_names], dtype=np.int64)
+edge_permutations = np.array([move_tables[action][2] for action in cube_action_names], dtype=np.int64)
+edge_deltas = np.array([move_tables[action][3] for action in cube_action_names], dtype=np.int64)
+#  The inverse permutation gives the new location of the edge cubie at every old location
+edge_destinations = np.argsort(edge_permutations, axis=1)
+#  Moves of the subgroup <U, D, R2, L2, F2, B2> (phase 2 of the two-phase solver), which keep the UD-slice edges in
+#   the slice and the other edges out of it, and do not change any orientation
+phase2_move_ids = tuple(cube_action_names.index(action) for action in ('U', 'u', 'U2', 'D', 'd', 'D2',
+                                                                        'R2', 'L2', 'F2', 'B2'))
+
+
+def load_or_build(filename, build):
+    if os.path.exists(filename):
+        return np.load(filename)
+    table = build()
+    np.save(filename, table)
+    return table
+
+
+class Coordinate:
+    """
+    A coordinate is an int that describes one aspect of the cube (e.g. the orientations of the corners), so that a
+      search can run on tuples of small ints: a move is one lookup per coordinate in a move table of shape
+      (size, 18), mapping (coordinate, move id) to the coordinate after the move.
+    Subclasses define name, size, solved, from_cube, unrank_many (ranks -> cubies, in any form) and move_unranked
+      (cubies, move id -> ranks after the move); a coordinate that is only defined in a subgroup sets move_ids to the
+      moves of the subgroup, and column j of its move table is then the move move_ids[j].
+    """
+    name = None
+    size = None
+    solved = 0
+    move_ids = tuple(range(len(cube_action_names)))
+
+    def from_cube(self, cube: RubiksCube):
+        raise NotImplementedError('Must provide from_cube')
+
+    def unrank_many(self, ranks):
+        raise NotImplementedError('Must provide unrank_many')
+
+    def move_unranked(self, unranked, move_id):
+        raise NotImplementedError('Must provide move_unranked')
+
+    def conjugate_unranked(self, unranked, symmetry):
+        raise NotImplementedError('Must provide conjugate_unranked')
+
+    def move_many(self, ranks, move_id):
+        """
+        :param ranks:   np.ndarray of int64, coordinates
+        :param move_id: int, index of the action in cube_action_names
+        :return:        np.ndarray of int64, the coordinates after the move
+        """
+        return self.move_unranked(self.unrank_many(ranks), move_id)
+
+    def dtype(self):
+        return np.uint16 if self.size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+    def build_move_table(self, chunk_size=1 << 20):
+        """
+        :param chunk_size: int, number of coordinates moved at once
+        :return:           np.ndarray of shape (size, len(move_ids)), the coordinate after every move
+        """
+        table = np.empty((self.size, len(self.move_ids)), dtype=self.dtype())
+        for start in range(0, self.size, chunk_size):
+            unranked = self.unrank_many(np.arange(start, min(start + chunk_size, self.size), dtype=np.int64))
+            for column, move_id in enumerate(self.move_ids):
+                table[start:start + chunk_size, column] = self.move_unranked(unranked, move_id)
+        return table
+
+    def build_symmetry_table(self):
+        """
+        Only for coordinates whose conjugates (see cube.conjugates) depend on the coordinate alone
+        :return: np.ndarray of shape (size, 16), the coordinate of the conjugate by every symmetry
+        """
+        table = np.empty((self.size, symmetry_count), dtype=self.dtype())
+        unranked = self.unrank_many(np.arange(self.size, dtype=np.int64))
+        for symmetry in range(symmetry_count):
+            table[:, symmetry] = self.conjugate_unranked(unranked, symmetry)
+        return table
+
+    def load_symmetry_table(self, directory='.'):
+        return load_or_build(os.path.join(directory, 'cube_symmetry_table_{}.npy'.format(self.name)),
+                             self.build_symmetry_table)
+
+    def filename(self, directory='.'):
+        return os.path.join(directory, 'cube_move_table_{}.npy'.format(self.name))
+
+    def load_move_table(self, directory='.'):
+        """
+        Load the move table from its file in directory, and build and save it first if it does not exist yet
+        :param directory: str, directory of the cached move tables
+        :return:          np.ndarray of shape (size, len(move_ids))
+        """
+        return load_or_build(self.filename(directory), self.build_move_table)
+
+
+class CornerPermutation(Coordinate):
+    name = 'corner_permutation'
+    size = math.factorial(8)
+
+    def from_cube(self, cube: RubiksCube):
+        return ranking.rank_partial_permutation(list(cube.corner_position), 8)
+
+    def unrank_many(self, ranks):
+        return ranking.unrank_many(ranks, 8, 8, validate=False)
+
+    def move_unranked(self, positions, move_id):
+        return ranking.rank_many(positions[:, corner_permutations[move_id]], 8, validate=False)
+
+    def conjugate_unranked(self, positions, symmetry):
+        return ranking.rank_many(symmetry_corner_maps[symmetry][positions[:, symmetry_corner_inverses[symmetry]]], 8,
+                                 validate=False)
+
+
+class Orientation(Coordinate):
+    """
+    Orientations of the corners (base 3) or edges (base 2); the rotation of the last cubie is implied by the others
+    """
+    def __init__(self, base, length):
+        self.base = base
+        self.length = length
+        self.size = base ** (length - 1)
+
+    def rank_many(self, rotations):
+        return ranking.rank_orientation_many(rotations, self.base)
+
+    def unrank_many(self, ranks):
+        return ranking.unrank_orientation_many(ranks, self.base, self.length)
+
+
+class CornerOrientation(Orientation):
+    name = 'corner_orientation'
+
+    def __init__(self):
+        super().__init__(3, 8)
+
+    def from_cube(self, cube: RubiksCube):
+        return ranking.rank_orientation(list(cube.corner_rotation), 3)
+
+    def move_unranked(self, rotations, move_id):
+        return self.rank_many((rotations[:, corner_permutations[move_id]] + corner_deltas[move_id]) % 3)
+
+    def conjugate_unranked(self, rotations, symmetry):
+        rotations = rotations[:, symmetry_corner_inverses[symmetry]]
+        return self.rank_many(-rotations % 3 if symmetry_mirrors[symmetry] else rotations)
+
+
+class EdgeOrientation(Orientation):
+    name = 'edge_orientation'
+
+    def __init__(self):
+        super().__init__(2, 12)
+
+    def from_cube(self, cube: RubiksCube):
+        return ranking.rank_orientation(list(cube.edge_rotation), 2)
+
+    def move_unranked(self, rotations, move_id):
+        return self.rank_many(rotations[:, edge_permutations[move_id]] ^ edge_deltas[move_id])
+
+
+class EdgeSubset(Coordinate):
+    def __init__(self, edges, orientation=False):
+        """
+        Locations of a subset of the edge cubies, ranked as a k-permutation of the 12 edge positions; with orientation,
+          the rotations of the subset are appended as k more bits: rank = location rank * 2^k + rotation bits.
+        The subsets (0, ..., 5) and (6, ..., 11) together determine the permutation of all edges.
+        :param edges:       tuple of int, the edge cubies (e.g. (FR, BR, BL, FL) for the UD-slice)
+        :param orientation: bool, whether the rotations of the subset are part of the coordinate
+        """
+        self.edges = tuple(edges)
+        self.orientation = orientation
+        self.k = len(self.edges)
+        self.size = math.factorial(12) // math.factorial(12 - self.k) * (2 ** self.k if orientation else 1)
+        self.name = 'edges_{}{}'.format('-'.join(str(edge) for edge in self.edges), '_rot' if orientation else '')
+        self.solved = self.rank_many(np.array([self.edges]), np.zeros((1, self.k), dtype=np.int64))[0]
+
+    def rank_many(self, locations, rotations=None):
+        """
+        :param locations: np.ndarray of shape (N, k), the position of every edge of the subset
+        :param rotations: np.ndarray of shape (N, k), the rotation of every edge of the subset (with orientation)
+        :return:          np.ndarray of int64 of length N
+        """
+        ranks = ranking.rank_many(locations, 12, validate=False)
+        if self.orientation:
+            ranks = (ranks << self.k) + rotations.astype(np.int64) @ (1 << np.arange(self.k, dtype=np.int64))
+        return ranks
+
+    def unrank_many(self, ranks):
+        """
+        :return: tuple of np.ndarray of shape (N, k), the locations and rotations (None without orientation)
+        """
+        ranks = np.asarray(ranks, dtype=np.int64)
+        if not self.orientation:
+            return ranking.unrank_many(ranks, 12, self.k, validate=False), None
+        rotations = (ranks[:, None] >> np.arange(self.k, dtype=np.int64)) & 1
+        return ranking.unrank_many(ranks >> self.k, 12, self.k, validate=False), rotations
+
+    def from_cube(self, cube: RubiksCube):
+        rank = ranking.rank_edges(cube.edge_position, cube.edge_rotation, self.edges)
+        return rank if self.orientation else rank >> self.k
+
+    def move_unranked(self, unranked, move_id):
+        locations, rotations = unranked
+        destinations = edge_destinations[move_id][locations]
+        if self.orientation:
+            rotations = rotations ^ edge_deltas[move_id][destinations]
+        return self.rank_many(destinations, rotations)
+
+    def build_flip_table(self):
+        """
+        The rotations of the subset after a move only depend on its locations, so the coordinate with orientation can
+          be moved with the move table of the locations and a flip table: (locations << k | bits) moves to
+          (move_table[locations, move] << k | bits ^ flip_table[locations, move]).
+        :return: np.ndarray of uint8 of shape (location ranks, 18), the bits of the edges of the subset that flip
+        """
+        locations = ranking.unrank_many(np.arange(math.factorial(12) // math.factorial(12 - self.k)), 12, self.k,
+                                        validate=False)
+        table = np.empty((len(locations), len(cube_action_names)), dtype=np.uint8)
+        bits = 1 << np.arange(self.k, dtype=np.int64)
+        for move_id in range(len(cube_action_names)):
+            table[:, move_id] = edge_deltas[move_id][edge_destinations[move_id][locations]] @ bits
+        return table
+
+    def load_flip_table(self, directory='.'):
+        return load_or_build(os.path.join(directory, 'cube_flip_table_{}.npy'.format(self.name.replace('_rot', ''))),
+                             self.build_flip_table)
+
+
+class UDSlice(Coordinate):
+    """
+    Locations of the four UD-slice edges (FR, BR, BL, FL) as a combination of 4 of the 12 edge positions, ignoring their
+      order: 495 ranks, in the lexicographic order of the combinations. The edges are in the slice iff the coordinate
+      is solved, which phase 1 of the two-phase solver needs (with the corner and edge orientations).
+    """
+    name = 'ud_slice'
+
+    def __init__(self):
+        self.combinations = np.array(list(itertools.combinations(range(12), 4)), dtype=np.int64)
+        self.size = len(self.combinations)
+        #  rank of every 12-bit mask of 4 locations
+        self.mask_ranks = np.full(1 << 12, -1, dtype=np.int64)
+        self.mask_ranks[(1 << self.combinations).sum(axis=1)] = np.arange(self.size)
+        self.solved = self.rank_many(np.array([[FR, BR, BL, FL]]))[0]
+
+    def rank_many(self, locations):
+        return self.mask_ranks[(1 << locations).sum(axis=1)]
+
+    def from_cube(self, cube: RubiksCube):
+        return self.rank_many(np.flatnonzero(cube.edge_position >= FR)[None, :])[0]
+
+    def unrank_many(self, ranks):
+        return self.combinations[ranks]
+
+    def move_unranked(self, locations, move_id):
+        return self.rank_many(edge_destinations[move_id][locations])
+
+
+class UDEdgePermutation(Coordinate):
+    """
+    Permutation of the 8 edges of the U and D faces, only defined (and moved) in the phase 2 subgroup
+    """
+    name = 'ud_edge_permutation'
+    size = math.factorial(8)
+    move_ids = phase2_move_ids
+
+    def from_cube(self, cube: RubiksCube):
+        return ranking.rank_partial_permutation(list(cube.edge_position[:FR]), 8)
+
+    def unrank_many(self, ranks):
+        return ranking.unrank_many(ranks, 8, 8, validate=False)
+
+    def move_unranked(self, positions, move_id):
+        return ranking.rank_many(positions[:, edge_permutations[move_id][:FR]], 8, validate=False)
+
+
+class SlicePermutation(Coordinate):
+    """
+    Permutation of the 4 UD-slice edges within the slice, only defined (and moved) in the phase 2 subgroup
+    """
+    name = 'slice_permutation'
+    size = math.factorial(4)
+    move_ids = phase2_move_ids
+
+    def from_cube(self, cube: RubiksCube):
+        return ranking.rank_partial_permutation([int(edge) - FR for edge in cube.edge_position[FR:]], 4)
+
+    def unrank_many(self, ranks):
+        return ranking.unrank_many(ranks, 4, 4, validate=False)
+
+    def move_unranked(self, positions, move_id):
+        return ranking.rank_many(positions[:, edge_permutations[move_id][FR:] - FR], 4, validate=False)
+
+
+class CubeCoordinates:
+    def __init__(self, coordinates=None, directory='.'):
+        """
+        A cube as a tuple of coordinates, moved with one move table lookup per coordinate; by default the corner
+          permutation and orientation, the edge orientation and two halves of the edge permutation, which together
+          describe the whole cube.
+        :param coordinates: list of Coordinate
+        :param directory:   str, directory of the cached move tables (see Coordinate.load_move_table)
+        """
+        if coordinates is None:
+            coordinates = [CornerPermutation(), CornerOrientation(), EdgeOrientation(),
+                           EdgeSubset(range(6)), EdgeSubset(range(6, 12))]
+        self.coordinates = coordinates
+        self.tables = [coordinate.load_move_table(directory) for coordinate in coordinates]
+        self.solved = tuple(int(coordinate.solved) for coordinate in coordinates)
+
+    def from_cube(self, cube: RubiksCube):
+        return tuple(int(coordinate.from_cube(cube)) for coordinate in self.coordinates)
+
+    def twist(self, state, move_id):
+        """
+        :param state:   tuple of int, the coordinates
+        :param move_id: int, index of the action in cube_action_names
+        :return:        tuple of int, the coordinates after the move
+        """
+        return tuple(int(table[coordinate, move_id]) for table, coordinate in zip(self.tables, state))
+
+    def get_successors(self, state):
+        """
+        :return: list of (move id, coordinates) tuples
+        """
+        return [(move_id, self.twist(state, move_id)) for move_id in range(len(cube_action_names))]
+
+    def is_solved(self, state):
+        return state == self.solved
@@ -1,6 +1,6 @@
-from copy import deepcopy
 import numpy as np
 from state_space import StateSpace
+from move_pruning import MovePruning, START, PRUNED
 from random import randint, choice
 
 URF = 0
@@ -25,6 +25,136 @@ BR = 9
 BL = 10
 FL = 11
 
+#  Note that we do not include the middle layer moves like M, E, S, etc. (see RubiksCube.__init__); a move id is the
+#   index of the action in this tuple (e.g. in coordinate move tables and move pruning)
+cube_action_names = ('F', 'B', 'L', 'R', 'U', 'D',
+                     'f', 'b', 'l', 'r', 'u', 'd',
+                     'F2', 'B2', 'L2', 'R2', 'U2', 'D2')
+
+#  Clockwise quarter turns of the faces: the cubie at position cycle[i] comes from position cycle[i + 1] (cyclically),
+#   and its rotation increases by delta[i]; only the F and B turns flip the edges.
+corner_cycles = {'U': ((URF, URB, ULB, ULF), (0, 0, 0, 0)),
+                 'D': ((DLF, DLB, DRB, DRF), (0, 0, 0, 0)),
+                 'F': ((URF, ULF, DLF, DRF), (2, 1, 2, 1)),
+                 'B': ((URB, DRB, DLB, ULB), (1, 2, 1, 2)),
+                 'R': ((URF, DRF, DRB, URB), (1, 2, 1, 2)),
+                 'L': ((ULF, ULB, DLB, DLF), (2, 1, 2, 1))}
+edge_cycles = {'U': ((UF, UR, UB, UL), (0, 0, 0, 0)),
+               'D': ((DL, DB, DR, DF), (0, 0, 0, 0)),
+               'F': ((UF, FL, DF, FR), (1, 1, 1, 1)),
+               'B': ((BL, UB, BR, DB), (1, 1, 1, 1)),
+               'R': ((UR, FR, DR, BR), (0, 0, 0, 0)),
+               'L': ((UL, BL, DL, FL), (0, 0, 0, 0))}
+
+
+def cycle_move(cycle, delta, size):
+    """
+    :return: tuple of np.ndarray, the permutation (new position i holds the cubie of old position permutation[i]) and
+             the rotation delta of every position
+    """
+    permutation = np.arange(size)
+    rotation_delta = np.zeros(size, dtype=np.int8)
+    for i, position in enumerate(cycle):
+        permutation[position] = cycle[(i + 1) % len(cycle)]
+        rotation_delta[position] = delta[i]
+    return permutation, rotation_delta
+
+
+def compose_moves(first, second):
+    """
+    Compose two moves given as (corner permutation, corner delta, edge permutation, edge delta): applying the result
+      is the same as applying first and then second
+    """
+    corner_permutation = first[0][second[0]]
+    corner_delta = (first[1][second[0]] + second[1]) % 3
+    edge_permutation = first[2][second[2]]
+    edge_delta = (first[3][second[2]] + second[3]) % 2
+    return corner_permutation, corner_delta, edge_permutation, edge_delta
+
+
+#  action -> (corner permutation, corner delta, edge permutation, edge delta); a lowercase action is three quarter
+#   turns, and an action with a 2 is two
+move_tables = {}
+for face in corner_cycles:
+    quarter_turn = cycle_move(*corner_cycles[face], 8) + cycle_move(*edge_cycles[face], 12)
+    move_tables[face] = quarter_turn
+    move_tables[face + '2'] = compose_moves(quarter_turn, quarter_turn)
+    move_tables[face.lower()] = compose_moves(move_tables[face + '2'], quarter_turn)
+
+#  Symmetries of the cube that keep the U-D axis (16 of the 48): a symmetry maps every face to a face, and is a product
+#   U4^a * F2^b * LR2^c of the quarter turn of the whole cube about the U-D axis, the half turn about the F-B axis and
+#   the reflection through the plane between the L and R faces. Conjugating a state c by a symmetry s (s c s^-1)
+#   moves the cubie at position i to position map[i] and relabels it the same way, keeps the corner rotations (but
+#   negates them under a reflection, which reverses clockwise), and flips the edges that move between the F-B and L-R
+#   axes (the slice positions and cubies under odd powers of U4), since the reference facelet of an edge is then on
+#   the other axis.
+corner_names = ('URF', 'URB', 'ULB', 'ULF', 'DRF', 'DRB', 'DLB', 'DLF')
+edge_names = ('UF', 'UR', 'UB', 'UL', 'DF', 'DR', 'DB', 'DL', 'FR', 'BR', 'BL', 'FL')
+symmetry_generators = {'U4': {'U': 'U', 'D': 'D', 'F': 'L', 'L': 'B', 'B': 'R', 'R': 'F'},
+                       'F2': {'U': 'D', 'D': 'U', 'F': 'F', 'B': 'B', 'L': 'R', 'R': 'L'},
+                       'LR2': {'U': 'U', 'D': 'D', 'F': 'F', 'B': 'B', 'L': 'R', 'R': 'L'}}
+
+
+def face_map_positions(face_map, names):
+    """
+    :return: list of int, the position that every position (given by the faces in its name) is mapped to
+    """
+    index = {frozenset(name): position for position, name in enumerate(names)}
+    return [index[frozenset(face_map[face] for face in name)] for name in names]
+
+
+symmetry_face_maps = []  # face -> face of every symmetry
+symmetry_mirrors = []  # whether the symmetry is a reflection
+for u4_power in range(4):
+    for f2_power in range(2):
+        for lr2_power in range(2):
+            face_map = {face: face for face in 'UDFBLR'}
+            for generator, power in (('U4', u4_power), ('F2', f2_power), ('LR2', lr2_power)):
+                for _ in range(power):
+                    face_map = {face: symmetry_generators[generator][image] for face, image in face_map.items()}
+            symmetry_face_maps.append(face_map)
+            symmetry_mirrors.append(lr2_power == 1)
+symmetry_count = len(symmetry_face_maps)
+symmetry_mirrors = np.array(symmetry_mirrors)
+#  (16, 8) and (16, 12) arrays: the position every position is mapped to, and the inverse maps
+symmetry_corner_maps = np.array([face_map_positions(face_map, corner_names) for face_map in symmetry_face_maps])
+symmetry_edge_maps = np.array([face_map_positions(face_map, edge_names) for face_map in symmetry_face_maps])
+symmetry_corner_inverses = np.argsort(symmetry_corner_maps, axis=1)
+symmetry_edge_inverses = np.argsort(symmetry_edge_maps, axis=1)
+#  (16, 12) array: 1 for the slice positions (and cubies) of the symmetries that swap the F-B and L-R axes
+symmetry_edge_flips = np.array([[int(face_map['F'] in 'LR' and position >= FR) for position in range(12)]
+                                for face_map in symmetry_face_maps], dtype=np.int8)
+#  (16, 18) array: the move id of s m s^-1 for every symmetry s and move id m; a reflection reverses the direction of
+#   quarter turns
+symmetry_move_maps = np.array([[cube_action_names.index(
+    face_map[action[0].upper()] + action[1:] if action[0].isupper() != mirror or '2' in action else
+    face_map[action[0].upper()].lower()) for action in cube_action_names]
+    for face_map, mirror in zip(symmetry_face_maps, symmetry_mirrors)])
+
+
+def conjugates(corner_position, corner_rotation, edge_position, edge_rotation):
+    """
+    Conjugate a state by all 16 symmetries at once
+    :return: np.ndarray of int8 of shape (16, 40), the corner positions and rotations and the edge positions and
+             rotations of every conjugate (row 0 is the state itself)
+    """
+    corner_position, edge_position = np.asarray(corner_position), np.asarray(edge_position)
+    corners = np.take_along_axis(symmetry_corner_maps, corner_position[symmetry_corner_inverses], axis=1)
+    corner_rotations = np.asarray(corner_rotation)[symmetry_corner_inverses]
+    corner_rotations = np.where(symmetry_mirrors[:, None], -corner_rotations % 3, corner_rotations)
+    edges = np.take_along_axis(symmetry_edge_maps, edge_position[symmetry_edge_inverses], axis=1)
+    flips = np.asarray(edge_rotation) ^ symmetry_edge_flips ^ symmetry_edge_flips[:, edge_position]
+    edge_rotations = np.take_along_axis(flips, symmetry_edge_inverses, axis=1)
+    return np.concatenate((corners, corner_rotations, edges, edge_rotations), axis=1).astype(np.int8)
+
+
+def canonical_key(corner_position, corner_rotation, edge_position, edge_rotation):
+    """
+    :return: bytes, the same key for all conjugates of a state: the lexicographically smallest conjugate
+    """
+    states = conjugates(corner_position, corner_rotation, edge_position, edge_rotation)
+    return states[np.lexsort(states.T[::-1])[0]].tobytes()
+
 
 class RubiksCube(StateSpace):
 
@@ -46,9 +176,7 @@ class RubiksCube(StateSpace):
         #  Note that we do not include the middle layer moves like M, E, S, etc. because they are redundant
         #   with the other moves. For example, M is the same as R followed by L' and E is the same as U' followed
         #   by D. With this, we can reduce the branching factor from 27 to 18.
-        self.actions = ['F', 'B', 'L', 'R', 'U', 'D',
-                        'f', 'b', 'l', 'r', 'u', 'd',
-                        'F2', 'B2', 'L2', 'R2', 'U2', 'D2']
+        self.actions = list(cube_action_names)
         #  Then, since we should not move the same face twice in a row, we can remove the moves that are redundant
         #   with the previous move. With this, we can reduce the branching factor from 18 to 15.
 
@@ -83,7 +211,7 @@ class RubiksCube(StateSpace):
         # DEFINE ROTATION_90                           1
         # DEFINE ROTATION_180                          2
         self.corner_position = np.arange(8)
-        self.corner_rotation = np.zeros(8)  # rotations of first 7 corner cubies
+        self.corner_rotation = np.zeros(8, dtype=np.int8)  # rotations of first 7 corner cubies
         self.corner_map = {
             "0": "White_Green_Red",
             "1": "White_Red_Blue",
@@ -114,7 +242,7 @@ class RubiksCube(StateSpace):
         # DEFINE ROTATION_0                            0
         # DEFINE ROTATION_180                          1
         self.edge_position = np.arange(12)
-        self.edge_rotation = np.zeros(12)
+        self.edge_rotation = np.zeros(12, dtype=np.int8)
         self.edge_map = {
             "0": "White_Green",
             "1": "White_Red",
@@ -131,334 +259,19 @@ class RubiksCube(StateSpace):
         }
 
     def twist(self, action):
-        if action not in self.actions:
+        """
+        Twist the cube with one of the 18 actions; the cubies are gathered through the precomputed permutation of the
+          action, and the orientation delta of each destination position is added (mod 3 for corners, mod 2 for edges).
+        :param action: str, an action in self.actions
+        :return:       True
+        """
+        if action not in move_tables:
             raise Exception("Invalid action")
-
-        twist = 1
-        if action == action.lower():
-            twist = 3
-        elif '2' in action:
-            twist = 2
-        twist_count = range(twist)
-        action_upper = action.upper()
-
-        if 'U' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[URF]
-                self.corner_position[URF] = self.corner_position[URB]
-                self.corner_position[URB] = self.corner_position[ULB]
-                self.corner_position[ULB] = self.corner_position[ULF]
-                self.corner_position[ULF] = temp
-
-                temp_rot = self.corner_rotation[URF]
-                self.corner_rotation[URF] = self.corner_rotation[URB]
-                self.corner_rotation[URB] = self.corner_rotation[ULB]
-                self.corner_rotation[ULB] = self.corner_rotation[ULF]
-                self.corner_rotation[ULF] = temp_rot
-
-                temp = self.edge_position[UF]
-                self.edge_position[UF] = self.edge_position[UR]
-                self.edge_position[UR] = self.edge_position[UB]
-                self.edge_position[UB] = self.edge_position[UL]
-                self.edge_position[UL] = temp
-
-                temp_rot = self.edge_rotation[UF]
-                self.edge_rotation[UF] = self.edge_rotation[UR]
-                self.edge_rotation[UR] = self.edge_rotation[UB]
-                self.edge_rotation[UB] = self.edge_rotation[UL]
-                self.edge_rotation[UL] = temp_rot
-
-        #
-        # elif action == 'u':
-        #     temp = self.corner[ULF]
-        #     self.corner[ULF] = self.corner[ULB]
-        #     self.corner[ULB] = self.corner[URB]
-        #     self.corner[URB] = self.corner[URF]
-        #     self.corner[URF] = temp
-        #
-        #     temp = self.corner[UL]
-        #     self.corner[UL] = self.corner[UB]
-        #     self.corner[UB] = self.corner[UR]
-        #     self.corner[UR] = self.corner[UF]
-        #     self.corner[UF] = temp
-        #
-        # elif action == 'U2':
-        #     temp1 = self.corner[URF]
-        #     temp2 = self.corner[URB]
-        #     self.corner[URF] = self.corner[ULB]
-        #     self.corner[ULB] = temp1
-        #     self.corner[URB] = self.corner[ULF]
-        #     self.corner[ULF] = temp2
-        #
-        #     temp1 = self.corner[UF]
-        #     temp2 = self.corner[UR]
-        #     self.corner[UF] = self.corner[UB]
-        #     self.corner[UB] = temp1
-        #     self.corner[UR] = self.corner[UL]
-        #     self.corner[UL] = temp2
-
-        elif 'D' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[DLF]
-                self.corner_position[DLF] = self.corner_position[DLB]
-                self.corner_position[DLB] = self.corner_position[DRB]
-                self.corner_position[DRB] = self.corner_position[DRF]
-                self.corner_position[DRF] = temp
-                temp_rot = self.corner_rotation[DLF]
-                self.corner_rotation[DLF] = self.corner_rotation[DLB]
-                self.corner_rotation[DLB] = self.corner_rotation[DRB]
-                self.corner_rotation[DRB] = self.corner_rotation[DRF]
-                self.corner_rotation[DRF] = temp_rot
-
-                temp = self.edge_position[DL]
-                self.edge_position[DL] = self.edge_position[DB]
-                self.edge_position[DB] = self.edge_position[DR]
-                self.edge_position[DR] = self.edge_position[DF]
-                self.edge_position[DF] = temp
-                temp_rot = self.edge_rotation[DL]
-                self.edge_rotation[DL] = self.edge_rotation[DB]
-                self.edge_rotation[DB] = self.edge_rotation[DR]
-                self.edge_rotation[DR] = self.edge_rotation[DF]
-                self.edge_rotation[DF] = temp_rot
-
-        # elif action == 'd':
-        #     temp = self.corner[DRF]
-        #     self.corner[DRF] = self.corner[DRB]
-        #     self.corner[DRB] = self.corner[DLB]
-        #     self.corner[DLB] = self.corner[DLF]
-        #     self.corner[DLF] = temp
-        #
-        #     temp = self.corner[DF]
-        #     self.corner[DF] = self.corner[DR]
-        #     self.corner[DR] = self.corner[DB]
-        #     self.corner[DB] = self.corner[DL]
-        #     self.corner[DL] = temp
-        #
-        # elif action == 'D2':
-        #     temp1 = self.corner[DRF]
-        #     temp2 = self.corner[DRB]
-        #     self.corner[DRF] = self.corner[DLB]
-        #     self.corner[UB] = temp1
-        #     self.corner[DRB] = self.corner[DLF]
-        #     self.corner[DLF] = temp2
-        #
-        #     temp1 = self.corner[DF]
-        #     temp2 = self.corner[DR]
-        #     self.corner[DF] = self.corner[DB]
-        #     self.corner[DB] = temp1
-        #     self.corner[DR] = self.corner[DL]
-        #     self.corner[DL] = temp2
-
-        elif 'F' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[URF]
-                self.corner_position[URF] = self.corner_position[ULF]
-                self.corner_position[ULF] = self.corner_position[DLF]
-                self.corner_position[DLF] = self.corner_position[DRF]
-                self.corner_position[DRF] = temp
-
-                temp_rot = self.corner_rotation[URF]
-                self.corner_rotation[URF] = (self.corner_rotation[ULF] + 2) % 3
-                self.corner_rotation[ULF] = (self.corner_rotation[DLF] + 1) % 3
-                self.corner_rotation[DLF] = (self.corner_rotation[DRF] + 2) % 3
-                self.corner_rotation[DRF] = (temp_rot + 1) % 3
-
-                temp = self.edge_position[UF]
-                self.edge_position[UF] = self.edge_position[FL]
-                self.edge_position[FL] = self.edge_position[DF]
-                self.edge_position[DF] = self.edge_position[FR]
-                self.edge_position[FR] = temp
-                temp_rot = self.edge_rotation[UF]
-                self.edge_rotation[UF] = 1 - self.edge_rotation[FL]
-                self.edge_rotation[FL] = 1 - self.edge_rotation[DF]
-                self.edge_rotation[DF] = 1 - self.edge_rotation[FR]
-                self.edge_rotation[FR] = 1 - temp_rot
-
-
-        # elif action == 'f':
-        #     temp = self.corner[URF]
-        #     self.corner[URF] = self.corner[DRF]
-        #     self.corner[DRF] = self.corner[DLF]
-        #     self.corner[DLF] = self.corner[ULF]
-        #     self.corner[ULF] = temp
-        #
-        #     temp = self.corner[UF]
-        #     self.corner[UF] = self.corner[FR]
-        #     self.corner[FR] = self.corner[DF]
-        #     self.corner[DF] = self.corner[FL]
-        #     self.corner[FL] = temp
-        #
-        # elif action == 'F2':
-        #     temp1 = self.corner[URF]
-        #     temp2 = self.corner[DLF]
-        #     self.corner[URF] = self.corner[ULF]
-        #     self.corner[ULF] = temp1
-        #     self.corner[DLF] = self.corner[DRF]
-        #     self.corner[DRF] = temp2
-        #
-        #     temp1 = self.corner[FR]
-        #     temp2 = self.corner[FL]
-        #     self.corner[FR] = self.corner[UF]
-        #     self.corner[UF] = temp1
-        #     self.corner[FL] = self.corner[DF]
-        #     self.corner[DF] = temp2
-
-        elif 'B' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[URB]
-                self.corner_position[URB] = self.corner_position[DRB]
-                self.corner_position[DRB] = self.corner_position[DLB]
-                self.corner_position[DLB] = self.corner_position[ULB]
-                self.corner_position[ULB] = temp
-                temp_rot = self.corner_rotation[URB]
-                self.corner_rotation[URB] = (self.corner_rotation[DRB] + 1) % 3
-                self.corner_rotation[DRB] = (self.corner_rotation[DLB] + 2) % 3
-                self.corner_rotation[DLB] = (self.corner_rotation[ULB] + 1) % 3
-                self.corner_rotation[ULB] = (temp_rot + 2) % 3
-
-                temp = self.edge_position[BL]
-                self.edge_position[BL] = self.edge_position[UB]
-                self.edge_position[UB] = self.edge_position[BR]
-                self.edge_position[BR] = self.edge_position[DB]
-                self.edge_position[DB] = temp
-                temp_rot = self.edge_rotation[BL]
-                self.edge_rotation[BL] = 1 - self.edge_rotation[UB]
-                self.edge_rotation[UB] = 1 - self.edge_rotation[BR]
-                self.edge_rotation[BR] = 1 - self.edge_rotation[DB]
-                self.edge_rotation[DB] = 1 - temp_rot
-
-        # elif action == 'b':
-        #     temp = self.corner[DRB]
-        #     self.corner[DRB] = self.corner[URB]
-        #     self.corner[URB] = self.corner[ULB]
-        #     self.corner[ULB] = self.corner[DLB]
-        #     self.corner[DLB] = temp
-        #
-        #     temp = self.corner[UB]
-        #     self.corner[UB] = self.corner[BL]
-        #     self.corner[BL] = self.corner[DB]
-        #     self.corner[DB] = self.corner[BR]
-        #     self.corner[BR] = temp
-        #
-        # elif action == 'B2':
-        #     temp1 = self.corner[URB]
-        #     temp2 = self.corner[DRB]
-        #     self.corner[URB] = self.corner[DLB]
-        #     self.corner[DLB] = temp1
-        #     self.corner[DRB] = self.corner[ULB]
-        #     self.corner[ULB] = temp2
-        #
-        #     temp1 = self.corner[UB]
-        #     temp2 = self.corner[BL]
-        #     self.corner[UB] = self.corner[DB]
-        #     self.corner[DB] = temp1
-        #     self.corner[BL] = self.corner[BR]
-        #     self.corner[BR] = temp2
-
-        elif 'R' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[URF]
-                self.corner_position[URF] = self.corner_position[DRF]
-                self.corner_position[DRF] = self.corner_position[DRB]
-                self.corner_position[DRB] = self.corner_position[URB]
-                self.corner_position[URB] = temp
-                temp_rot = self.corner_rotation[URF]
-                self.corner_rotation[URF] = (self.corner_rotation[DRF] + 1) % 3
-                self.corner_rotation[DRF] = (self.corner_rotation[DRB] + 2) % 3
-                self.corner_rotation[DRB] = (self.corner_rotation[URB] + 1) % 3
-                self.corner_rotation[URB] = (temp_rot + 2) % 3
-
-                temp = self.edge_position[UR]
-                self.edge_position[UR] = self.edge_position[FR]
-                self.edge_position[FR] = self.edge_position[DR]
-                self.edge_position[DR] = self.edge_position[BR]
-                self.edge_position[BR] = temp
-                temp_rot = self.edge_rotation[UR]
-                self.edge_rotation[UR] = self.edge_rotation[FR]
-                self.edge_rotation[FR] = self.edge_rotation[DR]
-                self.edge_rotation[DR] = self.edge_rotation[BR]
-                self.edge_rotation[BR] = temp_rot
-
-        # elif action == 'r':
-        #     temp = self.corner[URF]
-        #     self.corner[URF] = self.corner[URB]
-        #     self.corner[URB] = self.corner[DRB]
-        #     self.corner[DRB] = self.corner[DRF]
-        #     self.corner[DRF] = temp
-        #
-        #     temp = self.corner[UR]
-        #     self.corner[UR] = self.corner[BR]
-        #     self.corner[BR] = self.corner[DR]
-        #     self.corner[DR] = self.corner[FR]
-        #     self.corner[FR] = temp
-        #
-        # elif action == 'R2':
-        #     temp1 = self.corner[URF]
-        #     temp2 = self.corner[URB]
-        #     self.corner[URF] = self.corner[DRB]
-        #     self.corner[DRB] = temp1
-        #     self.corner[URB] = self.corner[DRF]
-        #     self.corner[DRF] = temp2
-        #
-        #     temp1 = self.corner[UR]
-        #     temp2 = self.corner[FR]
-        #     self.corner[UR] = self.corner[DR]
-        #     self.corner[DR] = temp1
-        #     self.corner[FR] = self.corner[BR]
-        #     self.corner[BR] = temp2
-
-        elif 'L' in action_upper:
-            for i in twist_count:
-                temp = self.corner_position[ULF]
-                self.corner_position[ULF] = self.corner_position[ULB]
-                self.corner_position[ULB] = self.corner_position[DLB]
-                self.corner_position[DLB] = self.corner_position[DLF]
-                self.corner_position[DLF] = temp
-                temp_rot = self.corner_rotation[ULF]
-                self.corner_rotation[ULF] = (self.corner_rotation[ULB] + 2) % 3
-                self.corner_rotation[ULB] = (self.corner_rotation[DLB] + 1) % 3
-                self.corner_rotation[DLB] = (self.corner_rotation[DLF] + 2) % 3
-                self.corner_rotation[DLF] = (temp_rot + 1) % 3
-
-                temp = self.edge_position[UL]
-                self.edge_position[UL] = self.edge_position[BL]
-                self.edge_position[BL] = self.edge_position[DL]
-                self.edge_position[DL] = self.edge_position[FL]
-                self.edge_position[FL] = temp
-                temp_rot = self.edge_rotation[UL]
-                self.edge_rotation[UL] = self.edge_rotation[BL]
-                self.edge_rotation[BL] = self.edge_rotation[DL]
-                self.edge_rotation[DL] = self.edge_rotation[FL]
-                self.edge_rotation[FL] = temp_rot
-
-        # elif action == 'l':
-        #     temp = self.corner[DLF]
-        #     self.corner[DLF] = self.corner[DLB]
-        #     self.corner[DLB] = self.corner[ULB]
-        #     self.corner[ULB] = self.corner[ULF]
-        #     self.corner[ULF] = temp
-        #
-        #     temp = self.corner[BL]
-        #     self.corner[BL] = self.corner[UL]
-        #     self.corner[UL] = self.corner[FL]
-        #     self.corner[FL] = self.corner[DL]
-        #     self.corner[DL] = temp
-        #
-        # elif action == 'L2':
-        #     temp1 = self.corner[ULF]
-        #     temp2 = self.corner[DLF]
-        #     self.corner[ULF] = self.corner[DLB]
-        #     self.corner[DLB] = temp1
-        #     self.corner[DLF] = self.corner[ULB]
-        #     self.corner[ULB] = temp2
-        #
-        #     temp1 = self.corner[UL]
-        #     temp2 = self.corner[FL]
-        #     self.corner[UL] = self.corner[DL]
-        #     self.corner[DL] = temp1
-        #     self.corner[FL] = self.corner[BL]
-        #     self.corner[BL] = temp2
-
+        corner_permutation, corner_delta, edge_permutation, edge_delta = move_tables[action]
+        self.corner_position = self.corner_position[corner_permutation]
+        self.corner_rotation = (self.corner_rotation[corner_permutation] + corner_delta) % 3
+        self.edge_position = self.edge_position[edge_permutation]
+        self.edge_rotation = self.edge_rotation[edge_permutation] ^ edge_delta  # addition mod 2
         return True
 
     def twist_sequence(self, action_sequence):
@@ -468,7 +281,17 @@ class RubiksCube(StateSpace):
         return True
 
     def copy(self):
-        return deepcopy(self)
+        """
+        Copy the cube without deepcopy; the colours and the facelet start state are shared, as they never change
+        :return: RubiksCube
+        """
+        cube_copy = RubiksCube.__new__(RubiksCube)
+        cube_copy.__dict__.update(self.__dict__)
+        cube_copy.corner_position = self.corner_position.copy()
+        cube_copy.corner_rotation = self.corner_rotation.copy()
+        cube_copy.edge_position = self.edge_position.copy()
+        cube_copy.edge_rotation = self.edge_rotation.copy()
+        return cube_copy
 
     @staticmethod
     def undo_action(action):
@@ -529,9 +352,9 @@ class RubiksCube(StateSpace):
 
     def reset_cube(self):
         self.edge_position = np.arange(12)
-        self.edge_rotation = np.zeros(12)
+        self.edge_rotation = np.zeros(12, dtype=np.int8)
         self.corner_position = np.arange(8)
-        self.corner_rotation = np.zeros(8)
+        self.corner_rotation = np.zeros(8, dtype=np.int8)
 
     def show_cube_color(self):
         edge_colors = [self.edge_map[str(edge)] for edge in self.edge_position]
@@ -548,6 +371,26 @@ class RubiksCube(StateSpace):
     def get_state(self):
         return self.corner_position, self.corner_rotation, self.edge_position, self.edge_rotation
 
+    def conjugate(self, symmetry):
+        """
+        :param symmetry: int, index of the symmetry (see symmetry_face_maps)
+        :return:         RubiksCube, the state s c s^-1; solving it with the moves symmetry_move_maps[symmetry] of a
+                         solution of this cube solves it in as many moves
+        """
+        state = conjugates(self.corner_position, self.corner_rotation, self.edge_position, self.edge_rotation)[symmetry]
+        cube_copy = self.copy()
+        cube_copy.corner_position = state[:8].astype(np.int64)
+        cube_copy.corner_rotation = state[8:16]
+        cube_copy.edge_position = state[16:28].astype(np.int64)
+        cube_copy.edge_rotation = state[28:]
+        return cube_copy
+
+    def canonical_key(self):
+        """
+        :return: bytes, a key shared by the cube and its 16 conjugates, which all have the same distance to the goal
+        """
+        return canonical_key(self.corner_position, self.corner_rotation, self.edge_position, self.edge_rotation)
+
     def is_solved(self):
         position_correct = np.all(self.corner_position == np.arange(8)) and np.all(self.edge_position == np.arange(12))
         orientation_correct = np.all(self.corner_rotation == np.zeros(8)) and np.all(self.edge_rotation == np.zeros(12))
@@ -569,7 +412,55 @@ class RubiksCube(StateSpace):
         successors = []
         available_actions = self.prune_action(last_action=last_move, second_last_action=second_last_move)
         for action in available_actions:
-            cube_copy = deepcopy(self)
+            cube_copy = self.copy()
             cube_copy.twist(action)
             successors.append((action, cube_copy))
         return successors
+
+    def build_move_pruning(self, max_length=3, sample_count=2, seed=42):
+        """
+        Discover the redundant move sequences up to max_length (see MovePruning.discover); besides the rules of
+          prune_action (same face twice, opposite faces in both orders), longer sequences such as F B F (= F2 B) are
+          found. Every move applies everywhere and its effect does not depend on the state, so a couple of scrambled
+          samples suffice.
+        :param max_length:   int, length of the longest sequences to test
+        :param sample_count: int, number of scrambled sample cubes
+        :param seed:         int, seed of the scrambles
+        :return:             MovePruning over the action ids (indices in self.actions)
+        """
+        samples = []
+        for index in range(sample_count):
+            cube = RubiksCube(self.n, self.colours)
+            for action in self.generate_scramble(20, seed=seed + index):
+                cube.twist(action)
+            samples.append(cube)
+
+        def successor(cube, action_id):
+            cube_copy = cube.copy()
+            cube_copy.twist(self.actions[action_id])
+            return cube_copy
+
+        def key(cube):
+            return tuple(np.concatenate(cube.get_state()).tolist())
+
+        move_pruning = MovePruning(len(self.actions))
+        move_pruning.discover(successor, samples, max_length=max_length, key=key)
+        return move_pruning
+
+    def get_pruned_successors(self, move_pruning, fsm_state=START):
+        """
+        This function returns the successors of the current state that are not pruned by a move pruning machine; the
+          machine state replaces the last and second last moves of get_successors.
+        :param move_pruning: MovePruning over the action ids, e.g. from build_move_pruning
+        :param fsm_state:    int, the state of the machine after the moves made so far
+        :return:             list, list of (action, RubiksCube, machine state) tuples
+        """
+        successors = []
+        for action_id, action in enumerate(self.actions):
+            successor_fsm_state = move_pruning.next_state(fsm_state, action_id)
+            if successor_fsm_state == PRUNED:
+                continue
+            cube_copy = self.copy()
+            cube_copy.twist(action)
+            successors.append((action, cube_copy, successor_fsm_state))
+        return successors
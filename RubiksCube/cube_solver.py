@@ -0,0 +1,193 @@
+import math
+import time
+import numpy as np
+import ranking
+from cube import RubiksCube, cube_action_names, canonical_key
+from move_pruning import START
+
+
+class RubiksCubeSolver:
+    def __init__(self, cube: RubiksCube, pattern_databases, directory='.', move_pruning=None):
+        """
+        Optimal solver in the style of Korf (1997): IDA* where a state is the tuple of the ranks of all pattern
+          databases, moved with their move tables, and the heuristic is the maximum of their lookups.
+        The patterns must cover the cube (the corners and every edge), so that the goal is the only state whose ranks
+          are all those of the solved cube.
+        :param cube:              RubiksCube, the cube to solve (its current state is the default start)
+        :param pattern_databases: list of PatternDataBase, built or loaded; e.g. the corner database and the two
+                                  databases of default_edge_subsets[6]
+        :param directory:         str, directory of the cached move tables
+        :param move_pruning:      MovePruning over the move ids; cube.build_move_pruning() if None
+        """
+        covered_edges = set()
+        for pattern_database in pattern_databases:
+            if pattern_database.opt == 'edges':
+                covered_edges.update(pattern_database.edges)
+        if 'corner' not in [pattern_database.opt for pattern_database in pattern_databases] or \
+                len(covered_edges) < 12:
+            raise ValueError('The pattern databases must cover all corners and edges')
+        self.cube = cube
+        self.pattern_databases = list(pattern_databases)
+        self.move_tables = [pattern_database.load_move_tables(directory) for pattern_database in pattern_databases]
+        solved_cube = RubiksCube(cube.n, cube.colours)
+        self.goal = tuple(pattern_database.rank(solved_cube) for pattern_database in pattern_databases)
+        #  indices of the pattern databases used by the heuristic (all of them by default; see benchmark)
+        self.heuristic_indices = list(range(len(pattern_databases)))
+        if move_pruning is None:
+            move_pruning = cube.build_move_pruning()
+        self.move_pruning = move_pruning
+
+    def state(self, cube: RubiksCube):
+        return tuple(pattern_database.rank(cube) for pattern_database in self.pattern_databases)
+
+    def canonical_key(self, state):
+        """
+        :param state: tuple of int, the ranks of the pattern databases
+        :return:      bytes, the same key for the cube of the state and its 16 conjugates (see cube.canonical_key)
+        """
+        edge_position = np.zeros(12, dtype=np.int64)
+        edge_rotation = np.zeros(12, dtype=np.int8)
+        for pattern_database, rank in zip(self.pattern_databases, state):
+            if pattern_database.opt == 'corner':
+                corner_position, corner_rotation = ranking.unrank_corner(rank)
+            else:
+                locations, rotations = ranking.unrank_edges(rank, len(pattern_database.edges))
+                edge_position[locations] = pattern_database.edges
+                edge_rotation[locations] = rotations
+        return canonical_key(corner_position, corner_rotation, edge_position, edge_rotation)
+
+    def heuristic(self, cube: RubiksCube):
+        """
+        :param cube: RubiksCube, the state to evaluate
+        :return:     int, the maximum of the lookups of the pattern databases in heuristic_indices
+        """
+        return max(self.pattern_databases[index].lookup(cube) for index in self.heuristic_indices)
+
+    def expand(self, state):
+        """
+        Move a state with all 18 moves at once
+        :param state: tuple of int, the ranks of the pattern databases
+        :return:      tuple of a list of 18 successor states and a list of their 18 heuristic values
+        """
+        successor_ranks = []
+        h_costs = None
+        for index, (pattern_database, move_tables, rank) in enumerate(zip(self.pattern_databases, self.move_tables,
+                                                                          state)):
+            ranks = pattern_database.expand(np.array([rank], dtype=np.int64), move_tables)[0]
+            successor_ranks.append(ranks.tolist())
+            if index in self.heuristic_indices:
+                entries = pattern_database.get_entries(ranks)
+                h_costs = entries if h_costs is None else np.maximum(h_costs, entries)
+        return list(zip(*successor_ranks)), h_costs.tolist()
+
+    def iterative_deepening_a_star(self, start_cube=None, max_expansions=None, transpositions=False):
+        """
+        IDA*: a depth-first search bounded by the f-cost, with the bound raised to the smallest f-cost that exceeded it
+          after every iteration; moves are pruned with self.move_pruning, whose machine state is carried along the path.
+        With transpositions, the smallest g-cost at which every symmetry class of states (see canonical_key) was
+          reached is kept across iterations, and a state reached with a larger g-cost is not expanded. Conjugates have
+          the same distance to the goal, so such a state is never on an optimal path and the solution stays optimal.
+        :param start_cube:     RubiksCube, the start state; self.cube if None
+        :param max_expansions: int, maximum number of expansions, or None for no limit
+        :param transpositions: bool, whether to detect transpositions (and symmetric states) with canonical keys
+        :return: either: a tuple of a list of actions, the cost of the actions and the number of expansions
+                     or: (False, False, expansions), if the search failed (expansion limit reached)
+        """
+        if start_cube is None:
+            start_cube = self.cube
+        fsm_table = self.move_pruning.table.tolist()
+        goal = self.goal
+        expand = self.expand
+        path = []  # move ids from the start state
+        expansions = 0
+        g_costs = {}  # canonical key -> smallest g-cost (with transpositions)
+
+        def depth_first_search(state, g_cost, h_cost, bound, fsm_state):
+            # returns True if the goal is found, and otherwise the smallest f-cost that exceeded the bound
+            nonlocal expansions
+            if state == goal:
+                return True
+            if transpositions:
+                key = self.canonical_key(state)
+                if g_costs.get(key, g_cost) < g_cost:
+                    return math.inf
+                g_costs[key] = g_cost
+            expansions += 1
+            if max_expansions is not None and expansions > max_expansions:
+                return math.inf
+            next_bound = math.inf
+            successors, h_costs = expand(state)
+            for move_id in range(len(cube_action_names)):
+                successor_fsm_state = fsm_table[fsm_state][move_id]
+                if successor_fsm_state < 0:  # the path would end with a redundant sequence
+                    continue
+                f_cost = g_cost + 1 + h_costs[move_id]
+                if f_cost > bound:
+                    next_bound = min(next_bound, f_cost)
+                    continue
+                path.append(move_id)
+                result = depth_first_search(successors[move_id], g_cost + 1, h_costs[move_id], bound,
+                                            successor_fsm_state)
+                if result is True:
+                    return True
+                path.pop()
+                next_bound = min(next_bound, result)
+            return next_bound
+
+        start_state = self.state(start_cube)
+        start_h_cost = self.heuristic(start_cube)
+        bound = start_h_cost
+        while True:
+            result = depth_first_search(start_state, 0, start_h_cost, bound, START)
+            if result is True:
+                return [cube_action_names[move_id] for move_id in path], len(path), expansions
+            if result == math.inf:
+                return False, False, expansions
+            bound = result
+
+    def benchmark(self, scrambles, heuristics=None, verbose=True):
+        """
+        Solve the same scrambles with several combinations of pattern databases, and report the average heuristic value
+          of the start states and the number of expansions (with the reduction relative to the first combination).
+        :param scrambles:  list, action sequences (e.g. from RubiksCube.generate_scramble) applied to a solved cube
+        :param heuristics: dict, name -> list of indices of pattern databases; the corner database alone and the
+                           maximum of all of them if None
+        :param verbose:    bool, whether to print the report
+        :return:           dict, name -> dict of the average start h-cost, solution cost, expansions and seconds
+        """
+        if heuristics is None:
+            corner_index = [pattern_database.opt for pattern_database in self.pattern_databases].index('corner')
+            heuristics = {'corner': [corner_index],
+                          'max(' + ', '.join(pattern_database.name for pattern_database in self.pattern_databases)
+                          + ')': list(range(len(self.pattern_databases)))}
+        heuristic_indices = self.heuristic_indices
+        cubes = []
+        for scramble in scrambles:
+            cube = RubiksCube(self.cube.n, self.cube.colours)
+            for action in scramble:
+                cube.twist(action)
+            cubes.append(cube)
+        report = {}
+        for name, indices in heuristics.items():
+            self.heuristic_indices = indices
+            h_costs, costs, expansions, seconds = [], [], [], []
+            for cube in cubes:
+                h_costs.append(self.heuristic(cube))
+                start_time = time.perf_counter()
+                _, cost, expansion_count = self.iterative_deepening_a_star(cube)
+                seconds.append(time.perf_counter() - start_time)
+                costs.append(cost)
+                expansions.append(expansion_count)
+            report[name] = {'h_cost': sum(h_costs) / len(cubes), 'cost': sum(costs) / len(cubes),
+                            'expansions': sum(expansions) / len(cubes), 'seconds': sum(seconds) / len(cubes)}
+        self.heuristic_indices = heuristic_indices
+        if verbose:
+            baseline = next(iter(report.values()))['expansions']
+            width = max(len(name) for name in report) + 2
+            print('{:<{}}{:>8}{:>10}{:>14}{:>12}{:>12}'.format('heuristic', width, 'avg h', 'avg cost', 'avg expanded',
+                                                               'reduction', 'avg sec'))
+            for name, row in report.items():
+                print('{:<{}}{:>8.2f}{:>10.2f}{:>14.1f}{:>11.1f}x{:>12.4f}'.format(
+                    name, width, row['h_cost'], row['cost'], row['expansions'],
+                    baseline / max(row['expansions'], 1), row['seconds']))
+        return report
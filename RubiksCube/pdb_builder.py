@@ -1,83 +1,528 @@
 import json
+import multiprocessing
+import os
+import time
 import numpy as np
 import ranking
-from collections import deque
-from cube import RubiksCube
+from cube import RubiksCube, cube_action_names, symmetry_count
+from coordinates import CornerPermutation, CornerOrientation, EdgeSubset
+from multiprocessing import shared_memory
+from pdb_format import write_pdb, load_pdb
+
+UNSET = 0xF  # 4-bit entry of a state that has not been reached (yet)
+expected_max_depths = {'corner': 11}  # every corner state is at most 11 moves (half-turn metric) from the goal
+#  Rankings of the patterns (see ranking.py), recorded in the database files so that a change of ranking is detected
+ranking_schemes = {'corner': 'lehmer(corner positions) * 3^7 + base-3 rotations of corners 0-6',
+                   'edges': 'k-permutation rank of the edge locations << k | rotation bits'}
+#  Edge subsets of the edge pattern databases, by subset size; the two subsets of a size cover all 12 edges
+default_edge_subsets = {6: ((0, 1, 2, 3, 4, 5), (6, 7, 8, 9, 10, 11)),
+                        7: ((0, 1, 2, 3, 4, 5, 6), (5, 6, 7, 8, 9, 10, 11))}
+
+_worker = {}  # the pattern database of a worker process, on the shared table and bitset (see PatternDataBase.bfs)
+
+
+def _init_worker(opt, edges, directory, use_move_tables, db_block, visited_block):
+    pattern_database = PatternDataBase(RubiksCube(), opt, edges)
+    pattern_database.db = np.ndarray(((pattern_database.size + 1) // 2,), dtype=np.uint8, buffer=db_block.buf)
+    _worker['pattern_database'] = pattern_database
+    _worker['visited'] = np.ndarray(((pattern_database.size + 7) // 8,), dtype=np.uint8, buffer=visited_block.buf)
+    _worker['move_tables'] = pattern_database.load_move_tables(directory) if use_move_tables else None
+    _worker['blocks'] = (db_block, visited_block)
+
+
+def _expand_frontier(args):
+    # expand a part of the frontier; the new successors are split by the rank ranges of the merge tasks
+    frontier, boundaries = args
+    pattern_database = _worker['pattern_database']
+    successors = pattern_database.expand(frontier.astype(np.int64), _worker['move_tables'])
+    successors = pattern_database.unvisited(successors.ravel(), _worker['visited']).astype(np.uint32)
+    return np.split(successors, np.searchsorted(successors, boundaries))
+
+
+def _merge_range(args):
+    # mark and store the successors of one rank range; ranges are multiples of 8 ranks, so no byte is shared
+    parts, depth = args
+    pattern_database = _worker['pattern_database']
+    ranks = pattern_database.visit(np.concatenate(parts).astype(np.int64), _worker['visited'])
+    pattern_database.merge_entries(ranks, depth)
+    return ranks.astype(np.uint32)
 
 
 class PatternDataBase:
-    def __init__(self, cube: RubiksCube, opt='corner'):
+    def __init__(self, cube: RubiksCube, opt='corner', edges=None):
+        """
+        Pattern database of the cube: the exact number of moves needed to solve the cubies of the pattern, for every
+          rank of the pattern. Entries are 4 bits, packed two per byte (rank 2i in the low nibble of byte i, and
+          rank 2i + 1 in the high one), so the full corner database of 8! * 3^7 = 88,179,840 entries takes 42 MB, a
+          6-edge database (12!/6! * 2^6 = 42,577,920 entries) 21 MB, and a 7-edge one 255 MB.
+        :param cube:  RubiksCube, the goal
+        :param opt:   str, the pattern; 'corner' for the positions and rotations of the corners, 'edges' for the
+                      locations and rotations of a subset of the edges
+        :param edges: tuple of int, the edge cubies of an 'edges' pattern (see default_edge_subsets)
+        """
         self.cube = cube
-        self.db = np.zeros(40320, dtype=np.uint8)  # maximum length
         self.opt = opt
-        self.queue = deque()
+        self.edges = None
+        if opt == 'corner':
+            self.name = opt
+            self.size = ranking.corner_rank_count
+        elif opt == 'edges':
+            self.edges = tuple(edges)
+            self.name = 'edges_{}'.format('-'.join(str(edge) for edge in self.edges))
+            self.size = ranking.edge_rank_count(len(self.edges))
+        else:
+            raise ValueError('Unknown pattern: {}'.format(opt))
+        self.db = None
 
     def rank(self, cube=None):
         if self.opt == 'corner':
             return ranking.rank_corner(cube.corner_position, cube.corner_rotation)
+        elif self.opt == 'edges':
+            return ranking.rank_edges(cube.edge_position, cube.edge_rotation, self.edges)
 
     def unrank(self, rank):
         if self.opt == 'corner':
             return ranking.unrank_corner(rank)
+        elif self.opt == 'edges':
+            return ranking.unrank_edges(rank, len(self.edges))
+
+    def get_entries(self, ranks):
+        """
+        :param ranks: np.ndarray of int64, ranks of the pattern
+        :return:      np.ndarray of uint8, the entries (UNSET if not reached yet)
+        """
+        return (self.db[ranks >> 1] >> ((ranks & 1) << 2).astype(np.uint8)) & 0xF
+
+    def set_entries(self, ranks, cost):
+        """
+        :param ranks: np.ndarray of int64, distinct ranks of the pattern
+        :param cost:  int or np.ndarray of uint8 (one per rank), the entries of the ranks (less than UNSET)
+        :return:      True
+        """
+        odd = (ranks & 1) == 1
+        cost = np.broadcast_to(np.asarray(cost, dtype=np.uint8), ranks.shape)
+        low = ranks[~odd] >> 1
+        high = ranks[odd] >> 1
+        self.db[low] = (self.db[low] & 0xF0) | cost[~odd]
+        self.db[high] = (self.db[high] & 0x0F) | (cost[odd] << 4)
+        return True
+
+    def merge_entries(self, ranks, cost):
+        """
+        Keep the smaller of the current entries and cost, so that updates can be merged in any order
+        :param ranks: np.ndarray of int64, distinct ranks of the pattern
+        :param cost:  int, the candidate entry of all the ranks
+        :return:      True
+        """
+        return self.set_entries(ranks, np.minimum(self.get_entries(ranks), cost))
 
     def add_entry(self, rank, cost):
-        if self.db[rank] == 0:
-            self.db[rank] = cost
-        else:
-            if cost < self.db[rank]:
-                self.db[rank] = cost
+        if cost < self.get_entries(np.array([rank]))[0]:
+            self.set_entries(np.array([rank]), cost)
         return True
 
-    def export_db(self):
-        f = open("{}_pdb.bin".format(self.opt+'wo_rot'), "wb")
-        byte_db = bytearray(self.db)
-        f.write(byte_db)
-        f.close()
+    def lookup(self, cube):
+        """
+        :param cube: RubiksCube, the state to evaluate
+        :return:     int, the number of moves needed to solve the pattern
+        """
+        rank = self.rank(cube)
+        return int((self.db[rank >> 1] >> ((rank & 1) << 2)) & 0xF)
+
+    def filename(self):
+        return "{}.pdb".format(self.name)
+
+    def pattern_spec(self):
+        """
+        :return: dict, the pattern and its ranking, stored in the header of the database file (see pdb_format.py)
+        """
+        return {'opt': self.opt, 'edges': None if self.edges is None else list(self.edges),
+                'ranking': ranking_schemes[self.opt]}
+
+    def export_db(self, filename=None):
+        """
+        :param filename: str, name of the file; '<name>.pdb' (e.g. corner.pdb) if None
+        :return:         True
+        """
+        if filename is None:
+            filename = self.filename()
+        return write_pdb(filename, self.db, 'rubiks_cube', self.pattern_spec(), 4, self.size)
+
+    def load(self, filename=None, verify=False):
+        """
+        Memory-map a database written by export_db; the table is only paged in as it is used
+        :param filename: str, name of the file; '<name>.pdb' if None
+        :param verify:   bool, whether to check the checksum of the table (which reads the whole file)
+        :return:         True
+        """
+        if filename is None:
+            filename = self.filename()
+        header, self.db = load_pdb(filename, 'rubiks_cube', self.pattern_spec(), verify)
+        if header['bit_width'] != 4 or header['entry_count'] != self.size:
+            raise ValueError('{} has {} entries of {} bits, expected {} entries of 4 bits'.format(
+                filename, header['entry_count'], header['bit_width'], self.size))
         return True
 
-    def export_queue(self):
-        f = open("{}_queue.txt".format(self.opt), "w")
-        queue_str = str(self.queue)
-        f.write(queue_str)
-        f.close()
+    def depth_counts(self, chunk_size=1 << 24):
+        """
+        :param chunk_size: int, number of bytes counted at once
+        :return:           np.ndarray of int64 of length 16, the number of entries of every value (UNSET included)
+        """
+        counts = np.zeros(16, dtype=np.int64)
+        for start in range(0, len(self.db), chunk_size):
+            chunk = np.asarray(self.db[start:start + chunk_size])
+            counts += np.bincount(chunk & 0xF, minlength=16)
+            high = chunk >> 4
+            if start + chunk_size >= len(self.db) and self.size % 2 == 1:
+                high = high[:-1]  # the high nibble of the last byte is padding
+            counts += np.bincount(high, minlength=16)
+        return counts
+
+    def validate(self):
+        """
+        Check that every entry is filled and that the deepest entry is at the known maximum depth of the pattern
+        :return: np.ndarray of int64, the number of entries at every depth
+        """
+        counts = self.depth_counts()
+        if counts[UNSET] > 0:
+            raise ValueError('{} entries of the {} pattern database are not filled'.format(counts[UNSET], self.opt))
+        max_depth = int(np.flatnonzero(counts)[-1])
+        if self.opt in expected_max_depths and max_depth != expected_max_depths[self.opt]:
+            raise ValueError('Maximum depth of the {} pattern database is {}, expected {}'.format(
+                self.opt, max_depth, expected_max_depths[self.opt]))
+        return counts[:max_depth + 1]
+
+    def load_move_tables(self, directory='.'):
+        """
+        Move tables of the two coordinates of a rank (rank = high * radix + low); the corner permutation and
+          orientation for corners, and the locations and flips of the subset for edges
+        :param directory: str, directory of the cached move tables
+        :return:          tuple of the radix and the two tables (np.ndarray of int64 of shape (coordinates, 18))
+        """
+        if self.opt == 'corner':
+            return ranking.rank_constant, CornerPermutation().load_move_table(directory).astype(np.int64), \
+                CornerOrientation().load_move_table(directory).astype(np.int64)
+        subset = EdgeSubset(self.edges)
+        return 1 << len(self.edges), subset.load_move_table(directory).astype(np.int64), \
+            subset.load_flip_table(directory).astype(np.int64)
+
+    def expand(self, ranks, move_tables=None):
+        """
+        :param ranks:       np.ndarray of int64, ranks of the pattern
+        :param move_tables: tuple, generated by load_move_tables(); if None, the ranks are unranked, moved and ranked
+                            again with the coordinates (see coordinates.py), which is slower but needs no move tables
+        :return:            np.ndarray of int64 of shape (N, 18), the ranks after every move
+        """
+        move_ids = range(len(cube_action_names))
+        if move_tables is None and self.opt == 'corner':
+            permutation, orientation = CornerPermutation(), CornerOrientation()
+            high, low = np.divmod(ranks, ranking.rank_constant)
+            positions, rotations = permutation.unrank_many(high), orientation.unrank_many(low)
+            return np.stack([permutation.move_unranked(positions, move_id) * ranking.rank_constant +
+                             orientation.move_unranked(rotations, move_id) for move_id in move_ids], axis=1)
+        elif move_tables is None:
+            subset = EdgeSubset(self.edges, orientation=True)
+            unranked = subset.unrank_many(ranks)
+            return np.stack([subset.move_unranked(unranked, move_id) for move_id in move_ids], axis=1)
+        radix, high_table, low_table = move_tables
+        high, low = np.divmod(ranks, radix)
+        if self.opt == 'corner':
+            return high_table[high] * radix + low_table[low]
+        return high_table[high] * radix + (low[:, None] ^ low_table[high])  # the flip table depends on the locations
+
+    @staticmethod
+    def unvisited(ranks, visited):
+        """
+        :param ranks:   np.ndarray of int64, ranks of the pattern
+        :param visited: np.ndarray of uint8, a bitset over the ranks
+        :return:        np.ndarray of int64, the ranks that are not in the bitset (once each), sorted
+        """
+        bits = (1 << (ranks & 7)).astype(np.uint8)
+        ranks = np.sort(ranks[(visited[ranks >> 3] & bits) == 0])  # most successors are old: filter before sorting
+        if len(ranks) > 0:
+            ranks = ranks[np.concatenate(([True], ranks[1:] != ranks[:-1]))]
+        return ranks
+
+    @staticmethod
+    def visit(ranks, visited):
+        """
+        Keep the ranks that have not been visited yet (once each) and mark them as visited
+        :param ranks:   np.ndarray of int64, ranks of the pattern
+        :param visited: np.ndarray of uint8, a bitset over the ranks
+        :return:        np.ndarray of int64, the new ranks, sorted
+        """
+        ranks = PatternDataBase.unvisited(ranks, visited)
+        if len(ranks) > 0:
+            byte_indices = ranks >> 3
+            first = np.flatnonzero(np.diff(byte_indices, prepend=-1))  # several ranks can share a byte of the bitset
+            visited[byte_indices[first]] |= np.bitwise_or.reduceat((1 << (ranks & 7)).astype(np.uint8), first)
+        return ranks
+
+    def bfs(self, directory='.', chunk_size=1 << 20, use_move_tables=True, processes=1, checkpoint=None,
+            checkpoint_interval=600, verbose=True):
+        """
+        Breadth-first search to find the shortest path to each node, on ranks and one depth layer at a time: a layer is
+          an array of uint32 ranks (4 bytes per state), expanded in chunks with the coordinate move tables (see
+          load_move_tables); successors that are not in the visited bitset form the next layer.
+        With several processes, the table and the bitset are put in shared memory and every layer takes two parallel
+          steps: the chunks of the frontier are expanded and filtered against the bitset (which is only read), and the
+          new successors are then merged by rank range, each range marking its own bytes and keeping the minimum depth.
+          A layer holds the same states either way, so the table is byte-identical to the serial one.
+        :param directory:           str, directory of the cached move tables
+        :param chunk_size:          int, number of frontier states expanded at once
+        :param use_move_tables:     bool, whether to move ranks with move tables, or by unranking them (see expand)
+        :param processes:           int, number of worker processes (None uses all cores, 1 builds in this process)
+        :param checkpoint:          str, file of the checkpoints (see write_checkpoint and resume), or None for none
+        :param checkpoint_interval: float, minimum number of seconds between two checkpoints
+        :param verbose:             bool, whether to print the size of each layer
+        :return:                    True
+        """
+        self.db = np.full((self.size + 1) // 2, 0xFF, dtype=np.uint8)
+        visited = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        frontier = self.visit(np.array([self.rank(self.cube)], dtype=np.int64), visited)
+        self.set_entries(frontier, 0)
+        search = (visited, frontier.astype(np.uint32), 1, 0, [])
+        if processes != 1:
+            return self.parallel_search_layers(search, directory, chunk_size, use_move_tables, processes, checkpoint,
+                                               checkpoint_interval, verbose)
+        return self.search_layers(search, directory, chunk_size, use_move_tables, checkpoint, checkpoint_interval,
+                                  verbose)
+
+    def checkpoint_filename(self):
+        return "{}_checkpoint.npz".format(self.name)
+
+    def write_checkpoint(self, filename, search):
+        """
+        Save the state of a build atomically: the file is written next to the old checkpoint and then renamed over
+          it, so a crash during the write leaves the previous checkpoint intact.
+        :param filename: str, name of the checkpoint file
+        :param search:   tuple of the visited bitset, the frontier (uint32 ranks at depth - 1), the depth of the layer
+                         being built, the number of frontier states already expanded and the list of arrays of the
+                         ranks of the layer found so far
+        :return:         True
+        """
+        visited, frontier, depth, position, layer = search
+        temporary_filename = filename + '.tmp'
+        with open(temporary_filename, 'wb') as f:
+            np.savez(f, name=self.name, size=self.size, db=np.asarray(self.db), visited=visited, frontier=frontier,
+                     depth=depth, position=position, layer=np.concatenate(layer + [np.zeros(0, dtype=np.uint32)]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_filename, filename)
+        return True
+
+    def resume(self, checkpoint=None, directory='.', chunk_size=1 << 20, use_move_tables=True, processes=1,
+               checkpoint_interval=600, verbose=True):
+        """
+        Continue a build from its last checkpoint, e.g. after a crash or a pre-emption; the parameters are the ones of
+          bfs, and the build keeps writing checkpoints to the same file.
+        :param checkpoint: str, file of the checkpoints; '<name>_checkpoint.npz' if None
+        :return:           True
+        """
+        if checkpoint is None:
+            checkpoint = self.checkpoint_filename()
+        data = np.load(checkpoint)
+        if str(data['name']) != self.name or int(data['size']) != self.size:
+            raise ValueError('{} is a checkpoint of the {} pattern database, not of {}'.format(
+                checkpoint, data['name'], self.name))
+        self.db = data['db']
+        search = (data['visited'], data['frontier'], int(data['depth']), int(data['position']), [data['layer']])
+        if processes != 1:
+            return self.parallel_search_layers(search, directory, chunk_size, use_move_tables, processes, checkpoint,
+                                               checkpoint_interval, verbose)
+        return self.search_layers(search, directory, chunk_size, use_move_tables, checkpoint, checkpoint_interval,
+                                  verbose)
+
+    def search_layers(self, search, directory='.', chunk_size=1 << 20, use_move_tables=True, checkpoint=None,
+                      checkpoint_interval=600, verbose=True):
+        """
+        Run the breadth-first search of bfs in this process from a state of the search (see write_checkpoint); a
+          checkpoint can be written after any chunk
+        :return: True
+        """
+        move_tables = self.load_move_tables(directory) if use_move_tables else None
+        visited, frontier, depth, position, layer = search
+        last_checkpoint = time.perf_counter()
+        while len(frontier) > 0:
+            if verbose and position == 0:
+                print('Depth: {}, states: {}'.format(depth - 1, len(frontier)))
+            for start in range(position, len(frontier), chunk_size):
+                successors = self.expand(frontier[start:start + chunk_size].astype(np.int64), move_tables)
+                successors = self.visit(successors.ravel(), visited)
+                self.set_entries(successors, depth)
+                layer.append(successors.astype(np.uint32))
+                if checkpoint is not None and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                    self.write_checkpoint(checkpoint, (visited, frontier, depth, start + chunk_size, layer))
+                    last_checkpoint = time.perf_counter()
+            frontier = np.concatenate(layer)
+            depth, position, layer = depth + 1, 0, []
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)  # the build is complete
+        return True
+
+    def parallel_search_layers(self, search, directory='.', chunk_size=1 << 20, use_move_tables=True, processes=None,
+                               checkpoint=None, checkpoint_interval=600, verbose=True):
+        """
+        Run the breadth-first search of bfs with a pool of worker processes over shared memory from a state of the
+          search (see write_checkpoint); checkpoints are only written between two layers
+        :return: True
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        db_size, visited_size = (self.size + 1) // 2, (self.size + 7) // 8
+        db_block = shared_memory.SharedMemory(create=True, size=db_size)
+        visited_block = shared_memory.SharedMemory(create=True, size=visited_size)
+        try:
+            db = np.ndarray((db_size,), dtype=np.uint8, buffer=db_block.buf)
+            visited = np.ndarray((visited_size,), dtype=np.uint8, buffer=visited_block.buf)
+            db[:] = self.db
+            visited[:] = search[0]
+            self.db = db
+            _, frontier, depth, position, layer = search
+            #  rank ranges of the merge tasks (a few per process, to balance the work), at multiples of 8 ranks
+            range_count = 4 * processes
+            boundaries = np.array([self.size * i // range_count // 8 * 8 for i in range(1, range_count)],
+                                  dtype=np.int64)
+            last_checkpoint = time.perf_counter()
+            with multiprocessing.Pool(processes, initializer=_init_worker,
+                                      initargs=(self.opt, self.edges, directory, use_move_tables,
+                                                db_block, visited_block)) as pool:
+                while len(frontier) > 0:
+                    if verbose:
+                        print('Depth: {}, states: {}'.format(depth - 1, len(frontier)))
+                    chunks = [(frontier[start:start + chunk_size], boundaries)
+                              for start in range(position, len(frontier), chunk_size)]
+                    expanded = pool.map(_expand_frontier, chunks)
+                    ranges = [([parts[i] for parts in expanded], depth) for i in range(range_count)]
+                    del expanded
+                    frontier = np.concatenate(layer + pool.map(_merge_range, ranges))
+                    depth, position, layer = depth + 1, 0, []
+                    if checkpoint is not None and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                        self.write_checkpoint(checkpoint, (visited, frontier, depth, position, layer))
+                        last_checkpoint = time.perf_counter()
+            self.db = db.copy()
+            del db, visited
+        finally:
+            db_block.close()
+            db_block.unlink()
+            visited_block.close()
+            visited_block.unlink()
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)  # the build is complete
+        return True
+
+    def benchmark_bfs(self, process_counts=(1, 2, 4), directory='.', verbose=True):
+        """
+        Build the database with every number of processes, check that the tables are byte-identical to the first one,
+          and report the build times and speedups
+        :param process_counts: iterable of int, numbers of worker processes (1 is the serial build)
+        :param directory:      str, directory of the cached move tables
+        :param verbose:        bool, whether to print the report
+        :return:               dict, number of processes -> seconds
+        """
+        self.load_move_tables(directory)  # build the cached move tables before timing
+        report = {}
+        reference = None
+        for processes in process_counts:
+            start_time = time.perf_counter()
+            self.bfs(directory, processes=processes, verbose=False)
+            report[processes] = time.perf_counter() - start_time
+            if reference is None:
+                reference = self.db
+            elif not np.array_equal(reference, self.db):
+                raise ValueError('The build with {} processes differs from the build with {}'.format(
+                    processes, next(iter(report))))
+        if verbose:
+            baseline = next(iter(report.values()))
+            print('{:>10}{:>12}{:>10}'.format('processes', 'seconds', 'speedup'))
+            for processes, seconds in report.items():
+                print('{:>10}{:>12.1f}{:>9.2f}x'.format(processes, seconds, baseline / seconds))
+        return report
+
+
+class SymmetryReducedPatternDataBase(PatternDataBase):
+    def __init__(self, cube: RubiksCube, directory='.'):
+        """
+        Corner pattern database stored for symmetry representatives only: conjugates by the 16 symmetries of
+          cube.symmetry_face_maps have the same distance to the goal, so a corner state is mapped to the representative
+          (smallest rank) of the class of its permutation and to the orientation conjugated by the same symmetry. The
+          40,320 permutations fall into 2,768 classes, so the table has 2,768 * 3^7 = 6,053,616 entries (3 MB) instead
+          of 88,179,840 (42 MB). Ranks, moves and lookups are those of the full corner database.
+        :param cube:      RubiksCube, the goal
+        :param directory: str, directory of the cached symmetry tables (see Coordinate.load_symmetry_table)
+        """
+        super().__init__(cube, 'corner')
+        self.name = 'corner_sym{}'.format(symmetry_count)
+        permutation_symmetries = CornerPermutation().load_symmetry_table(directory).astype(np.int64)
+        self.orientation_symmetries = CornerOrientation().load_symmetry_table(directory).astype(np.int64)
+        representatives = permutation_symmetries.min(axis=1)
+        self.representatives = np.unique(representatives)
+        self.permutation_classes = np.searchsorted(self.representatives, representatives)
+        #  a symmetry that maps each permutation to its representative
+        self.permutation_symmetry = permutation_symmetries.argmin(axis=1)
+        self.size = len(self.representatives) * ranking.rank_constant
+
+    def reduced_ranks(self, ranks):
+        """
+        :param ranks: np.ndarray of int64, corner ranks
+        :return:      np.ndarray of int64, the indices of the entries of their representatives
+        """
+        permutation, orientation = np.divmod(ranks, ranking.rank_constant)
+        return self.permutation_classes[permutation] * ranking.rank_constant + \
+            self.orientation_symmetries[orientation, self.permutation_symmetry[permutation]]
+
+    def get_entries(self, ranks):
+        """
+        :param ranks: np.ndarray of int64, corner ranks
+        :return:      np.ndarray of uint8, the entries of their representatives
+        """
+        return super().get_entries(self.reduced_ranks(np.asarray(ranks, dtype=np.int64)))
+
+    def set_entries(self, ranks, cost):
+        """
+        Conjugate ranks share the entry of their representative (and have the same distance), so merge_entries and
+          add_entry work on corner ranks as well
+        :param ranks: np.ndarray of int64, corner ranks
+        :param cost:  int or np.ndarray of uint8 (one per rank), the entries of the ranks (less than UNSET)
+        :return:      True
+        """
+        return super().set_entries(self.reduced_ranks(np.asarray(ranks, dtype=np.int64)), cost)
+
+    def lookup(self, cube):
+        return int(self.get_entries(np.array([self.rank(cube)]))[0])
+
+    def pattern_spec(self):
+        pattern_spec = super().pattern_spec()
+        pattern_spec['symmetries'] = symmetry_count
+        return pattern_spec
+
+    def reduce(self, pattern_database):
+        """
+        Keep the entries of the representatives of a full corner database
+        :param pattern_database: PatternDataBase, a built or loaded corner database
+        :return:                 True
+        """
+        indices = np.arange(self.size, dtype=np.int64)
+        classes, orientations = np.divmod(indices, ranking.rank_constant)
+        self.db = np.full((self.size + 1) // 2, 0xFF, dtype=np.uint8)
+        entries = pattern_database.get_entries(self.representatives[classes] * ranking.rank_constant + orientations)
+        PatternDataBase.set_entries(self, indices, entries)  # indices of the table, not corner ranks
         return True
 
-    def bfs(self):
-            """
-            Breadth-first search to find the shortest path to each node
-            :return:
-            """
-            self.add_entry(0, 0)
-            self.queue.append((self.cube, 0, '', ''))  # (cube, cost, last_action, second_last_action)
-            current_max_depth = 0
-            # no need to go deeper than 20 moves; all solvable Rubik's Cube states can be solved in 20 moves or less
-            max_depth = 20
-            i = 0
-            less = 0
-            while self.queue:
-                i += 1
-                if i % 1000 == 0:
-                    print('Iteration: {}'.format(i))
-                    print('Queue length: {}'.format(len(self.queue)))
-                current_entry = self.queue.popleft()
-                current_cube = current_entry[0]
-                current_cost = current_entry[1]
-                if current_cost > current_max_depth:
-                    current_max_depth = current_cost
-                    print('Current max depth: {}'.format(current_max_depth))
-                last_action = current_entry[2]
-                second_last_action = current_entry[3]
-                available_actions = current_cube.prune_action(last_action=last_action,
-                                                              second_last_action=second_last_action)
-
-                for action in available_actions:
-                    successor = current_cube.copy()
-                    successor.twist(action)
-                    successor_rank = self.rank(successor)
-                    successor_cost = current_cost + 1
-                    if self.db[successor_rank] == 0 or successor_cost < self.db[successor_rank]:
-                        self.add_entry(successor_rank, successor_cost)
-                        self.queue.append((successor, successor_cost, action, last_action))
-                del current_cube
-            return True
+    def bfs(self, directory='.', chunk_size=1 << 20, use_move_tables=True, processes=1, checkpoint=None,
+            checkpoint_interval=600, verbose=True):
+        """
+        Build the full corner database (see PatternDataBase.bfs) and keep the entries of the representatives
+        :return: True
+        """
+        pattern_database = PatternDataBase(self.cube, 'corner')
+        pattern_database.bfs(directory, chunk_size, use_move_tables, processes, checkpoint, checkpoint_interval,
+                             verbose)
+        return self.reduce(pattern_database)
 
+    def resume(self, checkpoint=None, directory='.', chunk_size=1 << 20, use_move_tables=True, processes=1,
+               checkpoint_interval=600, verbose=True):
+        pattern_database = PatternDataBase(self.cube, 'corner')
+        pattern_database.resume(checkpoint, directory, chunk_size, use_move_tables, processes, checkpoint_interval,
+                                verbose)
+        return self.reduce(pattern_database)
@@ -2,20 +2,17 @@ import math
 import numpy as np
 
 
-def permutation_is_valid(permutation):
-    if len(permutation) == 0:
-        return False
-    minimum = np.min(permutation)
-    maximum = np.max(permutation)
+factorials = [math.factorial(i) for i in range(13)]  # up to 12!, for the 12 edges
+_popcounts = [bin(mask).count('1') for mask in range(1 << 12)]  # number of set bits of every 12-bit mask
 
-    used = np.zeros(maximum - minimum + 1)
-    for i in permutation:
-        used[i - minimum] += 1
 
-    if np.min(used) == 1 and np.max(used) == 1:
-        return True
-    else:
-        return False
+def permutation_is_valid(permutation):
+    """
+    :param permutation: list of int
+    :return:            bool, whether the values are distinct and consecutive
+    """
+    return len(permutation) > 0 and len(set(permutation)) == len(permutation) and \
+        max(permutation) - min(permutation) == len(permutation) - 1
 
 
 def count_lesser(i, permutation):
@@ -23,53 +20,44 @@ def count_lesser(i, permutation):
 
 
 def partial(i, permutation):
-    return count_lesser(i, permutation) * math.factorial(len(permutation) - 1 - i)
+    return count_lesser(i, permutation) * factorials[len(permutation) - 1 - i]
 
 
-def lehmer_rank_corner(permutation):
+def lehmer_rank_corner(permutation, validate=True):
     """
     Return Lehmer Code for the given permutation. Permutation has to contain numbers from 0 to len(permutation)-1.
     This function is based on the algorithm described in the paper:
     "Ranking and Unranking Permutations in Linear Time" by A. Ruskey and J. Sawada.
+    :param permutation: list of int, a permutation of range(len(permutation))
+    :param validate:    bool, whether to check the permutation first (False for trusted internal calls)
+    :return:            int, the rank, or False if the permutation is not valid
     """
-
-    if not permutation_is_valid(permutation):
+    if validate and not permutation_is_valid(permutation):
         return False
-
-    return sum(partial(i, permutation) for i in range(0, len(permutation)))
+    return rank_partial_permutation(permutation, len(permutation))
 
 
 def lehmer_unrank_corner(length, lehmer):
     """Return permutation for the given Lehmer Code and permutation length. Result permutation contains
     number from 0 to length-1.
     """
-    result = [(lehmer % math.factorial(length - i)) // math.factorial(length - 1 - i) for i in range(length)]
-    used = np.zeros(length, dtype=bool)
-    for i in range(length):
-        count = 0
-        for j in range(length):
-            if not used[j]:
-                count += 1
-            if count == result[i] + 1:
-                result[i] = j
-                used[j] = True
-                break
-    return result
+    return unrank_partial_permutation(lehmer, length, length)
 
 
-def convert_from_dec(num, base):
+def convert_from_dec(num, base, length=None):
     """
     Convert a number from one base to another
-    :param num:  int, base-10 number to be converted
-    :param base: int, base to be converted to
-    :return:     int, number converted to the new base
+    :param num:    int, base-10 number to be converted
+    :param base:   int, base to be converted to
+    :param length: int, number of digits (padded with zeros); the fewest digits needed if None
+    :return:       np.ndarray of int64, the digits of the number in the new base, the most significant first
     """
-    if num == 0:
-        return 0
-    if base == 10:
-        return num
-    digits = np.zeros(7)
-    for i in range(7):
+    if length is None:
+        length = 1
+        while base ** length <= num:
+            length += 1
+    digits = np.zeros(length, dtype=np.int64)
+    for i in range(length):
         digits[i] = num % base
         num //= base
     return digits[::-1]  # reverse the order of the digits
@@ -87,33 +75,240 @@ def convert_to_dec(arr, base):
     n = len(arr)
     result = 0
     for i in range(n):
-        result += arr[i] * base ** i
+        result += int(arr[i]) * base ** i
     return result
 
 
 rank_constant = 3**7  # 2187 to ensure that the rank is unique
+corner_rank_count = math.factorial(8) * rank_constant  # 88,179,840 corner states
+
+
+def edge_rank_count(k):
+    """
+    :param k: int, number of edges in the subset
+    :return:  int, number of ranks of the locations and rotations of k edges (42,577,920 for 6 edges)
+    """
+    return math.factorial(12) // math.factorial(12 - k) * 2 ** k
 
 
 def rank_corner(position, rotation):
     """
     Rank a position and rotation of corner cubies
     :param position:  list of 8 int, each integer is the position of the corner cubie
-    :param rotation:  list of 7 int, each integer is the rotation of the corner cubie
-    :return:          int, rank of the position and rotation
+    :param rotation:  list of 8 int, each integer is the rotation of the corner cubie (the last one is implied)
+    :return:          int, rank of the position and rotation in [0, corner_rank_count)
     """
-    position_rank = lehmer_rank_corner(position)
+    position_rank = lehmer_rank_corner(list(position), validate=False)
     rotation_rank = convert_to_dec(rotation[:-1], 3)
-    result = np.int32(position_rank * rank_constant + rotation_rank)
-    return position_rank
-    # return result
+    return int(position_rank * rank_constant + rotation_rank)
 
 
 def unrank_corner(rank):
     """
     Unrank a position and rotation of corner cubies
     :param rank: int, rank of the position and rotation
-    :return:     tuple of list of 8 int and list of 7 int, position and rotation of the corner cubies
+    :return:     tuple of list of 8 int and list of 8 int, position and rotation of the corner cubies
     """
     position = lehmer_unrank_corner(8, rank // rank_constant)
-    rotation = convert_from_dec(rank % rank_constant, 3)
+    rotation = unrank_orientation(rank % rank_constant, 3, 8)
     return position, rotation
+
+
+def rank_partial_permutation(values, n):
+    """
+    Rank a k-permutation of range(n) (k distinct values) with a mixed-radix Lehmer code; for k = n this is the same
+      rank as lehmer_rank_corner, since the number of smaller values after an item equals the item minus the number
+      of smaller values before it. The values seen so far are kept in a bitmask, so the rank takes linear time.
+    :param values: list of k int, distinct values in range(n)
+    :param n:      int, number of possible values
+    :return:       int, rank in [0, n! / (n-k)!)
+    """
+    rank = 0
+    used = 0
+    for i, value in enumerate(values):
+        smaller = used & ((1 << value) - 1)
+        rank = rank * (n - i) + value - (_popcounts[smaller] if n <= 12 else bin(smaller).count('1'))
+        used |= 1 << value
+    return int(rank)
+
+
+def unrank_partial_permutation(rank, n, k):
+    """
+    :param rank: int, rank generated by rank_partial_permutation
+    :param n:    int, number of possible values
+    :param k:    int, number of values
+    :return:     list of k int, the k-permutation
+    """
+    digits = []
+    for i in range(k - 1, -1, -1):
+        digits.append(rank % (n - i))
+        rank //= n - i
+    unused = list(range(n))
+    return [unused.pop(digit) for digit in reversed(digits)]
+
+
+def permutation_weights(n, k):
+    """
+    :return: np.ndarray of int64 of length k, the weight (n-i-1)! / (n-k)! of the i-th digit of a rank
+    """
+    return np.array([factorials[n - i - 1] // factorials[n - k] for i in range(k)], dtype=np.int64)
+
+
+def rank_many(values, n, validate=True):
+    """
+    Vectorized rank_partial_permutation
+    :param values:   np.ndarray of shape (N, k), k-permutations of range(n)
+    :param n:        int, number of possible values (at most 12)
+    :param validate: bool, whether to check the values first (False for trusted internal calls)
+    :return:         np.ndarray of int64 of length N
+    """
+    values = np.asarray(values, dtype=np.int64)
+    k = values.shape[1]
+    if validate and values.size > 0 and (values.min() < 0 or values.max() >= n or
+                                         (np.diff(np.sort(values, axis=1), axis=1) == 0).any()):
+        raise ValueError('Not {}-permutations of range({})'.format(k, n))
+    values = values.T.copy()  # one contiguous row per position
+    digits = values.copy()
+    for i in range(k - 1):  # the digit of a value is the value minus the number of smaller values before it
+        digits[i + 1:] -= values[i + 1:] > values[i]
+    return permutation_weights(n, k) @ digits
+
+
+def unrank_many(ranks, n, k, validate=True):
+    """
+    Vectorized unrank_partial_permutation: the digits are decoded from the last one, since a value that is the d-th
+      unused value after the i-th value is chosen becomes d + 1 if d >= the i-th value, and d otherwise.
+    :param ranks:    np.ndarray of int64 of length N, ranks generated by rank_many
+    :param n:        int, number of possible values (at most 12)
+    :param k:        int, number of values
+    :param validate: bool, whether to check the ranks first (False for trusted internal calls)
+    :return:         np.ndarray of int64 of shape (N, k)
+    """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    if validate and ranks.size > 0 and (ranks.min() < 0 or ranks.max() >= factorials[n] // factorials[n - k]):
+        raise ValueError('Ranks out of range for {}-permutations of range({})'.format(k, n))
+    values = (ranks // permutation_weights(n, k)[:, None]) % (n - np.arange(k, dtype=np.int64))[:, None]
+    for i in range(k - 2, -1, -1):
+        values[i + 1:] += values[i + 1:] >= values[i]
+    return values.T
+
+
+def myrvold_ruskey_rank_many(permutations, validate=True):
+    """
+    Rank permutations in linear time (Myrvold and Ruskey, 2001): the last value is swapped into its place, which gives
+      one mixed-radix digit per position. The ranks are a bijection onto [0, n!) but not in lexicographic order, so
+      they suit uses that only need distinct ranks (e.g. a visited bitset); tables that are saved to disk use the
+      Lehmer ranks of rank_many, which these ranks are not compatible with.
+    :param permutations: np.ndarray of shape (N, n), permutations of range(n)
+    :param validate:     bool, whether to check the permutations first (False for trusted internal calls)
+    :return:             np.ndarray of int64 of length N, ranks in [0, n!)
+    """
+    permutations = np.array(permutations, dtype=np.int64)
+    count, n = permutations.shape
+    if validate and permutations.size > 0 and \
+            (np.sort(permutations, axis=1) != np.arange(n, dtype=np.int64)).any():
+        raise ValueError('Not permutations of range({})'.format(n))
+    inverses = np.empty_like(permutations)
+    rows = np.arange(count)
+    inverses[rows[:, None], permutations] = np.arange(n, dtype=np.int64)
+    ranks = np.zeros(count, dtype=np.int64)
+    weight = 1
+    for i in range(n - 1, 0, -1):
+        digits = permutations[:, i].copy()
+        locations = inverses[:, i]  # where i is; it is swapped with the last value of the prefix
+        permutations[rows, locations] = digits
+        inverses[rows, digits] = locations
+        ranks += digits * weight
+        weight *= i + 1
+    return ranks
+
+
+def myrvold_ruskey_unrank_many(ranks, n, validate=True):
+    """
+    :param ranks:    np.ndarray of int64 of length N, ranks generated by myrvold_ruskey_rank_many
+    :param n:        int, number of values
+    :param validate: bool, whether to check the ranks first (False for trusted internal calls)
+    :return:         np.ndarray of int64 of shape (N, n), the permutations
+    """
+    ranks = np.array(ranks, dtype=np.int64)
+    if validate and ranks.size > 0 and (ranks.min() < 0 or ranks.max() >= factorials[n]):
+        raise ValueError('Ranks out of range for permutations of range({})'.format(n))
+    permutations = np.tile(np.arange(n, dtype=np.int64), (len(ranks), 1))
+    rows = np.arange(len(ranks))
+    for i in range(n - 1, 0, -1):
+        ranks, digits = np.divmod(ranks, i + 1)
+        swapped = permutations[rows, digits]
+        permutations[rows, digits] = permutations[:, i]
+        permutations[:, i] = swapped
+    return permutations
+
+
+def rank_orientation(rotation, base):
+    """
+    Rank the orientations of cubies; the last one is determined by the others (the sum is 0 mod base), so it is left out
+    :param rotation: list of int, the rotation of every cubie
+    :param base:     int, 3 for corners and 2 for edges
+    :return:         int, rank in [0, base ** (len(rotation) - 1))
+    """
+    return convert_to_dec(rotation[:-1], base)
+
+
+def unrank_orientation(rank, base, length):
+    """
+    :param rank:   int, rank generated by rank_orientation
+    :param base:   int, 3 for corners and 2 for edges
+    :param length: int, number of cubies
+    :return:       list of int, the rotation of every cubie
+    """
+    rotation = []
+    for i in range(length - 1):
+        rotation.append(rank % base)
+        rank //= base
+    rotation.append(-sum(rotation) % base)
+    return rotation
+
+
+def rank_orientation_many(rotations, base):
+    """
+    Vectorized rank_orientation
+    :param rotations: np.ndarray of shape (N, length), the rotation of every cubie
+    :param base:      int, 3 for corners and 2 for edges
+    :return:          np.ndarray of int64 of length N
+    """
+    return np.asarray(rotations)[:, :-1].astype(np.int64) @ base ** np.arange(rotations.shape[1] - 1, dtype=np.int64)
+
+
+def unrank_orientation_many(ranks, base, length):
+    """
+    Vectorized unrank_orientation
+    :return: np.ndarray of int64 of shape (N, length)
+    """
+    rotations = np.empty((len(ranks), length), dtype=np.int64)
+    rotations[:, :-1] = (np.asarray(ranks, dtype=np.int64)[:, None] // base ** np.arange(length - 1)) % base
+    rotations[:, -1] = -rotations[:, :-1].sum(axis=1) % base
+    return rotations
+
+
+def rank_edges(position, rotation, edges):
+    """
+    Rank the locations and rotations of a subset of the edge cubies: the locations are ranked as a k-permutation of the
+      12 edge positions, and the rotations are appended as k bits (bit i for edges[i])
+    :param position: list of 12 int, the edge cubie at each position
+    :param rotation: list of 12 int, the rotation of the edge cubie at each position
+    :param edges:    tuple of k int, the edge cubies of the subset
+    :return:         int, rank in [0, edge_rank_count(k))
+    """
+    where = {int(edge): location for location, edge in enumerate(position)}
+    locations = [where[edge] for edge in edges]
+    rotation_bits = sum(int(rotation[location]) << i for i, location in enumerate(locations))
+    return (rank_partial_permutation(locations, 12) << len(edges)) + rotation_bits
+
+
+def unrank_edges(rank, k):
+    """
+    :param rank: int, rank generated by rank_edges
+    :param k:    int, number of edges in the subset
+    :return:     tuple of list of k int and list of k int, the locations and rotations of the edges of the subset
+    """
+    rotations = [(rank >> i) & 1 for i in range(k)]
+    return unrank_partial_permutation(rank >> k, 12, k), rotations
@@ -0,0 +1,227 @@
+import os
+import time
+import numpy as np
+from cube import RubiksCube, cube_action_names
+from coordinates import CornerPermutation, CornerOrientation, EdgeOrientation, UDSlice, UDEdgePermutation, \
+    SlicePermutation, phase2_move_ids
+from move_pruning import START
+from pdb_format import write_pdb, load_pdb
+
+UNSET = 255  # a pruning table entry that has not been reached (yet)
+DEADLINE_CHECK_INTERVAL = 256  # number of nodes (of either phase) between two checks of the time limit
+
+
+def build_pruning_table(first_table, second_table, second_size, solved):
+    """
+    Exact distance of every pair of two coordinates to the solved pair, by a breadth-first search on the pair
+      first * second_size + second; new states are found with the table itself, so no frontier needs to be deduplicated.
+    :param first_table:  np.ndarray of shape (first size, moves), the move table of the first coordinate
+    :param second_table: np.ndarray of shape (second_size, moves), the move table of the second coordinate, with the
+                         same moves in the same columns
+    :param second_size:  int, number of values of the second coordinate
+    :param solved:       int, the solved pair
+    :return:             np.ndarray of uint8 of length first size * second_size
+    """
+    first_table, second_table = first_table.astype(np.int64), second_table.astype(np.int64)
+    table = np.full(len(first_table) * second_size, UNSET, dtype=np.uint8)
+    table[solved] = 0
+    frontier = np.array([solved], dtype=np.int64)
+    depth = 0
+    while len(frontier) > 0:
+        depth += 1
+        first, second = np.divmod(frontier, second_size)
+        successors = (first_table[first] * second_size + second_table[second]).ravel()
+        table[successors[table[successors] == UNSET]] = depth
+        frontier = np.flatnonzero(table == depth)
+    return table
+
+
+class TwoPhaseSolver:
+    def __init__(self, directory='.', move_pruning=None):
+        """
+        Two-phase solver in the style of Kociemba: phase 1 searches the moves that bring the cube into the subgroup
+          G1 = <U, D, R2, L2, F2, B2> (corner and edge orientations solved, UD-slice edges in the slice), and phase 2
+          solves the cube within G1 with the 10 moves of the subgroup. Both phases are IDA* on coordinates with move
+          tables, and their heuristics are the maximum of two pruning tables over pairs of coordinates.
+        Solutions are near-optimal rather than optimal: after the first one, phase 1 keeps enumerating longer
+          sequences, each completed by the shortest phase 2, until no shorter solution is possible or time runs out.
+        The move tables and pruning tables are built once and cached in directory (see Coordinate.load_move_table
+          and pdb_format.py).
+        :param directory:    str, directory of the cached tables
+        :param move_pruning: MovePruning over the move ids; RubiksCube().build_move_pruning() if None
+        """
+        self.directory = directory
+        if move_pruning is None:
+            move_pruning = RubiksCube().build_move_pruning()
+        self.move_pruning = move_pruning
+        self.ud_slice = UDSlice()
+        self.phase1_coordinates = [CornerOrientation(), EdgeOrientation(), self.ud_slice]
+        self.phase2_coordinates = [CornerPermutation(), UDEdgePermutation(), SlicePermutation()]
+        corner_orientation, edge_orientation, ud_slice = [coordinate.load_move_table(directory)
+                                                          for coordinate in self.phase1_coordinates]
+        corner_permutation, ud_edges, slice_permutation = [coordinate.load_move_table(directory)
+                                                           for coordinate in self.phase2_coordinates]
+        corner_permutation = corner_permutation[:, list(phase2_move_ids)]  # the same columns as the phase 2 tables
+        slice_size = self.ud_slice.size
+        self.pruning_tables = {
+            'corner_orientation_slice': (corner_orientation, ud_slice, slice_size, self.ud_slice.solved),
+            'edge_orientation_slice': (edge_orientation, ud_slice, slice_size, self.ud_slice.solved),
+            'corner_permutation_slice': (corner_permutation, slice_permutation, SlicePermutation.size, 0),
+            'ud_edge_permutation_slice': (ud_edges, slice_permutation, SlicePermutation.size, 0)}
+        for name in self.pruning_tables:
+            self.pruning_tables[name] = self.load_pruning_table(name, *self.pruning_tables[name])
+        #  Read-only memoryviews, which the depth-first searches index faster than NumPy arrays (as Python ints) without
+        #   copying the tables: the move tables stay NumPy arrays and the pruning tables stay memory maps, so forked
+        #   processes keep sharing their pages (see BatchCubeSolver), where lists would be un-shared by refcount writes.
+        #   The move tables are flattened: the entry of (coordinate, column) is at coordinate * columns + column.
+        self.phase1_tables = [memoryview(table.reshape(-1)).toreadonly()
+                              for table in (corner_orientation, edge_orientation, ud_slice)]
+        self.phase2_tables = [memoryview(table.reshape(-1)).toreadonly()
+                              for table in (corner_permutation, ud_edges, slice_permutation)]
+        self.phase1_pruning = [memoryview(self.pruning_tables[name]).toreadonly()
+                               for name in ('corner_orientation_slice', 'edge_orientation_slice')]
+        self.phase2_pruning = [memoryview(self.pruning_tables[name]).toreadonly()
+                               for name in ('corner_permutation_slice', 'ud_edge_permutation_slice')]
+
+    def load_pruning_table(self, name, first_table, second_table, second_size, solved):
+        """
+        Load a pruning table from its file in the directory, and build and save it first if it does not exist yet
+        :return: np.ndarray of uint8
+        """
+        filename = os.path.join(self.directory, 'two_phase_{}.pdb'.format(name))
+        pattern = {'two_phase': name, 'ranking': 'first coordinate * second size + second coordinate'}
+        if not os.path.exists(filename):
+            table = build_pruning_table(first_table, second_table, second_size, solved)
+            write_pdb(filename, table, 'rubiks_cube', pattern, 8, len(table))
+        return np.asarray(load_pdb(filename, 'rubiks_cube', pattern)[1])
+
+    def solve(self, cube: RubiksCube, time_limit=1.0, target_length=None):
+        """
+        Search for ever shorter solutions until the time limit, until one is found at the target length, or until phase
+          1 is as long as the best solution (which then cannot be improved by this search)
+        :param cube:          RubiksCube, the cube to solve
+        :param time_limit:    float, number of seconds after which the best solution so far is returned
+        :param target_length: int, a solution length that is good enough, or None to use the whole time
+        :return: either: a tuple of a list of actions, the cost of the actions and the list of (seconds, cost) of every
+                         improvement
+                     or: (False, False, []), if no solution was found before the time limit
+        """
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit
+        fsm_table = self.move_pruning.table.tolist()
+        corner_orientation_table, edge_orientation_table, slice_table = self.phase1_tables
+        corner_permutation_table, ud_edge_table, slice_permutation_table = self.phase2_tables
+        corner_orientation_pruning, edge_orientation_pruning = self.phase1_pruning
+        corner_permutation_pruning, ud_edge_pruning = self.phase2_pruning
+        slice_size, slice_permutation_size = self.ud_slice.size, SlicePermutation.size
+        phase1_moves, phase2_moves = list(range(len(cube_action_names))), list(enumerate(phase2_move_ids))
+        phase1_columns, phase2_columns = len(phase1_moves), len(phase2_moves)
+        phase2_move_set = set(phase2_move_ids)
+        path = []  # move ids of phase 1, and then of phase 2
+        best = {'path': None, 'length': 31}  # every cube is solved in at most 30 moves by this search
+        history = []
+        nodes = 0
+        timed_out = False
+
+        def out_of_time():
+            # count a node, and check the clock every DEADLINE_CHECK_INTERVAL nodes; once the time limit has passed,
+            #   both searches unwind without looking at any further node
+            nonlocal nodes, timed_out
+            nodes += 1
+            if nodes % DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                timed_out = True
+            return timed_out
+
+        def phase2_search(corner_permutation, ud_edges, slice_permutation, togo, fsm_state):
+            # True if the phase 2 coordinates are solved in exactly togo moves (the heuristics are exact per pair);
+            #   False as well once the time limit has passed
+            if togo == 0:
+                return corner_permutation == 0 and ud_edges == 0 and slice_permutation == 0
+            if out_of_time():
+                return False
+            fsm_row = fsm_table[fsm_state]
+            corner_permutation_row = corner_permutation * phase2_columns
+            ud_edge_row = ud_edges * phase2_columns
+            slice_permutation_row = slice_permutation * phase2_columns
+            for column, move_id in phase2_moves:
+                next_fsm_state = fsm_row[move_id]
+                if next_fsm_state < 0:
+                    continue
+                next_corner_permutation = corner_permutation_table[corner_permutation_row + column]
+                next_ud_edges = ud_edge_table[ud_edge_row + column]
+                next_slice_permutation = slice_permutation_table[slice_permutation_row + column]
+                if corner_permutation_pruning[next_corner_permutation * slice_permutation_size +
+                                              next_slice_permutation] >= togo or \
+                        ud_edge_pruning[next_ud_edges * slice_permutation_size + next_slice_permutation] >= togo:
+                    continue
+                path.append(move_id)
+                if phase2_search(next_corner_permutation, next_ud_edges, next_slice_permutation, togo - 1,
+                                 next_fsm_state):
+                    return True
+                path.pop()
+                if timed_out:
+                    return False
+            return False
+
+        def phase2(fsm_state):
+            # complete the phase 1 path with the shortest phase 2 that makes the solution shorter than the best one
+            g1_cube = cube.copy()
+            for move_id in path:
+                g1_cube.twist(cube_action_names[move_id])
+            corner_permutation, ud_edges, slice_permutation = [coordinate.from_cube(g1_cube)
+                                                               for coordinate in self.phase2_coordinates]
+            h_cost = max(corner_permutation_pruning[corner_permutation * slice_permutation_size + slice_permutation],
+                         ud_edge_pruning[ud_edges * slice_permutation_size + slice_permutation])
+            phase1_length = len(path)
+            for togo in range(h_cost, best['length'] - phase1_length):
+                if phase2_search(corner_permutation, ud_edges, slice_permutation, togo, fsm_state):
+                    best['path'], best['length'] = list(path), len(path)
+                    history.append((time.perf_counter() - start_time, len(path)))
+                    del path[phase1_length:]
+                    return True
+                if timed_out:
+                    break
+            return False
+
+        def phase1_search(corner_orientation, edge_orientation, ud_slice, togo, fsm_state):
+            # returns False once the search should stop (time limit or target reached)
+            if out_of_time():
+                return False
+            if togo == 0:
+                if len(path) > 0 and path[-1] in phase2_move_set:
+                    return True  # the same G1 state was reached by a shorter phase 1
+                phase2(fsm_state)
+                return not timed_out and (target_length is None or best['length'] > target_length)
+            fsm_row = fsm_table[fsm_state]
+            corner_orientation_row = corner_orientation * phase1_columns
+            edge_orientation_row = edge_orientation * phase1_columns
+            ud_slice_row = ud_slice * phase1_columns
+            for move_id in phase1_moves:
+                next_fsm_state = fsm_row[move_id]
+                if next_fsm_state < 0:
+                    continue
+                next_corner_orientation = corner_orientation_table[corner_orientation_row + move_id]
+                next_edge_orientation = edge_orientation_table[edge_orientation_row + move_id]
+                next_ud_slice = slice_table[ud_slice_row + move_id]
+                if corner_orientation_pruning[next_corner_orientation * slice_size + next_ud_slice] >= togo or \
+                        edge_orientation_pruning[next_edge_orientation * slice_size + next_ud_slice] >= togo:
+                    continue
+                path.append(move_id)
+                keep_searching = phase1_search(next_corner_orientation, next_edge_orientation, next_ud_slice,
+                                               togo - 1, next_fsm_state)
+                path.pop()
+                if not keep_searching:
+                    return False
+            return True
+
+        corner_orientation, edge_orientation, ud_slice = [coordinate.from_cube(cube)
+                                                          for coordinate in self.phase1_coordinates]
+        phase1_length = max(corner_orientation_pruning[corner_orientation * slice_size + ud_slice],
+                            edge_orientation_pruning[edge_orientation * slice_size + ud_slice])
+        while phase1_length < best['length'] and not timed_out and time.perf_counter() < deadline:
+            if not phase1_search(corner_orientation, edge_orientation, ud_slice, phase1_length, START):
+                break
+            phase1_length += 1
+        if best['path'] is None:
+            return False, False, history
+        return [cube_action_names[move_id] for move_id in best['path']], best['length'], history
@@ -0,0 +1,125 @@
+import math
+import numpy as np
+from sliding_tiles import SlidingTiles, sliding_tiles_action_names, NO_ACTION
+
+UNSET = 255  # a state that has not been reached (yet)
+
+
+class SlidingTilesDistanceTable:
+    def __init__(self, sliding_tiles: SlidingTiles):
+        """
+        Exact distance of every solvable state of a small puzzle (the 8-puzzle has 181,440 of them), stored in a
+          uint8 array indexed by rank. A state is ranked by its blank position and the Lehmer rank of the order of
+          its tiles; solvable orders all share one parity for a given blank position, and Lehmer ranks 2i and 2i+1
+          differ by one swap, so the rank is halved: index = blank * (m! / 2) + rank // 2 for m = n - 1 tiles.
+        :param sliding_tiles: SlidingTiles, the puzzle (at most 3x3)
+        """
+        if sliding_tiles.number_of_tiles > 9:
+            raise ValueError('A complete distance table is only feasible up to the 8-puzzle')
+        self.sliding_tiles = sliding_tiles
+        self.n = sliding_tiles.number_of_tiles
+        self.half = math.factorial(self.n - 1) // 2
+        self.size = self.n * self.half
+        self.db = None
+        self.neighbours = np.full((self.n, 4), -1, dtype=np.int64)
+        for position in range(self.n):
+            for action_id, neighbour_index in sliding_tiles.move_table[position][NO_ACTION]:
+                self.neighbours[position, action_id] = neighbour_index
+
+    def index_many(self, states):
+        """
+        :param states: np.ndarray of shape (N, n), states denoted by rows with indices as positions and values as tiles
+        :return:       np.ndarray of int64 of length N, the table index of every state
+        """
+        empty = states == self.sliding_tiles.empty_tile
+        blanks = np.argmax(empty, axis=1)
+        tiles = states[~empty].reshape(len(states), self.n - 1).astype(np.int64)
+        ranks = np.zeros(len(states), dtype=np.int64)
+        for i in range(self.n - 1):
+            ranks = ranks * (self.n - 1 - i) + (tiles[:, i + 1:] < tiles[:, i:i + 1]).sum(axis=1)
+        return blanks * self.half + ranks // 2
+
+    def index(self, state):
+        tiles = [tile for tile in state if tile != self.sliding_tiles.empty_tile]
+        rank = 0
+        for i in range(self.n - 1):
+            rank = rank * (self.n - 1 - i) + sum(1 for tile in tiles[i + 1:] if tile < tiles[i])
+        return state.index(self.sliding_tiles.empty_tile) * self.half + rank // 2
+
+    def build(self, verbose=False):
+        """
+        Fill the table by a backward breadth-first search from the goal, one depth layer at a time; every layer is a
+          NumPy array of states, expanded in the four directions at once.
+        :param verbose: bool, whether to print the size of each layer
+        :return:        True
+        """
+        self.db = np.full(self.size, UNSET, dtype=np.uint8)
+        frontier = np.array([self.sliding_tiles.goal], dtype=np.uint8)
+        self.db[self.index_many(frontier)] = 0
+        depth = 0
+        while len(frontier) > 0:
+            if verbose:
+                print('Depth: {}, states: {}'.format(depth, len(frontier)))
+            depth += 1
+            blanks = np.argmax(frontier == self.sliding_tiles.empty_tile, axis=1)
+            successors = []
+            for action_id in range(4):
+                neighbours = self.neighbours[blanks, action_id]
+                valid = neighbours >= 0
+                moved = frontier[valid].copy()
+                rows = np.arange(len(moved))
+                moved[rows, blanks[valid]] = moved[rows, neighbours[valid]]
+                moved[rows, neighbours[valid]] = self.sliding_tiles.empty_tile
+                successors.append(moved)
+            successors = np.concatenate(successors)
+            indices, first_index = np.unique(self.index_many(successors), return_index=True)
+            new = self.db[indices] == UNSET
+            self.db[indices[new]] = depth
+            frontier = successors[first_index[new]]
+        return True
+
+    def export_db(self, filename='sliding_tiles_9_distances.npy'):
+        np.save(filename, self.db)
+        return True
+
+    def load(self, filename='sliding_tiles_9_distances.npy'):
+        self.db = np.load(filename, mmap_mode='r')
+        return True
+
+    def distance(self, state):
+        """
+        :param state: list, a solvable state
+        :return:      int, the exact number of moves needed to solve the state
+        """
+        return int(self.db[self.index(state)])
+
+    def heuristic(self, state=None, state_p=None):
+        """
+        Perfect heuristic; it has the same signature as SlidingTiles.manhattan_distance
+        """
+        return self.distance(state)
+
+    def incremental_heuristic(self, parent_h, tile, from_index, to_index, packed_state):
+        return self.distance(self.sliding_tiles.unpack_state(packed_state))
+
+    def solve(self, start_state):
+        """
+        Extract an optimal solution by table descent: from every state, move to a successor one step closer to the goal
+        :param start_state: list, a solvable state
+        :return:            a tuple of a list of actions and the cost of the actions
+        """
+        if not self.sliding_tiles.is_solvable(start_state):
+            raise ValueError('Invalid start state: {}'.format(start_state))
+        state = list(start_state)
+        remaining = self.distance(state)
+        list_of_actions = []
+        while remaining > 0:
+            empty_tile_index = state.index(self.sliding_tiles.empty_tile)
+            for action_id, neighbour_index in self.sliding_tiles.move_table[empty_tile_index][NO_ACTION]:
+                successor = self.sliding_tiles.swap_neighbours(state, empty_tile_index, neighbour_index)
+                if self.distance(successor) == remaining - 1:
+                    list_of_actions.append(sliding_tiles_action_names[action_id])
+                    state = successor
+                    break
+            remaining -= 1
+        return list_of_actions, len(list_of_actions)
@@ -0,0 +1,250 @@
+import os
+import numpy as np
+from pdb_format import write_pdb, load_pdb
+from sliding_tiles import SlidingTiles, NO_ACTION
+
+# Disjoint partitions of the tiles (goal layout [1, ..., n-1, 0]); the lookups of disjoint pattern databases can be
+#   added up because each database counts the moves of its own tiles only.
+default_partitions = {
+    9: ((1, 2, 3, 4), (5, 6, 7, 8)),
+    16: ((1, 2, 3, 4, 5, 6, 7), (8, 9, 10, 11, 12, 13, 14, 15)),
+    25: ((1, 2, 6, 7, 11, 12), (3, 4, 5, 8, 9, 10), (16, 17, 18, 21, 22, 23), (13, 14, 15, 19, 20, 24)),
+}
+UNSET = 255  # an entry that has not been reached (yet)
+
+
+class AdditiveHeuristic(int):
+    """
+    The value of the additive pattern database heuristic, carrying the positions of the tiles of every pattern and the
+      lookup of every database, so that the heuristic of a successor only ranks the moved tile's pattern again (see
+      AdditivePatternDataBase.incremental_heuristic)
+    """
+    def __new__(cls, positions, values):
+        additive_heuristic = super().__new__(cls, sum(values))
+        additive_heuristic.positions = positions
+        additive_heuristic.values = values
+        return additive_heuristic
+
+
+class SlidingTilesPatternDataBase:
+    def __init__(self, sliding_tiles: SlidingTiles, pattern):
+        """
+        Pattern database of one group of tiles: the entry of a placement of the pattern tiles is the minimum number of
+          moves of pattern tiles needed to bring them home, where moves of the other tiles are free.
+        Placements are ranked as k-permutations of the n positions, so the table has n! / (n-k)! uint8 entries.
+        :param sliding_tiles: SlidingTiles, the puzzle
+        :param pattern:       tuple of int, the tiles of the pattern
+        """
+        self.sliding_tiles = sliding_tiles
+        self.pattern = tuple(pattern)
+        self.n = sliding_tiles.number_of_tiles
+        self.k = len(self.pattern)
+        self.size = int(np.prod(np.arange(self.n - self.k + 1, self.n + 1, dtype=np.int64)))
+        self.db = None
+        #  neighbours[position, action id] is the position reached by moving the blank, or -1 (see move_table)
+        self.neighbours = np.full((self.n, 4), -1, dtype=np.int64)
+        for position in range(self.n):
+            for action_id, neighbour_index in sliding_tiles.move_table[position][NO_ACTION]:
+                self.neighbours[position, action_id] = neighbour_index
+
+    def rank_many(self, positions):
+        """
+        Rank placements of the pattern tiles (k-permutations of n positions) with a mixed-radix Lehmer code
+        :param positions: np.ndarray of shape (N, k), the position of each pattern tile
+        :return:          np.ndarray of int64 of length N, ranks in [0, n! / (n-k)!)
+        """
+        positions = positions.astype(np.int64)
+        ranks = np.zeros(len(positions), dtype=np.int64)
+        for i in range(self.k):
+            smaller_before = (positions[:, :i] < positions[:, i:i + 1]).sum(axis=1)
+            ranks = ranks * (self.n - i) + positions[:, i] - smaller_before
+        return ranks
+
+    def rank(self, positions):
+        rank = 0
+        for i in range(self.k):
+            rank = rank * (self.n - i) + positions[i] - sum(1 for p in positions[:i] if p < positions[i])
+        return rank
+
+    def expand(self, positions, blanks, zero_cost):
+        """
+        Move the blank in every direction from a batch of abstract states (pattern tile positions, blank position)
+        :param positions: np.ndarray of shape (N, k), positions of the pattern tiles
+        :param blanks:    np.ndarray of length N, positions of the blank
+        :param zero_cost: bool, whether to generate the free moves (the blank swaps with a non-pattern tile)
+                          or the costly ones (the blank swaps with a pattern tile)
+        :return:          tuple of np.ndarray, positions and blanks of the successors
+        """
+        successor_positions = []
+        successor_blanks = []
+        for action_id in range(4):
+            neighbours = self.neighbours[blanks, action_id]
+            occupied = positions == neighbours[:, None]
+            pattern_move = occupied.any(axis=1)
+            if zero_cost:
+                selected = (neighbours >= 0) & ~pattern_move
+                successor_positions.append(positions[selected])
+            else:
+                selected = (neighbours >= 0) & pattern_move
+                moved = positions[selected].copy()
+                moved[occupied[selected]] = blanks[selected]  # the pattern tile moves into the blank
+                successor_positions.append(moved)
+            successor_blanks.append(neighbours[selected])
+        return np.concatenate(successor_positions), np.concatenate(successor_blanks)
+
+    def visit(self, positions, blanks, visited):
+        """
+        Keep the abstract states that have not been visited yet (once each) and mark them as visited
+        :return: tuple of np.ndarray, positions and blanks of the new states
+        """
+        keys = self.rank_many(positions) * self.n + blanks
+        keys, first_index = np.unique(keys, return_index=True)
+        new = (visited[keys >> 3] & (1 << (keys & 7)).astype(np.uint8)) == 0
+        keys = keys[new]
+        np.bitwise_or.at(visited, keys >> 3, (1 << (keys & 7)).astype(np.uint8))
+        first_index = first_index[new]
+        return positions[first_index], blanks[first_index]
+
+    def build(self, verbose=False):
+        """
+        Build the database by a backward breadth-first search from the goal over (pattern placement, blank position)
+          states, one depth layer at a time: a layer is first closed under the free moves, then the moves of pattern
+          tiles generate the next layer. Frontiers are NumPy arrays, and visited states are kept in a bitset.
+        :param verbose: bool, whether to print the size of each layer
+        :return:        True
+        """
+        self.db = np.full(self.size, UNSET, dtype=np.uint8)
+        visited = np.zeros((self.size * self.n + 7) // 8, dtype=np.uint8)
+        goal = self.sliding_tiles.goal
+        positions = np.array([[goal.index(tile) for tile in self.pattern]], dtype=np.uint8)
+        blanks = np.array([goal.index(self.sliding_tiles.empty_tile)], dtype=np.int64)
+        positions, blanks = self.visit(positions, blanks, visited)
+        depth = 0
+        while len(blanks) > 0:
+            layer_positions = [positions]
+            layer_blanks = [blanks]
+            while len(blanks) > 0:  # close the layer under the free moves
+                positions, blanks = self.visit(*self.expand(positions, blanks, zero_cost=True), visited)
+                layer_positions.append(positions)
+                layer_blanks.append(blanks)
+            positions = np.concatenate(layer_positions)
+            blanks = np.concatenate(layer_blanks)
+            ranks = self.rank_many(positions)
+            ranks = ranks[self.db[ranks] == UNSET]
+            self.db[ranks] = depth
+            if verbose:
+                print('Depth: {}, abstract states: {}, new entries: {}'.format(depth, len(blanks),
+                                                                            len(np.unique(ranks))))
+            positions, blanks = self.visit(*self.expand(positions, blanks, zero_cost=False), visited)
+            depth += 1
+        return True
+
+    def filename(self, directory='.'):
+        return os.path.join(directory, 'sliding_tiles_{}_pdb_{}.pdb'.format(
+            self.n, '-'.join(str(tile) for tile in self.pattern)))
+
+    def pattern_spec(self):
+        """
+        :return: dict, the puzzle size, the pattern tiles and their ranking, stored in the header of the database file
+        """
+        return {'n': self.n, 'tiles': list(self.pattern), 'ranking': 'k-permutation rank of the tile positions'}
+
+    def export_db(self, directory='.'):
+        return write_pdb(self.filename(directory), self.db, 'sliding_tiles', self.pattern_spec(), 8, self.size)
+
+    def load(self, directory='.', verify=False):
+        """
+        Memory-map a database written by export_db; the table is only paged in as it is used
+        :param directory: str, the directory of the database file
+        :param verify:    bool, whether to check the checksum of the table (which reads the whole file)
+        :return:          True
+        """
+        header, self.db = load_pdb(self.filename(directory), 'sliding_tiles', self.pattern_spec(), verify)
+        if header['entry_count'] != self.size:
+            raise ValueError('{} has {} entries, expected {}'.format(self.filename(directory), header['entry_count'],
+                                                                      self.size))
+        return True
+
+    def lookup(self, state):
+        """
+        :param state: list, a state denoted by a list with indices as positions and values as tiles
+        :return:      int, the number of moves of pattern tiles needed to solve the state
+        """
+        return int(self.db[self.rank([state.index(tile) for tile in self.pattern])])
+
+
+class AdditivePatternDataBase:
+    def __init__(self, sliding_tiles: SlidingTiles, partition=None):
+        """
+        Additive disjoint pattern databases; the heuristic is the sum of the lookups of all patterns, which is
+          admissible because no move is counted twice.
+        :param sliding_tiles: SlidingTiles, the puzzle
+        :param partition:     tuple of tuples of int, disjoint groups of tiles; see default_partitions if None
+        """
+        if partition is None:
+            partition = default_partitions[sliding_tiles.number_of_tiles]
+        self.sliding_tiles = sliding_tiles
+        self.databases = [SlidingTilesPatternDataBase(sliding_tiles, pattern) for pattern in partition]
+        #  pattern_of[tile] is the index of the database of the tile (-1 for the empty tile and unpartitioned tiles)
+        self.pattern_of = [-1] * sliding_tiles.number_of_tiles
+        #  slot_of[tile] is the index of the tile in the pattern of its database
+        self.slot_of = [-1] * sliding_tiles.number_of_tiles
+        for index, database in enumerate(self.databases):
+            for slot, tile in enumerate(database.pattern):
+                self.pattern_of[tile] = index
+                self.slot_of[tile] = slot
+
+    def build(self, verbose=False):
+        for database in self.databases:
+            database.build(verbose=verbose)
+        return True
+
+    def export_db(self, directory='.'):
+        for database in self.databases:
+            database.export_db(directory)
+        return True
+
+    def load(self, directory='.'):
+        for database in self.databases:
+            database.load(directory)
+        return True
+
+    def heuristic(self, state=None, state_p=None):
+        """
+        Additive pattern database heuristic; it has the same signature as SlidingTiles.manhattan_distance
+        :param state:    list, the state to evaluate
+        :param state_p:  not used; only for compatibility with the parent class
+        :return:         AdditiveHeuristic, the sum of the lookups of all patterns
+        """
+        positions = tuple(tuple(state.index(tile) for tile in database.pattern) for database in self.databases)
+        return AdditiveHeuristic(positions, tuple(int(database.db[database.rank(pattern_positions)])
+                                                  for database, pattern_positions in zip(self.databases, positions)))
+
+    def incremental_heuristic(self, parent_h, tile, from_index, to_index, packed_state):
+        """
+        Heuristic of a successor from its parent's: parent_h carries the pattern positions and lookups of the parent
+          (see AdditiveHeuristic), and only the position of the moved tile changes, so only the database of that tile
+          is ranked and looked up again, in O(k^2) for a pattern of k tiles.
+        :param parent_h:     AdditiveHeuristic, the heuristic of the parent state; if it is a plain int, the positions
+                             are recomputed from the packed successor
+        :param tile:         int, the tile that was moved
+        :param from_index:   int, position of the tile in the parent state
+        :param to_index:     int, position of the tile in the successor state
+        :param packed_state: int, the packed successor (see SlidingTiles.pack_state)
+        :return:             AdditiveHeuristic, the heuristic of the successor state
+        """
+        index = self.pattern_of[tile]
+        if index < 0:
+            return parent_h  # a tile outside the partition is not counted by any database
+        if not isinstance(parent_h, AdditiveHeuristic):
+            state = self.sliding_tiles.unpack_state(packed_state)
+            state[from_index], state[to_index] = tile, self.sliding_tiles.empty_tile
+            parent_h = self.heuristic(state)
+        database = self.databases[index]
+        pattern_positions = list(parent_h.positions[index])
+        pattern_positions[self.slot_of[tile]] = to_index
+        positions = list(parent_h.positions)
+        positions[index] = tuple(pattern_positions)
+        values = list(parent_h.values)
+        values[index] = int(database.db[database.rank(pattern_positions)])
+        return AdditiveHeuristic(tuple(positions), tuple(values))
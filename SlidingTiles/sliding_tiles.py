@@ -1,10 +1,30 @@
+from bisect import bisect_left
+from collections import deque
 import numpy as np
 from state_space import StateSpace
+from move_pruning import MovePruning
 
 # Note: in our implementation, the action are defined as which neighbour to switch with the empty tile
 #   for instance, [[0, 1]  with 'down' swaps the square below 0 with 2 resulting in [[2, 1]
 #                  [2, 3]]                                                           [0, 3]].
 sliding_tiles_actions = {'up', 'down', 'left', 'right'}
+#  Move tables work on small integers: an action id is the index of the action in this tuple, the inverse of an action
+#   id is (action_id ^ 1), and NO_ACTION stands for "no last action" (the start state).
+sliding_tiles_action_names = ('up', 'down', 'left', 'right')
+sliding_tiles_action_ids = {action: action_id for action_id, action in enumerate(sliding_tiles_action_names)}
+NO_ACTION = len(sliding_tiles_action_names)
+
+
+class WalkingDistance(int):
+    """
+    The value of the walking distance heuristic, carrying the row and column configurations it was read from, so that
+      the walking distance of a successor is updated from them with two table powers (see incremental_walking_distance)
+    """
+    def __new__(cls, value, row_code, column_code):
+        walking_distance = super().__new__(cls, value)
+        walking_distance.row_code = row_code
+        walking_distance.column_code = column_code
+        return walking_distance
 
 
 class SlidingTiles(StateSpace):
@@ -20,6 +40,27 @@ class SlidingTiles(StateSpace):
         self.goal.append(self.empty_tile)  # For the sake of clarity; we define the empty tile explicitly
         self.start = None
         self.actions = sliding_tiles_actions
+        #  Packed representation: tile i of the list is stored in bits [i * bits_per_tile, (i + 1) * bits_per_tile) of a
+        #   single int, i.e. 4 bits per tile (one 64-bit word) up to the 15-puzzle; the blank position is tracked
+        #   next to it so that it never has to be searched for.
+        self.bits_per_tile = max(4, (number_of_tiles - 1).bit_length())
+        self.tile_mask = (1 << self.bits_per_tile) - 1
+        self.packed_goal = self.pack_state(self.goal)
+        #  Goal-coordinate table: tile_distances[tile][position] is the Manhattan distance of the tile from its goal
+        #   position when it sits at the given position (always 0 for the empty tile).
+        self.tile_distances = [[0 if tile == self.empty_tile else
+                                abs(self.goal.index(tile) // self.width - position // self.width) +
+                                abs(self.goal.index(tile) % self.width - position % self.width)
+                                for position in range(number_of_tiles)] for tile in range(number_of_tiles)]
+        #  Move tables: move_table[empty tile index][last action id] is a tuple of (action id, neighbour index) pairs of
+        #   the actions available from there, with the inverse of the last action already removed.
+        self.move_table = self.build_move_table()
+        #  Goal row and column of every tile (-1 for the empty tile), used by linear conflict and walking distance
+        self.goal_rows = [-1 if tile == self.empty_tile else self.goal.index(tile) // self.width
+                          for tile in range(number_of_tiles)]
+        self.goal_columns = [-1 if tile == self.empty_tile else self.goal.index(tile) % self.width
+                             for tile in range(number_of_tiles)]
+        self.walking_distance_table = None  # built on first use, see build_walking_distance_table
 
     def valid_puzzle(self):
         if self.start is None:
@@ -65,35 +106,278 @@ class SlidingTiles(StateSpace):
     def generate_random_state(self):
         """
         Generate a random state for the sliding tiles puzzle; it is guaranteed that it would be solvable.
+        Instead of reshuffling until the state is solvable, an unsolvable shuffle gets two of its tiles swapped, which
+          flips the parity of the inversions; this maps the unsolvable shuffles one-to-one onto the solvable ones, so
+          the result is still uniform over the solvable states.
         :return: a random state for the sliding tiles puzzle
         """
         state = list(range(self.number_of_tiles))
         np.random.shuffle(state)  # shuffle method is conducted in-place
-        while not self.is_solvable(state):
-            np.random.shuffle(state)
+        if not self.is_solvable(state):
+            first, second = [position for position, tile in enumerate(state) if tile != self.empty_tile][:2]
+            state[first], state[second] = state[second], state[first]
         return state
 
+    def are_solvable(self, states):
+        """
+        Vectorized is_solvable for a batch of states; the inversions are counted one position at a time over the whole
+          batch, i.e. O(n) NumPy operations on (N, n) arrays.
+        :param states: np.ndarray of shape (N, n), states denoted by rows with indices as positions and values as tiles
+        :return:       np.ndarray of bool of length N
+        """
+        states = np.asarray(states)
+        inversions = np.zeros(len(states), dtype=np.int64)
+        tiles = states != self.empty_tile
+        for i in range(self.number_of_tiles - 1):
+            later = (states[:, i + 1:] < states[:, i:i + 1]) & tiles[:, i + 1:]
+            inversions += later.sum(axis=1) * tiles[:, i]
+        if self.width % 2 == 1:
+            return inversions % 2 == 0
+        blank_rows = np.argmax(~tiles, axis=1) // self.width
+        return (inversions + blank_rows) % 2 == 1
+
+    def generate_states(self, n, seed=42, method='uniform', depth=None):
+        """
+        Generate a batch of solvable states at once.
+        'uniform' shuffles every row independently and fixes the unsolvable ones by swapping their first two tiles (see
+          generate_random_state); 'random_walk' applies depth random moves (never undoing the last one) from the goal,
+          which controls the difficulty of the instances. Both are reproducible for a given seed.
+        :param n:      int, number of states
+        :param seed:   int, seed of the random number generator
+        :param method: str, 'uniform' or 'random_walk'
+        :param depth:  int, number of moves of the random walks (required for 'random_walk')
+        :return:       np.ndarray of uint8 with shape (n, number_of_tiles)
+        """
+        rng = np.random.default_rng(seed)
+        if method == 'uniform':
+            states = rng.permuted(np.tile(np.arange(self.number_of_tiles, dtype=np.uint8), (n, 1)), axis=1)
+            unsolvable = np.flatnonzero(~self.are_solvable(states))
+            tiles = states[unsolvable] != self.empty_tile
+            order = np.cumsum(tiles, axis=1)
+            first = np.argmax(order == 1, axis=1)
+            second = np.argmax(order == 2, axis=1)
+            states[unsolvable, first], states[unsolvable, second] = states[unsolvable, second], states[unsolvable, first]
+            return states
+        elif method == 'random_walk':
+            if depth is None:
+                raise ValueError('A random walk needs a depth')
+            # padded move tables: options[blank, last action id] lists (action id, neighbour index) pairs
+            options = np.zeros((self.number_of_tiles, NO_ACTION + 1, 4, 2), dtype=np.int64)
+            option_counts = np.zeros((self.number_of_tiles, NO_ACTION + 1), dtype=np.int64)
+            for empty_tile_index in range(self.number_of_tiles):
+                for last_action_id in range(NO_ACTION + 1):
+                    moves = self.move_table[empty_tile_index][last_action_id]
+                    option_counts[empty_tile_index, last_action_id] = len(moves)
+                    options[empty_tile_index, last_action_id, :len(moves)] = moves
+            states = np.tile(np.array(self.goal, dtype=np.uint8), (n, 1))
+            rows = np.arange(n)
+            blanks = np.full(n, self.goal.index(self.empty_tile), dtype=np.int64)
+            last_action_ids = np.full(n, NO_ACTION, dtype=np.int64)
+            for _ in range(depth):
+                choices = (rng.random(n) * option_counts[blanks, last_action_ids]).astype(np.int64)
+                chosen = options[blanks, last_action_ids, choices]
+                neighbours = chosen[:, 1]
+                states[rows, blanks] = states[rows, neighbours]
+                states[rows, neighbours] = self.empty_tile
+                blanks = neighbours
+                last_action_ids = chosen[:, 0]
+            return states
+        else:
+            raise ValueError('Unknown generation method: {}'.format(method))
+
     def manhattan_distance(self, state=None, state_p=None):
         """
         Calculate the Manhattan distance between the current state and the goal state (solved state), which is
           the sum of the moves each tile need to take to reach its goal position, ignoring all tiles in their way.
         This is a relaxation from the problem, and an admissible heuristic function used in the A* algorithm.
-        This method takes O(n) time and O(1) space as it iterates over the entire state once.
+        This method takes O(n) time and O(1) space as it iterates over the entire state once, looking up the distance of
+          each tile in the precomputed goal-coordinate table (see incremental_manhattan_distance for successors).
         :param state:    the state to calculate the Manhattan distance for; if None, then the current state is used
         :param state_p:  not used; only for compatibility with the parent class
         :return:         the Manhattan distance between the current state and the goal state
         """
-        distance = 0
-        for i in range(self.number_of_tiles):
-            if i != self.empty_tile:  # ignore the empty tile
-                #  The distance is the sum of the vertical and horizontal distances
-                height_difference = abs(self.goal.index(i) // self.width -
-                                        state.index(i) // self.width)  # vertical dist
-                width_difference = abs(self.goal.index(i) % self.width -
-                                       state.index(i) % self.width)  # horizontal dist
-                distance += height_difference + width_difference
-        # print('Manhattan distance: {}'.format(distance))
-        return distance
+        tile_distances = self.tile_distances
+        return sum(tile_distances[tile][position] for position, tile in enumerate(state))
+
+    def incremental_manhattan_distance(self, parent_h, tile, from_index, to_index, packed_state=None):
+        """
+        Manhattan distance of a successor computed from its parent's in O(1): only the moved tile changes position, so
+          the distance changes by exactly +1 or -1.
+        :param parent_h:     int, the Manhattan distance of the parent state
+        :param tile:         int, the tile that was moved
+        :param from_index:   int, position of the tile in the parent state
+        :param to_index:     int, position of the tile in the successor state (the parent's empty tile position)
+        :param packed_state: not used; only for compatibility with incremental heuristics that need the successor
+        :return:             int, the Manhattan distance of the successor state
+        """
+        return parent_h + self.tile_distances[tile][to_index] - self.tile_distances[tile][from_index]
+
+    @staticmethod
+    def conflicts_in_line(goal_offsets):
+        """
+        Number of tiles that must leave a line so that the remaining ones are in goal order; each of them costs at
+          least two moves more than the Manhattan distance. It is the line length minus the longest increasing
+          subsequence of goal offsets.
+        :param goal_offsets: list of int, goal column (for a row) or goal row (for a column) of the tiles of the line
+                             that belong to it, in order
+        :return:             int, the number of tiles to be removed from the line
+        """
+        tails = []
+        for offset in goal_offsets:
+            index = bisect_left(tails, offset)
+            if index == len(tails):
+                tails.append(offset)
+            else:
+                tails[index] = offset
+        return len(goal_offsets) - len(tails)
+
+    def row_conflicts(self, tiles, row):
+        goal_rows = self.goal_rows
+        goal_columns = self.goal_columns
+        return self.conflicts_in_line([goal_columns[tile] for tile in tiles if goal_rows[tile] == row])
+
+    def column_conflicts(self, tiles, column):
+        goal_rows = self.goal_rows
+        goal_columns = self.goal_columns
+        return self.conflicts_in_line([goal_rows[tile] for tile in tiles if goal_columns[tile] == column])
+
+    def linear_conflict(self, state=None, state_p=None):
+        """
+        Manhattan distance plus two moves for every tile that has to leave its goal row or column to let another tile
+          of that line pass (linear conflicts); it is admissible and dominates the Manhattan distance.
+        This method takes O(n) time (the lines have sqrt(n) tiles each).
+        :param state:    list, the state to evaluate
+        :param state_p:  not used; only for compatibility with the parent class
+        :return:         int, the linear-conflict heuristic of the state
+        """
+        width = self.width
+        conflicts = 0
+        for line in range(width):
+            conflicts += self.row_conflicts(state[line * width:(line + 1) * width], line)
+            conflicts += self.column_conflicts(state[line::width], line)
+        return self.manhattan_distance(state) + 2 * conflicts
+
+    def packed_line(self, packed_state, first_position, step):
+        bits_per_tile = self.bits_per_tile
+        tile_mask = self.tile_mask
+        return [(packed_state >> (position * bits_per_tile)) & tile_mask
+                for position in range(first_position, first_position + step * self.width, step)]
+
+    def incremental_linear_conflict(self, parent_h, tile, from_index, to_index, packed_state):
+        """
+        Linear conflict of a successor from its parent's: the Manhattan part changes by +-1, and only the two lines the
+          tile leaves and enters can change their conflicts (rows for a vertical move, columns for a horizontal one).
+        :param parent_h:     int, the linear-conflict heuristic of the parent state
+        :param tile:         int, the tile that was moved
+        :param from_index:   int, position of the tile in the parent state
+        :param to_index:     int, position of the tile in the successor state
+        :param packed_state: int, the packed successor (see pack_state)
+        :return:             int, the linear-conflict heuristic of the successor state
+        """
+        width = self.width
+        h = parent_h + self.tile_distances[tile][to_index] - self.tile_distances[tile][from_index]
+        packed_parent = packed_state - (tile << (to_index * self.bits_per_tile)) \
+            + (tile << (from_index * self.bits_per_tile))
+        if abs(from_index - to_index) == width:  # vertical move: the rows change
+            for row in (from_index // width, to_index // width):
+                h += 2 * (self.row_conflicts(self.packed_line(packed_state, row * width, 1), row) -
+                          self.row_conflicts(self.packed_line(packed_parent, row * width, 1), row))
+        else:  # horizontal move: the columns change
+            for column in (from_index % width, to_index % width):
+                h += 2 * (self.column_conflicts(self.packed_line(packed_state, column, width), column) -
+                          self.column_conflicts(self.packed_line(packed_parent, column, width), column))
+        return h
+
+    def build_walking_distance_table(self):
+        """
+        Precompute the walking distance table by a breadth-first search over row configurations. A configuration
+          counts, for every row, how many of its tiles belong to each goal row; a move takes a tile from a row next
+          to the blank's row into the blank's row. Columns use the same table, as the puzzle is square.
+        The configuration is encoded as sum(count[row][goal_row] * (width + 1) ** (row * width + goal_row)).
+        :return: True
+        """
+        width = self.width
+        base = width + 1
+        powers = [[base ** (row * width + goal_row) for goal_row in range(width)] for row in range(width)]
+        counts = [[0] * width for _ in range(width)]
+        for position, tile in enumerate(self.goal):
+            if tile != self.empty_tile:
+                counts[position // width][self.goal_rows[tile]] += 1
+        goal_code = sum(counts[row][goal_row] * powers[row][goal_row]
+                        for row in range(width) for goal_row in range(width))
+        blank_row = self.goal.index(self.empty_tile) // width
+        table = {goal_code: 0}
+        queue = deque([(goal_code, blank_row)])
+        while queue:
+            code, blank_row = queue.popleft()
+            for row in (blank_row - 1, blank_row + 1):
+                if 0 <= row < width:
+                    for goal_row in range(width):
+                        if (code // powers[row][goal_row]) % base > 0:  # a tile of this goal row can move
+                            successor = code - powers[row][goal_row] + powers[blank_row][goal_row]
+                            if successor not in table:
+                                table[successor] = table[code] + 1
+                                queue.append((successor, row))
+        self.walking_distance_table = table
+        self.walking_distance_powers = powers
+        return True
+
+    def walking_distance_codes(self, state):
+        powers = self.walking_distance_powers
+        row_code = 0
+        column_code = 0
+        for position, tile in enumerate(state):
+            if tile != self.empty_tile:
+                row_code += powers[position // self.width][self.goal_rows[tile]]
+                column_code += powers[position % self.width][self.goal_columns[tile]]
+        return row_code, column_code
+
+    def walking_distance(self, state=None, state_p=None):
+        """
+        Walking distance: the number of vertical moves needed when tiles only need to reach their goal row (ignoring
+          their order within rows), plus the same for horizontal moves and goal columns, read from a precomputed
+          table. It is admissible and usually stronger than the Manhattan distance.
+        :param state:    list, the state to evaluate
+        :param state_p:  not used; only for compatibility with the parent class
+        :return:         int, the walking distance of the state
+        """
+        if self.walking_distance_table is None:
+            self.build_walking_distance_table()
+        row_code, column_code = self.walking_distance_codes(state)
+        return WalkingDistance(self.walking_distance_table[row_code] + self.walking_distance_table[column_code],
+                               row_code, column_code)
+
+    def incremental_walking_distance(self, parent_h, tile, from_index, to_index, packed_state):
+        """
+        Walking distance of a successor from its parent's in O(1): parent_h carries the row and column configurations
+          of the parent (see WalkingDistance), and the move takes the tile from one row (vertical move) or column
+          (horizontal move) into the next, which changes the configuration by two table powers.
+        :param parent_h:     WalkingDistance, the walking distance of the parent state; if it is a plain int, the
+                             configurations of the parent are recomputed from the packed successor
+        :param tile:         int, the tile that was moved
+        :param from_index:   int, position of the tile in the parent state
+        :param to_index:     int, position of the tile in the successor state
+        :param packed_state: int, the packed successor (see pack_state)
+        :return:             WalkingDistance, the walking distance of the successor state
+        """
+        if self.walking_distance_table is None:
+            self.build_walking_distance_table()
+        width = self.width
+        powers = self.walking_distance_powers
+        if isinstance(parent_h, WalkingDistance):
+            row_code, column_code = parent_h.row_code, parent_h.column_code
+        else:
+            packed_parent = packed_state - (tile << (to_index * self.bits_per_tile)) \
+                + (tile << (from_index * self.bits_per_tile))
+            row_code, column_code = self.walking_distance_codes(self.unpack_state(packed_parent))
+        if abs(from_index - to_index) == width:  # vertical move: the row configuration changes
+            goal_row = self.goal_rows[tile]
+            row_code += powers[to_index // width][goal_row] - powers[from_index // width][goal_row]
+        else:  # horizontal move: the column configuration changes
+            goal_column = self.goal_columns[tile]
+            column_code += powers[to_index % width][goal_column] - powers[from_index % width][goal_column]
+        return WalkingDistance(self.walking_distance_table[row_code] + self.walking_distance_table[column_code],
+                               row_code, column_code)
 
     @staticmethod
     def swap_neighbours(state_list, index_1, index_2):
@@ -111,18 +395,99 @@ class SlidingTiles(StateSpace):
         temp_list[index_2] = state_list[index_1]
         return temp_list
 
+    def pack_state(self, state):
+        """
+        Convert a state from the list form to the packed form
+        :param state: list (or np.ndarray), a state denoted by a list with indices as positions and values as tiles
+        :return:      int, the packed state
+        """
+        packed_state = 0
+        for position, tile in enumerate(state):
+            packed_state |= int(tile) << (position * self.bits_per_tile)  # int, as NumPy tiles would overflow
+        return packed_state
+
+    def unpack_state(self, packed_state):
+        """
+        Convert a state from the packed form to the list form
+        :param packed_state: int, the packed state
+        :return:             list, the state denoted by a list with indices as positions and values as tiles
+        """
+        return [(packed_state >> (position * self.bits_per_tile)) & self.tile_mask
+                for position in range(self.number_of_tiles)]
+
+    def build_move_table(self):
+        """
+        Compute the move tables once; see __init__
+        :return: list (indexed by the empty tile index) of lists (indexed by the last action id) of tuples of
+                 (action id, neighbour index) pairs
+        """
+        offsets = (-self.width, self.width, -1, 1)  # up, down, left, right
+        move_table = []
+        for empty_tile_index in range(self.number_of_tiles):
+            row, column = divmod(empty_tile_index, self.width)
+            possible = (row > 0, row < self.height - 1, column > 0, column < self.width - 1)
+            move_table.append([tuple((action_id, empty_tile_index + offsets[action_id])
+                                     for action_id in range(NO_ACTION)
+                                     if possible[action_id] and action_id != last_action_id ^ 1)
+                               for last_action_id in range(NO_ACTION + 1)])
+        return move_table
+
+    def get_neighbour_index(self, empty_tile_index, action):
+        for action_id, neighbour_index in self.move_table[empty_tile_index][NO_ACTION]:
+            if sliding_tiles_action_names[action_id] == action:
+                return neighbour_index
+        return None
+
+    def get_packed_successors(self, packed_state, empty_tile_index, last_action_id=NO_ACTION):
+        """
+        Get the successors of a packed state by iterating over the move table; the inverse of the last action is pruned
+        :param packed_state:     int, the packed state
+        :param empty_tile_index: int, position of the empty tile in the packed state
+        :param last_action_id:   int, id of the last action taken to reach the state (NO_ACTION for the start)
+        :return:                 list of tuples (action id, packed successor, new position of the empty tile,
+                                 moved tile); action names are in sliding_tiles_action_names
+        """
+        bits_per_tile = self.bits_per_tile
+        tile_mask = self.tile_mask
+        empty_shift = empty_tile_index * bits_per_tile
+        successors = []
+        for action_id, neighbour_index in self.move_table[empty_tile_index][last_action_id]:
+            shift = neighbour_index * bits_per_tile
+            tile = (packed_state >> shift) & tile_mask
+            successors.append((action_id, packed_state - (tile << shift) + (tile << empty_shift), neighbour_index, tile))
+        return successors
+
+    def build_move_pruning(self, max_length=6, seed=42):
+        """
+        Discover the redundant action sequences of the puzzle up to max_length (see MovePruning.discover), e.g. the
+          inverse pairs, and going half way around a 2x2 block clockwise instead of anticlockwise. Whether a sequence
+          applies and how it permutes the tiles only depends on the position of the empty tile, so one sample per
+          position is exact.
+        :param max_length: int, length of the longest sequences to test
+        :param seed:       int, seed of the random number generator for the samples
+        :return:           MovePruning over the action ids (see sliding_tiles_action_names)
+        """
+        rng = np.random.default_rng(seed)
+        samples = []
+        for empty_tile_index in range(self.number_of_tiles):
+            state = rng.permutation(self.number_of_tiles).tolist()
+            samples.append(self.swap_neighbours(state, state.index(self.empty_tile), empty_tile_index))
+
+        def successor(state, action_id):
+            empty_tile_index = state.index(self.empty_tile)
+            for candidate_id, neighbour_index in self.move_table[empty_tile_index][NO_ACTION]:
+                if candidate_id == action_id:
+                    return self.swap_neighbours(state, empty_tile_index, neighbour_index)
+            return None
+
+        move_pruning = MovePruning(NO_ACTION)
+        move_pruning.discover(successor, samples, max_length=max_length, key=tuple)
+        return move_pruning
+
     def get_successor(self, current_state, action, verbose=False):
         empty_tile_index = current_state.index(self.empty_tile)
         # print(verbose, action, current_state, empty_tile_index)
-        neighbour_index = None
-        if action == 'up':
-            neighbour_index = empty_tile_index - self.width
-        elif action == 'down':
-            neighbour_index = empty_tile_index + self.width
-        elif action == 'left':
-            neighbour_index = empty_tile_index - 1
-        elif action == 'right':
-            neighbour_index = empty_tile_index + 1
+        neighbour_index = self.get_neighbour_index(empty_tile_index, action)
         if neighbour_index is not None:
             new_state = self.swap_neighbours(current_state, empty_tile_index, neighbour_index)
             # if verbose:
@@ -146,13 +511,12 @@ class SlidingTiles(StateSpace):
         :return:  either: list, the successor state of the current state with the given action applied on it;
                       or: False, if the given action is invalid
         """
-        available_actions = self.get_available_actions(current_state, last_action)  # get all the possible successors
+        empty_tile_index = current_state.index(self.empty_tile)
+        last_action_id = sliding_tiles_action_ids.get(last_action, NO_ACTION)
         successors = []
-        for action in available_actions:
-            # print('verbose', verbose)
-            successor = self.get_successor(current_state=current_state, action=action, verbose=verbose)
-            if successor is not None:
-                successors.append((action, successor))
+        for action_id, neighbour_index in self.move_table[empty_tile_index][last_action_id]:
+            successors.append((sliding_tiles_action_names[action_id],
+                               self.swap_neighbours(current_state, empty_tile_index, neighbour_index)))
         if len(successors) == 0:
             return False
         return successors
@@ -165,26 +529,18 @@ class SlidingTiles(StateSpace):
           4 actions.
         :return: a list of possible actions that can be taken from the current state
         """
-        available_actions = ['up', 'down', 'left', 'right']
-        if last_action == 'up':
-            available_actions.remove('down')
-        elif last_action == 'down':
-            available_actions.remove('up')
-        elif last_action == 'left':
-            available_actions.remove('right')
-        elif last_action == 'right':
-            available_actions.remove('left')
-
-        empty_block_index = current_state.index(0)  # see where the empty block is
-        if empty_block_index % self.width == 0:  # if the empty block is on the left edge
-            available_actions.remove('left')  # moving left would be impossible
-        if empty_block_index % self.width == self.width - 1:  # if the empty block is not on the right edge
-            available_actions.remove('right')  # moving right would be impossible
-        if empty_block_index < self.width:  # if the empty block is not on the top edge
-            available_actions.remove('up')  # moving up would be impossible
-        if empty_block_index > self.number_of_tiles - self.width - 1:  # if the empty block is not on the bottom edge
-            available_actions.remove('down')  # moving down would be impossible
-        return available_actions
+        return self.get_available_actions_for_blank(current_state.index(0), last_action)
+
+    def get_available_actions_for_blank(self, empty_block_index, last_action=None):
+        """
+        Get the actions that are available when the empty block is at the given position; see get_available_actions
+        :param empty_block_index: int, position of the empty block
+        :param last_action:       str, the last action taken (its inverse is pruned), or None
+        :return: a list of possible actions that can be taken
+        """
+        last_action_id = sliding_tiles_action_ids.get(last_action, NO_ACTION)
+        return [sliding_tiles_action_names[action_id]
+                for action_id, _ in self.move_table[empty_block_index][last_action_id]]
 
     def is_solved(self, state=None):
         """
@@ -1,12 +1,44 @@
-from sliding_tiles import SlidingTiles
+import heapq
+import math
+import time
+from move_pruning import MovePruning, START
+from sliding_tiles import SlidingTiles, sliding_tiles_action_names, NO_ACTION
 
 
 class SlidingTilesSolver:
     def __init__(self, sliding_tiles: SlidingTiles):
         self.sliding_tiles = sliding_tiles
         self.heuristic = sliding_tiles.manhattan_distance
+        #  (parent h, moved tile, from index, to index, packed successor) -> h of the successor
+        self.incremental_heuristic = sliding_tiles.incremental_manhattan_distance
+        #  IDA* prunes moves with a finite-state machine; by default it only forbids undoing the last move
+        self.move_pruning = MovePruning(NO_ACTION, [(action_id, action_id ^ 1) for action_id in range(NO_ACTION)])
         self.g_cost_per_move = 1
 
+    def set_heuristic(self, heuristic, incremental_heuristic=None):
+        """
+        Use another heuristic, e.g. AdditivePatternDataBase.heuristic
+        :param heuristic:             function, state (list) -> h
+        :param incremental_heuristic: function, (parent h, moved tile, from index, to index, packed successor) -> h;
+                                      if None, the successor is unpacked and evaluated with heuristic
+        :return:                      True
+        """
+        self.heuristic = heuristic
+        if incremental_heuristic is None:
+            def incremental_heuristic(parent_h, tile, from_index, to_index, packed_state):
+                return heuristic(self.sliding_tiles.unpack_state(packed_state))
+        self.incremental_heuristic = incremental_heuristic
+        return True
+
+    def set_move_pruning(self, move_pruning):
+        """
+        Use another move pruning machine in IDA*, e.g. the one of SlidingTiles.build_move_pruning
+        :param move_pruning: MovePruning over the action ids
+        :return:             True
+        """
+        self.move_pruning = move_pruning
+        return True
+
     def visualize_board(self, state=None):
         output_buffer = ''
         if state is None:
@@ -46,7 +78,7 @@ class SlidingTilesSolver:
         current_f_cost = current_g_cost + current_h_cost
         max_iterations = 50
         iteration = 0
-        while not self.sliding_tiles.is_solved():
+        while not self.sliding_tiles.is_solved(self.sliding_tiles.current_state):
             if verbose:
                 print('Iteration: {}, actions so far:　{}'.format(iteration, list_of_actions))
                 print('Current state: {}'.format(self.sliding_tiles.current_state))
@@ -61,14 +93,20 @@ class SlidingTilesSolver:
             lowest_f_cost = -1
             lowest_f_cost_successor = None
             lowest_f_cost_action = None
-            for action in self.sliding_tiles.actions:
-                successor = self.sliding_tiles.get_successors(action)
+            current_state = self.sliding_tiles.current_state
+            empty_tile_index = current_state.index(self.sliding_tiles.empty_tile)
+            for action_id, neighbour_index in self.sliding_tiles.move_table[empty_tile_index][NO_ACTION]:
+                action = sliding_tiles_action_names[action_id]
+                tile = current_state[neighbour_index]
+                successor = self.sliding_tiles.swap_neighbours(current_state, empty_tile_index, neighbour_index)
                 print("The result of the action {} is {}: ".format(action, successor))
                 if successor:  # if successor is not False, which means the action is valid
                     available_actions.append(action)
                     available_successors.append(successor)
                     successor_g_cost = current_g_cost + self.g_cost_per_move
-                    successor_h_cost = self.heuristic(state=successor)
+                    successor_h_cost = self.incremental_heuristic(current_h_cost, tile, neighbour_index,
+                                                                  empty_tile_index,
+                                                                  self.sliding_tiles.pack_state(successor))
                     successor_f_cost = successor_g_cost + successor_h_cost
                     if verbose:
                         print('Iteration: {}, action taken:　{}'.format(iteration, action))
@@ -79,11 +117,13 @@ class SlidingTilesSolver:
                         lowest_f_cost = successor_f_cost
                         lowest_f_cost_successor = successor
                         lowest_f_cost_action = action
+                        lowest_f_cost_h_cost = successor_h_cost
             if lowest_f_cost_successor is None:  # all successors are False, no valid actions!
                 # unintended behavior! this should never happen in a sliding tile puzzle; at least one tile is movable
                 #   at any given state!
                 raise ValueError('No available successor! This should not happen!')
             current_f_cost = lowest_f_cost
+            current_h_cost = lowest_f_cost_h_cost
             list_of_actions.append(lowest_f_cost_action)
             self.sliding_tiles.current_state = lowest_f_cost_successor
         # self.visualize_board(self.sliding_tiles.current_state)
@@ -113,33 +153,41 @@ class SlidingTilesSolver:
         # Initialize the current g-cost to 0
         current_g_cost = 0
         # Initialize the current cost to the heuristic cost of the initial state
-        current_h_cost = weight*self.heuristic(start_state)
-        current_f_cost = current_g_cost + current_h_cost
+        current_h_cost = self.heuristic(start_state)
+        current_f_cost = current_g_cost + weight*current_h_cost
 
-        while not self.sliding_tiles.is_solved():
+        while not self.sliding_tiles.is_solved(self.sliding_tiles.current_state):
             available_actions = []
             available_successors = []
             lowest_f_cost = -1  # h-cost is non-negative, and g-cost is non-negative and increasing, so this is safe
             lowest_f_cost_successor = None
             lowest_f_cost_action = None
-            for action in self.sliding_tiles.actions:
-                successor = self.sliding_tiles.successor(action)
+            current_state = self.sliding_tiles.current_state
+            empty_tile_index = current_state.index(self.sliding_tiles.empty_tile)
+            for action_id, neighbour_index in self.sliding_tiles.move_table[empty_tile_index][NO_ACTION]:
+                action = sliding_tiles_action_names[action_id]
+                tile = current_state[neighbour_index]
+                successor = self.sliding_tiles.swap_neighbours(current_state, empty_tile_index, neighbour_index)
                 if successor:  # if successor is not False, which means the action is valid
                     available_actions.append(action)
                     available_successors.append(successor)
                     successor_g_cost = current_g_cost + self.g_cost_per_move
-                    successor_h_cost = self.heuristic(state=successor)
+                    successor_h_cost = self.incremental_heuristic(current_h_cost, tile, neighbour_index,
+                                                                  empty_tile_index,
+                                                                  self.sliding_tiles.pack_state(successor))
                     successor_f_cost = successor_g_cost + weight*successor_h_cost
                     if lowest_f_cost == -1 or successor_f_cost < lowest_f_cost:
                         lowest_f_cost = successor_f_cost
                         lowest_f_cost_successor = successor
                         lowest_f_cost_action = action
+                        lowest_f_cost_h_cost = successor_h_cost
             if lowest_f_cost_successor is None:  # all successors are False, no valid actions!
                 # unintended behavior! this should never happen in a sliding tile puzzle; at least one tile is movable
                 #   at any given state!
                 raise ValueError('No available successor! This should not happen!')
 
             current_f_cost = lowest_f_cost
+            current_h_cost = lowest_f_cost_h_cost
             list_of_actions.append(lowest_f_cost_action)  # add this action to the list of actions
             self.sliding_tiles.current_state = lowest_f_cost_successor  # update the current state
             current_g_cost += self.g_cost_per_move
@@ -151,3 +199,163 @@ class SlidingTilesSolver:
 
 
 
+
+    def packed_a_star(self, start_state=None, max_expansions=None):
+        """
+        A* on packed states: states are single ints (see SlidingTiles.pack_state) with the position of the empty tile
+          tracked alongside, so successors are generated with shifts and masks, and the closed list is a dict of ints.
+        :param start_state:    list, the start state; a random (solvable) state is used if None
+        :param max_expansions: int, maximum number of expansions, or None for no limit
+        :return: either: a tuple of a list of actions, the cost of the actions and the number of expansions
+                     or: (False, False, expansions), if the search failed (expansion limit reached)
+        """
+        if start_state is None:
+            start_state = self.sliding_tiles.generate_random_state()
+        else:
+            start_state = [int(tile) for tile in start_state]  # e.g. a np.uint8 row of SlidingTiles.generate_states
+            if not self.sliding_tiles.is_solvable(start_state):
+                raise ValueError('Invalid start state: {}'.format(start_state))
+        packed_start = self.sliding_tiles.pack_state(start_state)
+        packed_goal = self.sliding_tiles.packed_goal
+        start_h_cost = self.heuristic(start_state)
+        # open list entries: (f-cost, h-cost, g-cost, packed state, empty tile index, last action id)
+        open_list = [(start_h_cost, start_h_cost, 0, packed_start, start_state.index(self.sliding_tiles.empty_tile),
+                      NO_ACTION)]
+        g_costs = {packed_start: 0}
+        parents = {packed_start: (None, None)}  # packed state -> (packed parent, action id from the parent)
+        expansions = 0
+        while len(open_list) > 0:
+            f_cost, h_cost, g_cost, packed_state, empty_tile_index, last_action_id = heapq.heappop(open_list)
+            if g_cost > g_costs[packed_state]:  # a stale entry; the state was reached again more cheaply
+                continue
+            if packed_state == packed_goal:
+                list_of_actions = []
+                while parents[packed_state][0] is not None:
+                    packed_state, action_id = parents[packed_state]
+                    list_of_actions.append(sliding_tiles_action_names[action_id])
+                list_of_actions.reverse()
+                return list_of_actions, g_cost, expansions
+            expansions += 1
+            if max_expansions is not None and expansions > max_expansions:
+                break
+            for action_id, packed_successor, successor_empty_tile_index, tile in \
+                    self.sliding_tiles.get_packed_successors(packed_state, empty_tile_index, last_action_id):
+                successor_g_cost = g_cost + self.g_cost_per_move
+                if successor_g_cost < g_costs.get(packed_successor, successor_g_cost + 1):
+                    g_costs[packed_successor] = successor_g_cost
+                    parents[packed_successor] = (packed_state, action_id)
+                    successor_h_cost = self.incremental_heuristic(h_cost, tile, successor_empty_tile_index,
+                                                                  empty_tile_index, packed_successor)
+                    heapq.heappush(open_list, (successor_g_cost + successor_h_cost, successor_h_cost, successor_g_cost,
+                                               packed_successor, successor_empty_tile_index, action_id))
+        return False, False, expansions
+
+    def iterative_deepening_a_star(self, start_state=None, max_expansions=None):
+        """
+        IDA* on packed states: a depth-first search bounded by the f-cost, with the bound raised to the smallest f-cost
+          that exceeded it after every iteration. Memory is linear in the solution length, which makes it the method
+          of choice (with pattern databases) for the 15- and 24-puzzle. Moves are pruned with self.move_pruning, whose
+          machine state is carried along the path.
+        :param start_state:    list, the start state; a random (solvable) state is used if None
+        :param max_expansions: int, maximum number of expansions, or None for no limit
+        :return: either: a tuple of a list of actions, the cost of the actions and the number of expansions
+                     or: (False, False, expansions), if the search failed (expansion limit reached)
+        """
+        if start_state is None:
+            start_state = self.sliding_tiles.generate_random_state()
+        else:
+            start_state = [int(tile) for tile in start_state]  # e.g. a np.uint8 row of SlidingTiles.generate_states
+            if not self.sliding_tiles.is_solvable(start_state):
+                raise ValueError('Invalid start state: {}'.format(start_state))
+        packed_goal = self.sliding_tiles.packed_goal
+        get_packed_successors = self.sliding_tiles.get_packed_successors
+        incremental_heuristic = self.incremental_heuristic
+        g_cost_per_move = self.g_cost_per_move
+        fsm_table = self.move_pruning.table.tolist()
+        path = []  # action ids from the start state
+        expansions = 0
+
+        def depth_first_search(packed_state, empty_tile_index, g_cost, h_cost, bound, fsm_state):
+            # returns True if the goal is found, and otherwise the smallest f-cost that exceeded the bound
+            nonlocal expansions
+            f_cost = g_cost + h_cost
+            if f_cost > bound:
+                return f_cost
+            if packed_state == packed_goal:
+                return True
+            expansions += 1
+            if max_expansions is not None and expansions > max_expansions:
+                return math.inf
+            next_bound = math.inf
+            for action_id, packed_successor, successor_empty_tile_index, tile in \
+                    get_packed_successors(packed_state, empty_tile_index):
+                successor_fsm_state = fsm_table[fsm_state][action_id]
+                if successor_fsm_state < 0:  # the path would end with a redundant sequence
+                    continue
+                successor_h_cost = incremental_heuristic(h_cost, tile, successor_empty_tile_index, empty_tile_index,
+                                                         packed_successor)
+                path.append(action_id)
+                result = depth_first_search(packed_successor, successor_empty_tile_index, g_cost + g_cost_per_move,
+                                            successor_h_cost, bound, successor_fsm_state)
+                if result is True:
+                    return True
+                path.pop()
+                next_bound = min(next_bound, result)
+            return next_bound
+
+        packed_start = self.sliding_tiles.pack_state(start_state)
+        start_empty_tile_index = start_state.index(self.sliding_tiles.empty_tile)
+        start_h_cost = self.heuristic(start_state)
+        bound = start_h_cost
+        while True:
+            result = depth_first_search(packed_start, start_empty_tile_index, 0, start_h_cost, bound, START)
+            if result is True:
+                return [sliding_tiles_action_names[action_id] for action_id in path], len(path) * g_cost_per_move, \
+                    expansions
+            if result == math.inf:
+                return False, False, expansions
+            bound = result
+
+    def benchmark(self, states, heuristics=None, algorithm='iterative_deepening_a_star', verbose=True):
+        """
+        Solve the same states with several heuristics and report the trade-off between a stronger heuristic (fewer
+          expansions) and its per-node cost (time per expansion).
+        :param states:     list of lists, or np.ndarray of uint8 of shape (number of states, number of tiles) (see
+                           SlidingTiles.generate_states), the start states
+        :param heuristics: dict, name -> (heuristic, incremental heuristic); Manhattan distance, linear conflict and
+                           walking distance if None
+        :param algorithm:  str, 'iterative_deepening_a_star' or 'packed_a_star'
+        :param verbose:    bool, whether to print the report
+        :return:           dict, name -> dict of the average start h-cost, solution cost, expansions and seconds
+        """
+        if heuristics is None:
+            heuristics = {'manhattan_distance': (self.sliding_tiles.manhattan_distance,
+                                                 self.sliding_tiles.incremental_manhattan_distance),
+                          'linear_conflict': (self.sliding_tiles.linear_conflict,
+                                              self.sliding_tiles.incremental_linear_conflict),
+                          'walking_distance': (self.sliding_tiles.walking_distance,
+                                               self.sliding_tiles.incremental_walking_distance)}
+        heuristic, incremental_heuristic = self.heuristic, self.incremental_heuristic
+        report = {}
+        for name, (candidate, incremental_candidate) in heuristics.items():
+            self.set_heuristic(candidate, incremental_candidate)
+            h_costs, costs, expansions, seconds = [], [], [], []
+            for state in states:
+                state = [int(tile) for tile in state]
+                h_costs.append(candidate(state))
+                start_time = time.perf_counter()
+                _, cost, expansion_count = getattr(self, algorithm)(state)
+                seconds.append(time.perf_counter() - start_time)
+                costs.append(cost)
+                expansions.append(expansion_count)
+            report[name] = {'h_cost': sum(h_costs) / len(states), 'cost': sum(costs) / len(states),
+                            'expansions': sum(expansions) / len(states), 'seconds': sum(seconds) / len(states)}
+        self.heuristic, self.incremental_heuristic = heuristic, incremental_heuristic
+        if verbose:
+            print('{:<24}{:>10}{:>10}{:>14}{:>12}{:>16}'.format('heuristic', 'avg h', 'avg cost', 'avg expanded',
+                                                                'avg sec', 'usec/expansion'))
+            for name, row in report.items():
+                print('{:<24}{:>10.2f}{:>10.2f}{:>14.1f}{:>12.4f}{:>16.2f}'.format(
+                    name, row['h_cost'], row['cost'], row['expansions'], row['seconds'],
+                    1e6 * row['seconds'] / max(row['expansions'], 1)))
+        return report
@@ -0,0 +1,11 @@
+from sliding_tiles import SlidingTiles
+
+
+def test_pack_state_round_trip_of_generated_states():
+    for number_of_tiles in (9, 16):
+        sliding_tiles = SlidingTiles(number_of_tiles)
+        for method, depth in (('uniform', None), ('random_walk', 40)):
+            for state in sliding_tiles.generate_states(5, method=method, depth=depth):
+                packed_state = sliding_tiles.pack_state(state)
+                assert packed_state == sliding_tiles.pack_state(state.tolist())
+                assert sliding_tiles.unpack_state(packed_state) == state.tolist()
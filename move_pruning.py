@@ -0,0 +1,155 @@
+from collections import deque
+import numpy as np
+
+START = 0  # the state of the machine before any operator is applied
+PRUNED = -1  # table entry of an operator that completes a forbidden sequence
+
+
+class MovePruning:
+    def __init__(self, operator_count, forbidden=()):
+        """
+        Move pruning with a finite-state machine: a set of forbidden operator sequences (each has a cheaper or equal
+          equivalent) is compiled into an Aho-Corasick automaton over the operator ids, so that a tree search carries one
+          small int (the machine state) instead of its last moves, and prunes an operator with a single table lookup.
+        The machine state after a path is its longest suffix that is a proper prefix of a forbidden sequence, and
+          table[state, operator] is the next state, or PRUNED if the path would end with a forbidden sequence.
+        :param operator_count: int, number of operators; operators are ids in [0, operator_count)
+        :param forbidden:      iterable of tuples of operator ids, the forbidden sequences
+        """
+        self.operator_count = operator_count
+        self.forbidden = sorted(set(tuple(sequence) for sequence in forbidden), key=lambda s: (len(s), s))
+        self.table = None
+        self.compile()
+
+    def discover(self, successor, samples, max_length=2, key=repr):
+        """
+        Discover the redundant operator sequences up to max_length by enumerating the sequences from every sample, one
+          length at a time. Sequences are ordered by length and then lexicographically by operator id; a sequence A is
+          redundant if one fixed smaller sequence B reaches the same state as A from every sample where A applies (so B
+          applies there too), which is a sound replacement for any path containing A as long as the samples cover every
+          case of applicability (e.g. every position of the blank in the sliding tiles puzzle).
+        After each length the machine is compiled again, and only the sequences it does not prune are extended; this
+          keeps the forbidden sequences minimal (none of their proper substrings is redundant) and the enumeration
+          small, and the smallest optimal path contains no forbidden sequence.
+        :param successor:  function, (state, operator id) -> the successor state, or None if the operator does not apply
+        :param samples:    list, sample states
+        :param max_length: int, length of the longest sequences to test
+        :param key:        function, state -> a hashable value identifying the state
+        :return:           list of tuples, the forbidden sequences
+        """
+        self.forbidden = []
+        self.compile()
+        reached = [{key(sample): [()]} for sample in samples]  # state key -> sequences reaching it, smallest first
+        layers = [[((), START, sample)] for sample in samples]
+        for _ in range(max_length):
+            candidates = {}  # sequence -> set of smaller sequences that were equivalent in every sample so far
+            for index in range(len(samples)):
+                next_layer = []
+                for sequence, fsm_state, state in layers[index]:  # ordered, so sequences are generated smallest first
+                    for operator in range(self.operator_count):
+                        if self.table[fsm_state, operator] == PRUNED:
+                            continue
+                        child = successor(state, operator)
+                        if child is None:
+                            continue
+                        child_sequence = sequence + (operator,)
+                        equivalent = reached[index].setdefault(key(child), [])
+                        if child_sequence in candidates:
+                            candidates[child_sequence] &= set(equivalent)
+                        else:
+                            candidates[child_sequence] = set(equivalent)
+                        equivalent.append(child_sequence)
+                        next_layer.append((child_sequence, child))
+                layers[index] = next_layer
+            self.forbidden.extend(sorted(sequence for sequence in candidates if len(candidates[sequence]) > 0))
+            self.compile()
+            for index in range(len(samples)):  # machine states of the old table are meaningless after compiling
+                layers[index] = [(sequence, self.run(sequence), state) for sequence, state in layers[index]]
+                layers[index] = [entry for entry in layers[index] if entry[1] != PRUNED]
+        return self.forbidden
+
+    def compile(self):
+        """
+        Build the transition table of the machine from the forbidden sequences (Aho-Corasick construction)
+        :return: True
+        """
+        children = [{}]
+        terminal = [False]
+        for sequence in self.forbidden:
+            node = START
+            for operator in sequence:
+                if operator not in children[node]:
+                    children[node][operator] = len(children)
+                    children.append({})
+                    terminal.append(False)
+                node = children[node][operator]
+            terminal[node] = True
+        table = np.zeros((len(children), self.operator_count), dtype=np.int32)
+        failure = [START] * len(children)
+        queue = deque()
+        for operator in range(self.operator_count):
+            child = children[START].get(operator)
+            if child is None:
+                table[START, operator] = START
+            else:
+                table[START, operator] = child
+                queue.append(child)
+        while len(queue) > 0:  # breadth-first, so the failure state of a node is complete before its children
+            node = queue.popleft()
+            terminal[node] = terminal[node] or terminal[failure[node]]
+            for operator in range(self.operator_count):
+                child = children[node].get(operator)
+                if child is None:
+                    table[node, operator] = table[failure[node], operator]
+                else:
+                    failure[child] = table[failure[node], operator]
+                    table[node, operator] = child
+                    queue.append(child)
+        for node in range(len(children)):
+            for operator in range(self.operator_count):
+                if terminal[table[node, operator]]:
+                    table[node, operator] = PRUNED
+        self.table = table
+        return True
+
+    def next_state(self, fsm_state, operator):
+        """
+        :param fsm_state: int, the current state of the machine
+        :param operator:  int, the operator id
+        :return:          int, the next state of the machine, or PRUNED
+        """
+        return int(self.table[fsm_state, operator])
+
+    def run(self, sequence):
+        """
+        :param sequence: iterable of operator ids, a path from the start state
+        :return:         int, the state of the machine after the path, or PRUNED if it contains a forbidden sequence
+        """
+        fsm_state = START
+        for operator in sequence:
+            fsm_state = int(self.table[fsm_state, operator])
+            if fsm_state == PRUNED:
+                break
+        return fsm_state
+
+    def is_pruned(self, sequence):
+        return self.run(sequence) == PRUNED
+
+    def export_db(self, filename):
+        lengths = np.array([len(sequence) for sequence in self.forbidden], dtype=np.int64)
+        operators = np.array([operator for sequence in self.forbidden for operator in sequence], dtype=np.int64)
+        np.savez(filename, operator_count=self.operator_count, lengths=lengths, operators=operators)
+        return True
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load the forbidden sequences written by export_db and compile them again
+        :param filename: str, name of the .npz file
+        :return:         MovePruning
+        """
+        data = np.load(filename)
+        offsets = np.concatenate(([0], np.cumsum(data['lengths'])))
+        operators = data['operators'].tolist()
+        forbidden = [tuple(operators[offsets[i]:offsets[i + 1]]) for i in range(len(data['lengths']))]
+        return cls(int(data['operator_count']), forbidden)
@@ -0,0 +1,91 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b'PDBFILE\x00'
+VERSION = 1
+ALIGNMENT = 4096  # the payload starts on a page boundary, so that it can be memory-mapped directly
+_prefix = struct.Struct('<8sII')  # magic, version and length of the JSON header, little-endian
+
+
+def checksum(payload, chunk_size=1 << 24):
+    """
+    :param payload:    np.ndarray, the entries (read in chunks, so that a memory-mapped payload is not loaded at once)
+    :param chunk_size: int, number of bytes hashed at once
+    :return:           int, the CRC-32 of the bytes of the payload
+    """
+    data = np.asarray(payload).reshape(-1).view(np.uint8)
+    crc = 0
+    for start in range(0, len(data), chunk_size):
+        crc = zlib.crc32(data[start:start + chunk_size], crc)
+    return crc
+
+
+def write_pdb(filename, payload, domain, pattern, bit_width, entry_count):
+    """
+    Write a pattern database in a self-describing format: the magic, the format version and the length of a JSON header
+      (domain, pattern, entry bit width, entry count, dtype, payload size and CRC-32 of the payload), then the payload,
+      padded to a multiple of ALIGNMENT bytes. The file is written next to the target and then renamed over it.
+    :param filename:    str, name of the file
+    :param payload:     np.ndarray, the packed entries
+    :param domain:      str, the puzzle (e.g. 'rubiks_cube')
+    :param pattern:     dict (JSON-serializable), the abstraction and ranking of the entries
+    :param bit_width:   int, number of bits of an entry
+    :param entry_count: int, number of entries
+    :return:            True
+    """
+    payload = np.ascontiguousarray(payload)
+    header = json.dumps({'domain': domain, 'pattern': pattern, 'bit_width': bit_width, 'entry_count': entry_count,
+                         'dtype': payload.dtype.str, 'payload_size': payload.nbytes,
+                         'checksum': checksum(payload)}, sort_keys=True).encode()
+    prefix = _prefix.pack(MAGIC, VERSION, len(header)) + header
+    temporary_filename = filename + '.tmp'
+    with open(temporary_filename, 'wb') as f:
+        f.write(prefix + bytes(-len(prefix) % ALIGNMENT))
+        payload.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_filename, filename)
+    return True
+
+
+def read_header(filename):
+    """
+    :param filename: str, name of the file
+    :return:         dict, the header, with the offset of the payload added as 'offset'
+    """
+    with open(filename, 'rb') as f:
+        prefix = f.read(_prefix.size)
+        if len(prefix) < _prefix.size or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a pattern database file'.format(filename))
+        _, version, header_size = _prefix.unpack(prefix)
+        if version != VERSION:
+            raise ValueError('{} has format version {}, expected {}'.format(filename, version, VERSION))
+        header = json.loads(f.read(header_size))
+    header['offset'] = -(-(_prefix.size + header_size) // ALIGNMENT) * ALIGNMENT
+    return header
+
+
+def load_pdb(filename, domain=None, pattern=None, verify=False):
+    """
+    Memory-map the payload of a pattern database file read-only: nothing is read but the header until entries are
+      used, and processes that map the same file share its pages through the page cache.
+    :param filename: str, name of the file
+    :param domain:   str, the expected domain, or None to accept any
+    :param pattern:  dict, the expected pattern, or None to accept any
+    :param verify:   bool, whether to check the checksum of the payload (which reads the whole file)
+    :return:         tuple of the header (dict) and the payload (np.memmap)
+    """
+    header = read_header(filename)
+    if domain is not None and header['domain'] != domain:
+        raise ValueError('{} is a {} pattern database, expected {}'.format(filename, header['domain'], domain))
+    if pattern is not None and header['pattern'] != pattern:
+        raise ValueError('{} has the pattern {}, expected {}'.format(filename, header['pattern'], pattern))
+    dtype = np.dtype(header['dtype'])
+    payload = np.memmap(filename, dtype=dtype, mode='r', offset=header['offset'],
+                        shape=(header['payload_size'] // dtype.itemsize,))
+    if verify and checksum(payload) != header['checksum']:
+        raise ValueError('Checksum mismatch in {}'.format(filename))
+    return header, payload